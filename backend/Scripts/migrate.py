@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Migrador del esquema de la base de facturas.
+
+Uso (desde backend/):
+    python Scripts/migrate.py                      # aplica las migraciones pendientes
+    python Scripts/migrate.py --status             # solo lista las pendientes
+    python Scripts/migrate.py --partition-by-year  # además particiona facturas por año
+
+Las migraciones están en backend/migrations (ver src/infrastructure/database/migrations.py).
+"""
+import os
+import sys
+import argparse
+import psycopg2
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.infrastructure.database.migrations import migrate
+
+
+def get_db_config() -> dict:
+    # Cargar variables desde .env
+    env_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env')
+    load_dotenv(env_path)
+
+    return {
+        'host': os.getenv('DB_HOST', 'localhost'),
+        'port': os.getenv('DB_PORT', '5433'),
+        'database': os.getenv('DB_NAME', 'Facturas'),
+        'user': os.getenv('DB_USER', 'postgres'),
+        'password': os.getenv('DB_PASSWORD')
+    }
+
+
+def run_migrations(partition_by_year: bool = False, status: bool = False) -> int:
+    db_config = get_db_config()
+    print(f"Conectando a {db_config['database']} en {db_config['host']}...")
+
+    conn = None
+    try:
+        conn = psycopg2.connect(**db_config)
+        versions = migrate(conn, partition_by_year=partition_by_year, dry_run=status)
+        if status:
+            print("Migraciones pendientes: " + (", ".join(versions) if versions else "ninguna"))
+        elif versions:
+            print("Migraciones aplicadas: " + ", ".join(versions))
+        else:
+            print("El esquema ya está al día.")
+        return 0
+    except Exception as e:
+        print(f"Error al migrar: {e}")
+        return 1
+    finally:
+        if conn:
+            conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Aplica las migraciones del esquema de facturas")
+    parser.add_argument("--partition-by-year", action="store_true", help="Particionar facturas por año (irreversible)")
+    parser.add_argument("--status", action="store_true", help="Solo listar las migraciones pendientes")
+    args = parser.parse_args()
+    sys.exit(run_migrations(args.partition_by_year, args.status))
@@ -22,13 +22,16 @@ from typing import Optional, Tuple, List, Dict
 
 try:
     from imapclient import IMAPClient
-    from lxml import etree
     from dateutil.parser import parse as parse_date
 except ImportError as e:
     print(f"[ERROR] Falta instalar dependencias: {e}")
     print("Ejecuta: pip install imapclient lxml python-dateutil")
     sys.exit(1)
 
+# Parser UBL compartido con la API (backend/src)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.application.services.ubl_parser import parse_ubl_bytes
+
 # ============================================================================
 # CONFIGURACIÓN
 # ============================================================================
@@ -59,15 +62,6 @@ ERROR_LOG_FILE = os.path.join(BASE_DIR, "error_log.txt")
 # Etiqueta Gmail
 PROCESSED_LABEL = "Factura_Procesada"
 
-# Namespaces UBL comunes para facturas electrónicas colombianas
-UBL_NAMESPACES = {
-    'cac': 'urn:oasis:names:specification:ubl:schema:xsd:CommonAggregateComponents-2',
-    'cbc': 'urn:oasis:names:specification:ubl:schema:xsd:CommonBasicComponents-2',
-    'ext': 'urn:oasis:names:specification:ubl:schema:xsd:CommonExtensionComponents-2',
-    'sts': 'http://www.dian.gov.co/contratos/facturaelectronica/v1/Structures',
-    'invoice': 'urn:oasis:names:specification:ubl:schema:xsd:Invoice-2',
-}
-
 # ============================================================================
 # CONFIGURACIÓN DE LOGGING
 # ============================================================================
@@ -138,26 +132,6 @@ def sanitize_filename(filename: str) -> str:
     
     return sanitized
 
-def extract_text_from_xml(element, xpath: str, namespaces: dict) -> Optional[str]:
-    """
-    Extrae texto de un elemento XML usando XPath
-    
-    Args:
-        element: Elemento XML raíz
-        xpath: Expresión XPath
-        namespaces: Diccionario de namespaces
-        
-    Returns:
-        Texto extraído o None si no se encuentra
-    """
-    try:
-        result = element.xpath(xpath, namespaces=namespaces)
-        if result and len(result) > 0:
-            return result[0].text.strip() if hasattr(result[0], 'text') else str(result[0]).strip()
-    except Exception as e:
-        logger.debug(f"No se pudo extraer {xpath}: {e}")
-    return None
-
 # ============================================================================
 # PROCESAMIENTO DE XML UBL
 # ============================================================================
@@ -172,73 +146,26 @@ def parse_invoice_xml(xml_content: bytes) -> Optional[Dict[str, str]]:
     Returns:
         Diccionario con los datos extraídos o None si falla
     """
-    try:
-        root = etree.fromstring(xml_content)
-        
-        # Verificar que sea un documento Invoice UBL
-        if 'Invoice' not in root.tag:
-            logger.debug("XML no es una factura UBL válida (no contiene tag Invoice)")
-            return None
-        
-        # Extraer datos requeridos usando XPath con namespace-awareness
-        data = {}
-        
-        # Número de factura (ID)
-        invoice_id = extract_text_from_xml(root, '//cbc:ID', UBL_NAMESPACES)
-        if not invoice_id:
-            # Intentar sin namespace
-            invoice_id = extract_text_from_xml(root, '//*[local-name()="ID"]', {})
-        data['invoice_number'] = invoice_id
-        
-        # Fecha de emisión (IssueDate)
-        issue_date = extract_text_from_xml(root, '//cbc:IssueDate', UBL_NAMESPACES)
-        if not issue_date:
-            issue_date = extract_text_from_xml(root, '//*[local-name()="IssueDate"]', {})
-        data['issue_date'] = issue_date
-        
-        # Proveedor (RegistrationName dentro de AccountingSupplierParty)
-        supplier_name = extract_text_from_xml(
-            root, 
-            '//cac:AccountingSupplierParty//cac:Party//cac:PartyLegalEntity//cbc:RegistrationName',
-            UBL_NAMESPACES
-        )
-        if not supplier_name:
-            supplier_name = extract_text_from_xml(
-                root,
-                '//*[local-name()="AccountingSupplierParty"]//*[local-name()="RegistrationName"]',
-                {}
-            )
-        data['supplier_name'] = supplier_name
-        
-        # NIT (CompanyID)
-        company_id = extract_text_from_xml(
-            root,
-            '//cac:AccountingSupplierParty//cac:Party//cac:PartyTaxScheme//cbc:CompanyID',
-            UBL_NAMESPACES
-        )
-        if not company_id:
-            company_id = extract_text_from_xml(
-                root,
-                '//*[local-name()="AccountingSupplierParty"]//*[local-name()="CompanyID"]',
-                {}
-            )
-        data['nit'] = company_id
-        
-        # Validar que se extrajeron los datos mínimos
-        if not data.get('invoice_number'):
-            logger.warning("No se pudo extraer el número de factura del XML")
-            return None
-            
-        logger.debug(f"Datos extraídos del XML: {data}")
-        return data
-        
-    except etree.XMLSyntaxError as e:
-        logger.debug(f"Error de sintaxis XML: {e}")
+    # Modo rápido del parser compartido: solo identificación, sin totales
+    invoice, error = parse_ubl_bytes(xml_content, metadata_only=True)
+    if not invoice:
+        logger.debug(f"XML no es una factura UBL válida: {error}")
         return None
-    except Exception as e:
-        logger.error(f"Error inesperado al parsear XML: {e}", exc_info=True)
+
+    # Verificar que sea una factura (Invoice directo o AttachedDocument que la contiene)
+    if invoice.document_type not in ('Invoice', 'AttachedDocument'):
+        logger.debug(f"XML no es una factura UBL válida (documento {invoice.document_type})")
         return None
 
+    data = {
+        'invoice_number': invoice.invoice_number,
+        'issue_date': invoice.issue_date,
+        'supplier_name': invoice.supplier_name,
+        'nit': invoice.nit,
+    }
+    logger.debug(f"Datos extraídos del XML: {data}")
+    return data
+
 # ============================================================================
 # PROCESAMIENTO DE ARCHIVOS ZIP
 # ============================================================================
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Benchmark de latencia de la API bajo carga concurrente del dashboard.
+
+Uso (con la API corriendo, p. ej. uvicorn src.infrastructure.api.main:app):
+    python benchmarks/bench_api_concurrency.py                                  # 1, 8, 32 clientes
+    python benchmarks/bench_api_concurrency.py --concurrency 64 --requests 2000
+    python benchmarks/bench_api_concurrency.py --output api.json                # resultados en JSON
+    python benchmarks/bench_api_concurrency.py --baseline api.json              # compara p99 con otra ejecución
+
+Cada cliente repite la mezcla de consultas que hace el dashboard al cargar
+(estadísticas, proveedores, primera página de facturas y resumen de líneas).
+Por cada nivel de concurrencia se reportan p50/p95/p99 por endpoint y del total,
+y la latencia de /health medida en paralelo: si una consulta bloquea el event
+loop, /health (que no toca la BD) se dispara junto con ella.
+"""
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import platform
+import threading
+import statistics
+import urllib.error
+import urllib.request
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from run_benchmarks import git_commit
+
+# Mezcla de peticiones de una carga del dashboard (nombre, ruta)
+DASHBOARD_MIX = [
+    ('stats', '/api/v1/invoices/stats'),
+    ('providers', '/api/v1/invoices/providers'),
+    ('invoices_page', '/api/v1/invoices?limit=50'),
+    ('lines_summary', '/api/v1/invoices/lines/summary?limit=20'),
+]
+HEALTH_PATH = '/health'
+# Pausa entre sondeos de /health durante la carga
+HEALTH_INTERVAL_S = 0.05
+
+
+def percentile(values: list, pct: float) -> float:
+    """Percentil por rango más cercano (values no vacío)."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def summarize(timings: list) -> dict:
+    if not timings:
+        return {"requests": 0}
+    return {
+        "requests": len(timings),
+        "p50_ms": round(percentile(timings, 50) * 1000, 2),
+        "p95_ms": round(percentile(timings, 95) * 1000, 2),
+        "p99_ms": round(percentile(timings, 99) * 1000, 2),
+        "max_ms": round(max(timings) * 1000, 2),
+        "mean_ms": round(statistics.mean(timings) * 1000, 2),
+    }
+
+
+def timed_get(url: str, timeout: float) -> tuple:
+    """GET url. Retorna (segundos, ok)."""
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            response.read()
+            ok = 200 <= response.status < 300
+    except (urllib.error.URLError, OSError):
+        ok = False
+    return time.perf_counter() - start, ok
+
+
+def run_level(base_url: str, concurrency: int, total_requests: int, timeout: float) -> dict:
+    timings = {name: [] for name, _ in DASHBOARD_MIX}
+    errors = {name: 0 for name, _ in DASHBOARD_MIX}
+    lock = threading.Lock()
+
+    def worker(i: int):
+        name, path = DASHBOARD_MIX[i % len(DASHBOARD_MIX)]
+        elapsed, ok = timed_get(base_url + path, timeout)
+        with lock:
+            if ok:
+                timings[name].append(elapsed)
+            else:
+                errors[name] += 1
+
+    # Sondeo de /health en paralelo a la carga
+    health = []
+    stop = threading.Event()
+
+    def probe():
+        while not stop.is_set():
+            elapsed, ok = timed_get(base_url + HEALTH_PATH, timeout)
+            if ok:
+                health.append(elapsed)
+            stop.wait(HEALTH_INTERVAL_S)
+
+    prober = threading.Thread(target=probe, daemon=True)
+    start = time.perf_counter()
+    prober.start()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, range(total_requests)))
+    wall = time.perf_counter() - start
+    stop.set()
+    prober.join()
+
+    all_timings = [t for values in timings.values() for t in values]
+    result = {
+        "concurrency": concurrency,
+        "wall_s": round(wall, 3),
+        "requests_per_s": round(len(all_timings) / wall, 2) if wall > 0 else None,
+        "errors": sum(errors.values()),
+        "total": summarize(all_timings),
+        "endpoints": {name: dict(summarize(values), errors=errors[name]) for name, values in timings.items()},
+        "health": summarize(health),
+    }
+
+    total = result["total"]
+    print(f"\n[concurrencia {concurrency}] {total['requests']} peticiones en {wall:.2f}s "
+          f"({result['requests_per_s'] or 0:,.1f} req/s, {result['errors']} errores)")
+    for name, stats in [('total', total)] + list(result["endpoints"].items()) + [('health', result["health"])]:
+        if stats.get("requests"):
+            print(f"  {name:<14} p50 {stats['p50_ms']:>9.1f} ms  p95 {stats['p95_ms']:>9.1f} ms  p99 {stats['p99_ms']:>9.1f} ms")
+    return result
+
+
+def compare(results: list, baseline_path: str, threshold: float) -> int:
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    previous = {r['concurrency']: r for r in baseline.get('results', [])}
+
+    print(f"\nComparación de p99 contra {baseline_path} (commit {baseline.get('meta', {}).get('commit', '?')}), umbral {threshold:.0%}:")
+    regressions = 0
+    for r in results:
+        before = previous.get(r['concurrency'])
+        if not before:
+            continue
+        for name in ['total', 'health']:
+            old, new = before[name].get('p99_ms'), r[name].get('p99_ms')
+            if not old or not new:
+                continue
+            change = new / old - 1
+            mark = ""
+            if change > threshold:
+                regressions += 1
+                mark = "  <-- REGRESIÓN"
+            print(f"  c={r['concurrency']:<4} {name:<8} {old:>9.1f} -> {new:>9.1f} ms ({change:+.1%}){mark}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latencia de la API con clientes concurrentes (mezcla del dashboard)")
+    parser.add_argument("--url", default=os.getenv('API_URL', 'http://localhost:8000'), help="URL base de la API")
+    parser.add_argument("--concurrency", type=int, action='append', help="Clientes simultáneos (repetible; por defecto 1, 8 y 32)")
+    parser.add_argument("--requests", type=int, default=400, help="Peticiones por nivel de concurrencia")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Timeout por petición (s)")
+    parser.add_argument("--output", help="Guardar los resultados en este JSON")
+    parser.add_argument("--baseline", help="Comparar contra un JSON de una ejecución anterior")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Aumento de p99 tolerado antes de marcar regresión")
+    args = parser.parse_args()
+    base_url = args.url.rstrip('/')
+
+    _, ok = timed_get(base_url + HEALTH_PATH, args.timeout)
+    if not ok:
+        print(f"La API no responde en {base_url}{HEALTH_PATH}")
+        return 2
+
+    # Una pasada de calentamiento (pools, cachés de PostgreSQL)
+    for _, path in DASHBOARD_MIX:
+        timed_get(base_url + path, args.timeout)
+
+    results = [run_level(base_url, c, args.requests, args.timeout) for c in (args.concurrency or [1, 8, 32])]
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now().isoformat(timespec='seconds'),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "url": base_url,
+            "requests_per_level": args.requests,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=1)
+        print(f"\nResultados guardados en {args.output}")
+
+    if args.baseline and compare(results, args.baseline, args.threshold):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark de ExporterService.parse_xml_invoice sobre el corpus de Facturas/.
+
+Uso (desde backend/):
+    python benchmarks/bench_parser.py                      # mide archivos/segundo
+    python benchmarks/bench_parser.py --dump salida.json   # guarda la salida del parser
+    python benchmarks/bench_parser.py --check salida.json  # compara contra una salida previa
+    python benchmarks/bench_parser.py --metadata-only      # mide el modo rápido del parser compartido
+
+El flujo para comparar dos versiones del parser es ejecutar --dump en la
+versión anterior y --check en la nueva: además de la velocidad se verifica
+que el resultado sea idéntico archivo por archivo.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import dataclasses
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from src.application.services.exporter_service import ExporterService
+from src.application.services.ubl_parser import parse_ubl_file
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(BACKEND_DIR), "Facturas")
+
+
+def find_xml_files(corpus_dir: str) -> list:
+    files = []
+    for dirpath, _, filenames in os.walk(corpus_dir):
+        files.extend(os.path.join(dirpath, f) for f in filenames if f.lower().endswith('.xml'))
+    return sorted(files)
+
+
+def parse_metadata_only(path: str) -> tuple:
+    invoice, error = parse_ubl_file(path, metadata_only=True)
+    return (dataclasses.asdict(invoice) if invoice else None), error
+
+
+def run(files: list, repeat: int, metadata_only: bool = False) -> tuple:
+    parse = parse_metadata_only if metadata_only else ExporterService().parse_xml_invoice
+    results = {}
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for path in files:
+            results[os.path.relpath(path, os.path.dirname(BACKEND_DIR))] = parse(path)
+        timings.append(time.perf_counter() - start)
+    return results, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del parser de facturas XML")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="Directorio con XMLs (recursivo)")
+    parser.add_argument("--repeat", type=int, default=5, help="Número de pasadas sobre el corpus")
+    parser.add_argument("--dump", help="Guardar la salida del parser en este JSON")
+    parser.add_argument("--check", help="Comparar la salida del parser contra este JSON")
+    parser.add_argument("--metadata-only", action="store_true", help="Medir parse_ubl_file en modo rápido (sin totales)")
+    args = parser.parse_args()
+
+    files = find_xml_files(args.corpus)
+    if not files:
+        print(f"No se encontraron XMLs en {args.corpus}")
+        return 1
+
+    results, timings = run(files, args.repeat, args.metadata_only)
+    best = min(timings)
+    print(f"Archivos: {len(files)} | Pasadas: {args.repeat}")
+    print(f"Mejor pasada: {best:.3f}s -> {len(files) / best:,.1f} archivos/s")
+    print(f"Media: {sum(timings) / len(timings):.3f}s")
+
+    # JSON no distingue tuplas de listas: normalizar antes de guardar/comparar
+    normalized = json.loads(json.dumps(results, sort_keys=True))
+
+    if args.dump:
+        with open(args.dump, 'w', encoding='utf-8') as f:
+            json.dump(normalized, f, ensure_ascii=False, indent=1, sort_keys=True)
+        print(f"Salida guardada en {args.dump}")
+
+    if args.check:
+        with open(args.check, encoding='utf-8') as f:
+            expected = json.load(f)
+        diffs = [k for k in sorted(set(expected) | set(normalized)) if expected.get(k) != normalized.get(k)]
+        if diffs:
+            print(f"ERROR: {len(diffs)} archivos con salida distinta:")
+            for k in diffs[:20]:
+                print(f"  {k}\n    antes:   {expected.get(k)}\n    después: {normalized.get(k)}")
+            return 1
+        print(f"OK: salida idéntica a {args.check} en {len(normalized)} archivos")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Suite de benchmarks de los caminos críticos: parseo, ZIPs de Gmail, importación y exportación.
+
+Uso (desde backend/):
+    python benchmarks/run_benchmarks.py                                    # solo corpus real
+    python benchmarks/run_benchmarks.py --scale 10000 --scale 100000       # + corpus sintéticos
+    python benchmarks/run_benchmarks.py --output bench.json                # resultados en JSON
+    python benchmarks/run_benchmarks.py --baseline bench.json              # compara contra otra ejecución
+
+Mide, sobre el corpus real de Facturas/ y sobre los corpus sintéticos pedidos
+(ver synthetic_corpus.py):
+  - parse:         ExporterService.parse_xml_invoice archivo por archivo
+  - handle_zip:    InvoiceProcessorService._handle_zip con ZIPs armados en memoria
+                   (XML de firma + factura + PDF), sobre una muestra del corpus
+  - import_dry:    import_to_db(dry_run=True) contra InMemoryFacturaRepository
+  - import:        import_to_db guardando en un InMemoryFacturaRepository vacío
+  - export_<fmt>:  export_from_db por formato (excel, csv, pdf) con lo importado
+
+El repositorio en memoria aísla el costo del código del costo de PostgreSQL.
+Con --output se guarda un JSON (commit, máquina, resultados); con --baseline se
+compara contra un JSON anterior y el proceso termina con código 1 si algún
+benchmark es más lento que el umbral, para poder seguir regresiones entre commits.
+"""
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import zipfile
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from src.application.services.exporter_service import ExporterService
+from src.application.services.invoice_processor_service import InvoiceProcessorService
+from src.application.services.directory_scanner import iter_xml_files
+from src.infrastructure.database.in_memory_factura_repository import InMemoryFacturaRepository
+from synthetic_corpus import generate, DEFAULT_CORPUS
+
+EXPORT_FORMATS = ['excel', 'csv', 'pdf']
+# Contenido de relleno para el PDF del ZIP (el PDF no se procesa, solo se copia)
+FAKE_PDF = b"%PDF-1.4\n" + b"0" * 50_000
+SIGNATURE_XML = b'<?xml version="1.0" encoding="UTF-8"?><ds:Signature xmlns:ds="http://www.w3.org/2000/09/xmldsig#"/>'
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconocido"
+
+
+def measure(fn, repeat: int, setup=None) -> list:
+    """Ejecuta fn() repeat veces y retorna los tiempos. setup() corre antes de cada pasada, fuera del tiempo medido."""
+    timings = []
+    for _ in range(repeat):
+        state = setup() if setup else None
+        start = time.perf_counter()
+        fn(state)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def build_zips(files: list) -> list:
+    zips = []
+    for path in files:
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr('signature.xml', SIGNATURE_XML)
+            zf.write(path, os.path.basename(path))
+            zf.writestr('factura.pdf', FAKE_PDF)
+        zips.append(buf.getvalue())
+    return zips
+
+
+def run_corpus(label: str, directory: str, args, workdir: str) -> list:
+    exporter = ExporterService()
+    files = list(iter_xml_files(directory, recursive=True))
+    results = []
+
+    def record(benchmark: str, items: int, timings: list):
+        best = min(timings)
+        entry = {
+            "benchmark": benchmark,
+            "corpus": label,
+            "items": items,
+            "repeat": len(timings),
+            "best_s": round(best, 6),
+            "median_s": round(statistics.median(timings), 6),
+            "mean_s": round(statistics.mean(timings), 6),
+            "items_per_s": round(items / best, 2) if best > 0 else None,
+        }
+        results.append(entry)
+        print(f"  {benchmark:<14} {items:>8} items  mejor {best:8.3f}s  {entry['items_per_s'] or 0:>12,.1f} items/s")
+
+    print(f"\n[{label}] {len(files)} archivos en {directory}")
+
+    if 'parse' in args.only:
+        def parse_all(_):
+            for path in files:
+                exporter.parse_xml_invoice(path)
+        record('parse', len(files), measure(parse_all, args.repeat))
+
+    if 'handle_zip' in args.only:
+        sample = files[:args.zip_sample]
+        zips = build_zips(sample)
+        processor = InvoiceProcessorService(None)
+
+        def fresh_dir():
+            # _handle_zip no reescribe lo que ya existe: cada pasada empieza vacía
+            target = os.path.join(workdir, 'zip_out')
+            shutil.rmtree(target, ignore_errors=True)
+            os.makedirs(target)
+            return target
+
+        def handle_all(target):
+            for content in zips:
+                processor._handle_zip(content, target)
+        record('handle_zip', len(zips), measure(handle_all, args.repeat, fresh_dir))
+
+    if 'import_dry' in args.only:
+        repo = InMemoryFacturaRepository()
+        record('import_dry', len(files), measure(
+            lambda _: exporter.import_to_db(directory, repo, dry_run=True, workers=args.workers, scan_options={'recursive': True}),
+            args.repeat
+        ))
+
+    # La importación real también deja el repositorio listo para las exportaciones
+    repo = InMemoryFacturaRepository()
+    if 'import' in args.only or any(f"export_{fmt}" in args.only for fmt in EXPORT_FORMATS):
+        def fresh_repo():
+            repo.clear()
+            return repo
+        timings = measure(
+            lambda r: exporter.import_to_db(directory, r, workers=args.workers, scan_options={'recursive': True}),
+            args.repeat, fresh_repo
+        )
+        if 'import' in args.only:
+            record('import', len(files), timings)
+
+    rows = len(repo.get_invoices())
+    for fmt in EXPORT_FORMATS:
+        name = f"export_{fmt}"
+        if name not in args.only:
+            continue
+        output_dir = os.path.join(workdir, 'export_out')
+        os.makedirs(output_dir, exist_ok=True)
+        record(name, rows, measure(lambda _: exporter.export_from_db(repo, {}, [fmt], output_dir), args.repeat))
+
+    return results
+
+
+def compare(results: list, baseline_path: str, threshold: float) -> int:
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    previous = {(r['benchmark'], r['corpus']): r for r in baseline.get('results', [])}
+
+    print(f"\nComparación contra {baseline_path} (commit {baseline.get('meta', {}).get('commit', '?')}), umbral {threshold:.0%}:")
+    regressions = 0
+    for r in results:
+        before = previous.get((r['benchmark'], r['corpus']))
+        if not before or not before.get('items_per_s') or not r['items_per_s']:
+            continue
+        change = r['items_per_s'] / before['items_per_s'] - 1
+        mark = ""
+        if change < -threshold:
+            regressions += 1
+            mark = "  <-- REGRESIÓN"
+        print(f"  {r['benchmark']:<14} {r['corpus']:<18} {before['items_per_s']:>12,.1f} -> {r['items_per_s']:>12,.1f} items/s ({change:+.1%}){mark}")
+    return regressions
+
+
+def main():
+    benchmarks = ['parse', 'handle_zip', 'import_dry', 'import'] + [f"export_{fmt}" for fmt in EXPORT_FORMATS]
+    parser = argparse.ArgumentParser(description="Benchmarks de ingesta, importación y exportación")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="Corpus real (recursivo)")
+    parser.add_argument("--scale", type=int, action='append', default=[], help="Tamaño de un corpus sintético (repetible: --scale 10000 --scale 100000)")
+    parser.add_argument("--synthetic-dir", help="Dónde generar/reutilizar los corpus sintéticos (por defecto, temporal)")
+    parser.add_argument("--skip-real", action="store_true", help="No medir el corpus real")
+    parser.add_argument("--only", nargs='+', choices=benchmarks, default=benchmarks, help="Benchmarks a ejecutar")
+    parser.add_argument("--repeat", type=int, default=3, help="Pasadas por benchmark")
+    parser.add_argument("--workers", type=int, default=1, help="Procesos de parseo en import_to_db")
+    parser.add_argument("--zip-sample", type=int, default=1000, help="Máximo de ZIPs en memoria para handle_zip")
+    parser.add_argument("--output", help="Guardar los resultados en este JSON")
+    parser.add_argument("--baseline", help="Comparar contra un JSON de una ejecución anterior")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Caída de items/s tolerada antes de marcar regresión")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_facturas_")
+    synthetic_root = args.synthetic_dir or os.path.join(workdir, 'synthetic')
+    corpora = [] if args.skip_real else [('real', args.corpus)]
+    for count in args.scale:
+        directory = os.path.join(synthetic_root, f"facturas_{count}")
+        # Reutilizar un corpus ya generado con --synthetic-dir ahorra minutos en 100k
+        existing = sum(1 for _ in iter_xml_files(directory, recursive=True)) if os.path.isdir(directory) else 0
+        if existing != count:
+            shutil.rmtree(directory, ignore_errors=True)
+            print(f"Generando corpus sintético de {count} archivos en {directory}...")
+            generate(args.corpus, directory, count)
+        corpora.append((f"synthetic_{count}", directory))
+
+    results = []
+    try:
+        for label, directory in corpora:
+            results.extend(run_corpus(label, directory, args, workdir))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now().isoformat(timespec='seconds'),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "repeat": args.repeat,
+            "workers": args.workers,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=1)
+        print(f"\nResultados guardados en {args.output}")
+
+    if args.baseline and compare(results, args.baseline, args.threshold):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Generador de un corpus sintético de facturas UBL a partir del corpus real de Facturas/.
+
+Uso (desde backend/):
+    python benchmarks/synthetic_corpus.py --count 10000 --output /tmp/facturas_10k
+    python benchmarks/synthetic_corpus.py --count 100000 --output /tmp/facturas_100k
+
+Cada "ronda" es una copia del corpus real en su propia carpeta (lote_00000, ...)
+con el número de factura y la fecha de emisión reescritos, de modo que:
+  - el tamaño y la estructura de los XML son los reales (AttachedDocument con CDATA),
+  - (nit, factura) es único en todo el corpus, como en la BD,
+  - los nombres siguen la convención "{fecha} {proveedor}.xml" de _handle_zip.
+La generación es determinista: el mismo corpus y count producen los mismos archivos.
+"""
+import os
+import sys
+import argparse
+from datetime import date, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from src.application.services.ubl_parser import parse_ubl_file
+from src.application.services.invoice_filenames import invoice_base_name
+from src.application.services.directory_scanner import iter_xml_files
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(BACKEND_DIR), "Facturas")
+
+
+def load_templates(corpus_dir: str) -> list:
+    """Retorna [(contenido, numero_factura, fecha, proveedor)] de los XML válidos del corpus."""
+    templates = []
+    for path in iter_xml_files(corpus_dir, recursive=True):
+        invoice, _ = parse_ubl_file(path, metadata_only=True)
+        if not invoice or not invoice.issue_date:
+            continue
+        with open(path, 'rb') as f:
+            templates.append((f.read(), invoice.invoice_number, invoice.issue_date, invoice.supplier_name))
+    return templates
+
+
+def iter_synthetic(templates: list):
+    """Genera (carpeta_lote, nombre, contenido) indefinidamente, ronda por ronda."""
+    round_number = 0
+    while True:
+        batch_dir = f"lote_{round_number:05d}"
+        for content, invoice_number, issue_date, supplier_name in templates:
+            # Todas las fechas de la ronda se desplazan igual: los nombres de una ronda
+            # no chocan entre sí, igual que en el corpus original
+            new_date = (date.fromisoformat(issue_date) - timedelta(days=round_number)).isoformat()
+            new_number = f"{invoice_number}S{round_number}"
+            new_content = content.replace(invoice_number.encode(), new_number.encode())
+            new_content = new_content.replace(issue_date.encode(), new_date.encode())
+            yield batch_dir, f"{invoice_base_name(new_date, supplier_name)}.xml", new_content
+        round_number += 1
+
+
+def generate(corpus_dir: str, output_dir: str, count: int) -> int:
+    """Escribe count archivos sintéticos en output_dir. Retorna cuántos se escribieron."""
+    templates = load_templates(corpus_dir)
+    if not templates:
+        raise ValueError(f"No se encontraron XMLs de factura válidos en {corpus_dir}")
+
+    written = 0
+    for batch_dir, filename, content in iter_synthetic(templates):
+        if written >= count:
+            break
+        target_dir = os.path.join(output_dir, batch_dir)
+        os.makedirs(target_dir, exist_ok=True)
+        path = os.path.join(target_dir, filename)
+        if os.path.exists(path):
+            # Mismo proveedor y fecha en el corpus original: se conserva el primero
+            continue
+        with open(path, 'wb') as f:
+            f.write(content)
+        written += 1
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera un corpus sintético de facturas UBL")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="Corpus real usado como plantilla")
+    parser.add_argument("--output", required=True, help="Directorio de salida")
+    parser.add_argument("--count", type=int, default=10000, help="Número de archivos a generar")
+    args = parser.parse_args()
+
+    written = generate(args.corpus, args.output, args.count)
+    print(f"Generados {written} archivos en {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
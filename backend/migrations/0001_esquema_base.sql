@@ -1,4 +1,4 @@
--- Script de creación de tabla para facturas
+-- Tablas base de facturas y sus líneas (esquema canónico)
 CREATE TABLE IF NOT EXISTS facturas (
     id SERIAL PRIMARY KEY,
     fecha DATE NOT NULL,
@@ -11,11 +11,24 @@ CREATE TABLE IF NOT EXISTS facturas (
     total DECIMAL(15, 2) NOT NULL DEFAULT 0,
     nombre_xml VARCHAR(255),
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    
+
     -- Restricción de unicidad para manejar ON CONFLICT en el repositorio
     UNIQUE (nit, factura)
 );
 
--- Índices para mejorar rendimiento en búsquedas
-CREATE INDEX IF NOT EXISTS idx_facturas_fecha ON facturas(fecha);
 CREATE INDEX IF NOT EXISTS idx_facturas_proveedor ON facturas(proveedor);
+
+-- Líneas de cada factura (InvoiceLine / CreditNoteLine del XML UBL)
+CREATE TABLE IF NOT EXISTS factura_lineas (
+    id BIGSERIAL PRIMARY KEY,
+    factura_id INTEGER NOT NULL REFERENCES facturas(id) ON DELETE CASCADE,
+    linea INTEGER NOT NULL,
+    codigo VARCHAR(50),
+    descripcion TEXT,
+    cantidad DECIMAL(18, 6) NOT NULL DEFAULT 0,
+    precio_unitario DECIMAL(18, 6) NOT NULL DEFAULT 0,
+    valor DECIMAL(15, 2) NOT NULL DEFAULT 0,
+    iva DECIMAL(15, 2) NOT NULL DEFAULT 0,
+
+    UNIQUE (factura_id, linea)
+);
@@ -0,0 +1,34 @@
+-- Lleva al esquema canónico las bases creadas con la versión anterior de
+-- Scripts/init_db.py: sin descuentos, con fecha_creacion en vez de created_at,
+-- sin defaults en los montos y con nombres propios en las restricciones únicas.
+ALTER TABLE facturas ADD COLUMN IF NOT EXISTS descuentos DECIMAL(15, 2) NOT NULL DEFAULT 0;
+
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = 'facturas' AND column_name = 'fecha_creacion'
+    ) THEN
+        IF EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = 'facturas' AND column_name = 'created_at'
+        ) THEN
+            ALTER TABLE facturas DROP COLUMN fecha_creacion;
+        ELSE
+            ALTER TABLE facturas RENAME COLUMN fecha_creacion TO created_at;
+        END IF;
+    END IF;
+
+    IF EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'unique_factura' AND conrelid = 'facturas'::regclass) THEN
+        ALTER TABLE facturas RENAME CONSTRAINT unique_factura TO facturas_nit_factura_key;
+    END IF;
+    IF EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'unique_factura_linea' AND conrelid = 'factura_lineas'::regclass) THEN
+        ALTER TABLE factura_lineas RENAME CONSTRAINT unique_factura_linea TO factura_lineas_factura_id_linea_key;
+    END IF;
+END;
+$$;
+
+ALTER TABLE facturas ADD COLUMN IF NOT EXISTS created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP;
+ALTER TABLE facturas ALTER COLUMN subtotal SET DEFAULT 0;
+ALTER TABLE facturas ALTER COLUMN iva SET DEFAULT 0;
+ALTER TABLE facturas ALTER COLUMN total SET DEFAULT 0;
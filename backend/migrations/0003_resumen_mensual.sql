@@ -0,0 +1,65 @@
+-- Resumen mensual por proveedor/NIT para get_stats, mantenido por trigger
+CREATE TABLE IF NOT EXISTS facturas_resumen_mensual (
+    mes DATE NOT NULL,
+    proveedor VARCHAR(255) NOT NULL,
+    nit VARCHAR(20) NOT NULL,
+    facturas INTEGER NOT NULL DEFAULT 0,
+    subtotal DECIMAL(18, 2) NOT NULL DEFAULT 0,
+    descuentos DECIMAL(18, 2) NOT NULL DEFAULT 0,
+    iva DECIMAL(18, 2) NOT NULL DEFAULT 0,
+    total DECIMAL(18, 2) NOT NULL DEFAULT 0,
+    fecha_min DATE NOT NULL,
+    fecha_max DATE NOT NULL,
+
+    PRIMARY KEY (mes, proveedor, nit)
+);
+
+-- Recalcula un grupo desde la tabla base (UPDATE/DELETE, que la aplicación no hace)
+CREATE OR REPLACE FUNCTION facturas_resumen_recalcular(p_mes DATE, p_proveedor VARCHAR, p_nit VARCHAR) RETURNS void AS $$
+BEGIN
+    DELETE FROM facturas_resumen_mensual WHERE mes = p_mes AND proveedor = p_proveedor AND nit = p_nit;
+    INSERT INTO facturas_resumen_mensual (mes, proveedor, nit, facturas, subtotal, descuentos, iva, total, fecha_min, fecha_max)
+    SELECT p_mes, p_proveedor, p_nit, COUNT(*), SUM(subtotal), SUM(descuentos), SUM(iva), SUM(total), MIN(fecha), MAX(fecha)
+    FROM facturas
+    WHERE fecha >= p_mes AND fecha < (p_mes + INTERVAL '1 month')::date
+      AND proveedor = p_proveedor AND nit = p_nit
+    HAVING COUNT(*) > 0;
+END;
+$$ LANGUAGE plpgsql;
+
+-- INSERT suma la factura a su grupo; UPDATE/DELETE recalculan los grupos afectados
+CREATE OR REPLACE FUNCTION facturas_resumen_trigger() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO facturas_resumen_mensual AS r (mes, proveedor, nit, facturas, subtotal, descuentos, iva, total, fecha_min, fecha_max)
+        VALUES (date_trunc('month', NEW.fecha)::date, NEW.proveedor, NEW.nit, 1, NEW.subtotal, NEW.descuentos, NEW.iva, NEW.total, NEW.fecha, NEW.fecha)
+        ON CONFLICT (mes, proveedor, nit) DO UPDATE SET
+            facturas = r.facturas + 1,
+            subtotal = r.subtotal + EXCLUDED.subtotal,
+            descuentos = r.descuentos + EXCLUDED.descuentos,
+            iva = r.iva + EXCLUDED.iva,
+            total = r.total + EXCLUDED.total,
+            fecha_min = LEAST(r.fecha_min, EXCLUDED.fecha_min),
+            fecha_max = GREATEST(r.fecha_max, EXCLUDED.fecha_max);
+        RETURN NULL;
+    END IF;
+
+    PERFORM facturas_resumen_recalcular(date_trunc('month', OLD.fecha)::date, OLD.proveedor, OLD.nit);
+    IF TG_OP = 'UPDATE' THEN
+        PERFORM facturas_resumen_recalcular(date_trunc('month', NEW.fecha)::date, NEW.proveedor, NEW.nit);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_facturas_resumen ON facturas;
+CREATE TRIGGER trg_facturas_resumen
+    AFTER INSERT OR UPDATE OR DELETE ON facturas
+    FOR EACH ROW EXECUTE FUNCTION facturas_resumen_trigger();
+
+-- Carga inicial para bases con facturas previas (los grupos existentes ya los mantiene el trigger)
+INSERT INTO facturas_resumen_mensual (mes, proveedor, nit, facturas, subtotal, descuentos, iva, total, fecha_min, fecha_max)
+SELECT date_trunc('month', fecha)::date, proveedor, nit, COUNT(*), SUM(subtotal), SUM(descuentos), SUM(iva), SUM(total), MIN(fecha), MAX(fecha)
+FROM facturas
+GROUP BY 1, 2, 3
+ON CONFLICT (mes, proveedor, nit) DO NOTHING;
@@ -0,0 +1,17 @@
+-- Índices de las consultas del dashboard.
+--
+-- idx_facturas_fecha_proveedor es el índice compuesto por (fecha, proveedor) y a la
+-- vez el índice cubriente del listado: sigue el orden de la paginación keyset
+-- (fecha DESC, proveedor, id) e incluye el resto de columnas que se leen, así el
+-- listado, la exportación y los días sueltos de get_stats se resuelven con
+-- index-only scans. Reemplaza a idx_facturas_fecha e idx_facturas_fecha_proveedor_id.
+DROP INDEX IF EXISTS idx_facturas_fecha;
+DROP INDEX IF EXISTS idx_facturas_fecha_proveedor_id;
+
+CREATE INDEX IF NOT EXISTS idx_facturas_fecha_proveedor
+    ON facturas (fecha DESC, proveedor, id)
+    INCLUDE (nit, factura, subtotal, descuentos, iva, total, nombre_xml);
+
+-- BRIN: pocas páginas por rango de bloques; las facturas llegan casi en orden de
+-- fecha, así que los filtros por rango amplio descartan bloques enteros del heap
+CREATE INDEX IF NOT EXISTS idx_facturas_fecha_brin ON facturas USING brin (fecha);
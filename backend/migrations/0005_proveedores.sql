@@ -0,0 +1,37 @@
+-- Dimensión de proveedores por NIT normalizado: un registro por NIT con el nombre
+-- canónico (el de su factura más reciente) y las fechas de primera y última
+-- factura. La mantiene el repositorio al guardar; el listado de proveedores del
+-- dashboard la lee en vez de SELECT DISTINCT sobre facturas.
+
+-- Igual que normalize_nit (src/domain/models/proveedor.py)
+CREATE OR REPLACE FUNCTION normalizar_nit(p_nit TEXT) RETURNS TEXT AS $$
+    SELECT COALESCE(NULLIF(regexp_replace(split_part(btrim(p_nit), '-', 1), '\D', '', 'g'), ''), btrim(p_nit));
+$$ LANGUAGE sql IMMUTABLE STRICT;
+
+-- facturas.nit se guarda normalizado desde ahora; las filas previas se normalizan
+-- salvo que choquen con una factura ya guardada con el NIT normalizado
+UPDATE facturas f
+SET nit = normalizar_nit(f.nit)
+WHERE f.nit <> normalizar_nit(f.nit)
+  AND NOT EXISTS (
+      SELECT 1 FROM facturas g WHERE g.nit = normalizar_nit(f.nit) AND g.factura = f.factura
+  )
+  AND f.id = (
+      SELECT MIN(h.id) FROM facturas h WHERE normalizar_nit(h.nit) = normalizar_nit(f.nit) AND h.factura = f.factura
+  );
+
+CREATE TABLE IF NOT EXISTS proveedores (
+    nit VARCHAR(20) PRIMARY KEY,
+    nombre VARCHAR(255) NOT NULL,
+    primera_factura DATE NOT NULL,
+    ultima_factura DATE NOT NULL
+);
+
+-- Listado de nombres con filtro de fechas como index-only scan
+CREATE INDEX IF NOT EXISTS idx_proveedores_nombre ON proveedores (nombre) INCLUDE (primera_factura, ultima_factura, nit);
+
+INSERT INTO proveedores (nit, nombre, primera_factura, ultima_factura)
+SELECT normalizar_nit(nit), (array_agg(proveedor ORDER BY fecha DESC, id DESC))[1], MIN(fecha), MAX(fecha)
+FROM facturas
+GROUP BY 1
+ON CONFLICT (nit) DO NOTHING;
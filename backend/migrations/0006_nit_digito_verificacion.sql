@@ -0,0 +1,74 @@
+-- normalizar_nit también quita el dígito de verificación pegado sin guion: algunos
+-- emisores escriben '9001234567' en vez de '900123456-7', y esas facturas quedaban
+-- con otra clave en proveedores. Solo se reconoce en NITs de persona jurídica
+-- (10 dígitos que empiezan por 8 o 9) cuyo último dígito es el DV de los 9
+-- primeros; una cédula se conserva completa.
+-- Igual que nit_check_digit / normalize_nit (src/domain/models/proveedor.py)
+
+CREATE OR REPLACE FUNCTION nit_digito_verificacion(p_base TEXT) RETURNS INTEGER AS $$
+    SELECT CASE WHEN s % 11 < 2 THEN s % 11 ELSE 11 - s % 11 END
+    FROM (
+        SELECT COALESCE(SUM(
+            substr(reverse(p_base), i, 1)::INTEGER
+            * (ARRAY[3, 7, 13, 17, 19, 23, 29, 37, 41, 43, 47, 53, 59, 67, 71])[i]
+        ), 0) AS s
+        FROM generate_series(1, length(p_base)) AS i
+    ) t;
+$$ LANGUAGE sql IMMUTABLE STRICT;
+
+CREATE OR REPLACE FUNCTION normalizar_nit(p_nit TEXT) RETURNS TEXT AS $$
+    SELECT CASE
+        WHEN d ~ '^[89][0-9]{9}$' AND nit_digito_verificacion(left(d, 9)) = right(d, 1)::INTEGER THEN left(d, 9)
+        ELSE d
+    END
+    FROM (
+        SELECT COALESCE(NULLIF(regexp_replace(split_part(btrim(p_nit), '-', 1), '\D', '', 'g'), ''), btrim(p_nit)) AS d
+    ) t;
+$$ LANGUAGE sql IMMUTABLE STRICT;
+
+-- Mismo criterio que 0005: se normaliza salvo que choque con una factura ya guardada
+-- con el NIT normalizado (el mismo documento importado dos veces)
+UPDATE facturas f
+SET nit = normalizar_nit(f.nit)
+WHERE f.nit <> normalizar_nit(f.nit)
+  AND NOT EXISTS (
+      SELECT 1 FROM facturas g WHERE g.nit = normalizar_nit(f.nit) AND g.factura = f.factura
+  )
+  AND f.id = (
+      SELECT MIN(h.id) FROM facturas h WHERE normalizar_nit(h.nit) = normalizar_nit(f.nit) AND h.factura = f.factura
+  );
+
+-- Las que chocaron (aquí o en 0005) quedan registradas para revisarlas a mano:
+-- normalmente son duplicados de la factura que ya tiene el NIT normalizado
+CREATE TABLE IF NOT EXISTS facturas_nit_conflictos (
+    factura_id INTEGER PRIMARY KEY,
+    nit VARCHAR(20) NOT NULL,
+    nit_normalizado VARCHAR(20) NOT NULL,
+    factura VARCHAR(50) NOT NULL,
+    detectado_en TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO facturas_nit_conflictos (factura_id, nit, nit_normalizado, factura)
+SELECT id, nit, normalizar_nit(nit), factura
+FROM facturas
+WHERE nit <> normalizar_nit(nit)
+ON CONFLICT (factura_id) DO NOTHING;
+
+DO $$
+DECLARE
+    pendientes INTEGER;
+BEGIN
+    SELECT COUNT(*) INTO pendientes FROM facturas_nit_conflictos;
+    IF pendientes > 0 THEN
+        RAISE WARNING '% facturas conservan un NIT sin normalizar porque ya existe la misma factura con el NIT normalizado; ver facturas_nit_conflictos', pendientes;
+    END IF;
+END $$;
+
+-- La dimensión se reconstruye: los proveedores guardados con el DV pegado se
+-- funden con su NIT normalizado
+DELETE FROM proveedores;
+
+INSERT INTO proveedores (nit, nombre, primera_factura, ultima_factura)
+SELECT normalizar_nit(nit), (array_agg(proveedor ORDER BY fecha DESC, id DESC))[1], MIN(fecha), MAX(fecha)
+FROM facturas
+GROUP BY 1;
@@ -0,0 +1,87 @@
+-- Particionado declarativo de facturas por año (opcional: Scripts/migrate.py --partition-by-year).
+--
+-- Las consultas por rango de fechas del dashboard solo recorren las particiones
+-- de los años pedidos. En una tabla particionada toda restricción única debe
+-- incluir la columna de partición, por eso:
+--   - la clave primaria pasa a (id, fecha) y la unicidad a (nit, factura, fecha);
+--     el repositorio inserta con ON CONFLICT DO NOTHING sin columnas, válido en
+--     ambos esquemas (el número y la fecha de emisión de una factura no cambian)
+--   - factura_lineas pierde la FK hacia facturas (no puede apuntar solo a id)
+-- Las fechas sin partición caen en facturas_default; facturas_crear_particion(anio)
+-- crea la partición del año y mueve allí sus filas. El migrador la llama en cada
+-- ejecución para el año actual y el siguiente.
+
+CREATE OR REPLACE FUNCTION facturas_crear_particion(p_anio INTEGER) RETURNS void AS $$
+DECLARE
+    v_nombre TEXT := format('facturas_%s', p_anio);
+    v_desde DATE := make_date(p_anio, 1, 1);
+    v_hasta DATE := make_date(p_anio + 1, 1, 1);
+BEGIN
+    IF to_regclass(v_nombre) IS NOT NULL THEN
+        RETURN;
+    END IF;
+
+    -- La partición no se puede crear mientras la de defecto tenga filas de su rango
+    CREATE TEMP TABLE facturas_por_mover ON COMMIT DROP AS
+        SELECT * FROM facturas_default WHERE fecha >= v_desde AND fecha < v_hasta;
+    DELETE FROM facturas_default WHERE fecha >= v_desde AND fecha < v_hasta;
+
+    EXECUTE format('CREATE TABLE %I PARTITION OF facturas FOR VALUES FROM (%L) TO (%L)', v_nombre, v_desde, v_hasta);
+
+    INSERT INTO facturas SELECT * FROM facturas_por_mover;
+    DROP TABLE facturas_por_mover;
+END;
+$$ LANGUAGE plpgsql;
+
+LOCK TABLE facturas IN ACCESS EXCLUSIVE MODE;
+
+ALTER TABLE factura_lineas DROP CONSTRAINT IF EXISTS factura_lineas_factura_id_fkey;
+DROP TRIGGER IF EXISTS trg_facturas_resumen ON facturas;
+ALTER TABLE facturas RENAME TO facturas_sin_particion;
+
+-- Sin restricciones todavía: sus índices chocarían con los de la tabla anterior
+CREATE TABLE facturas (
+    id INTEGER NOT NULL DEFAULT nextval('facturas_id_seq'),
+    fecha DATE NOT NULL,
+    nit VARCHAR(20) NOT NULL,
+    proveedor VARCHAR(255) NOT NULL,
+    factura VARCHAR(50) NOT NULL,
+    subtotal DECIMAL(15, 2) NOT NULL DEFAULT 0,
+    descuentos DECIMAL(15, 2) NOT NULL DEFAULT 0,
+    iva DECIMAL(15, 2) NOT NULL DEFAULT 0,
+    total DECIMAL(15, 2) NOT NULL DEFAULT 0,
+    nombre_xml VARCHAR(255),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+) PARTITION BY RANGE (fecha);
+
+-- La secuencia de ids pasa a la tabla nueva antes de borrar la anterior
+ALTER SEQUENCE facturas_id_seq OWNED BY facturas.id;
+
+CREATE TABLE facturas_default PARTITION OF facturas DEFAULT;
+
+-- Un año por partición, desde la factura más antigua hasta el año siguiente al actual
+SELECT facturas_crear_particion(anio)
+FROM generate_series(
+    (SELECT COALESCE(EXTRACT(YEAR FROM MIN(fecha))::int, EXTRACT(YEAR FROM CURRENT_DATE)::int) FROM facturas_sin_particion),
+    EXTRACT(YEAR FROM CURRENT_DATE)::int + 1
+) AS anio;
+
+-- El resumen mensual ya tiene estas facturas: el trigger se crea después de copiarlas
+INSERT INTO facturas (id, fecha, nit, proveedor, factura, subtotal, descuentos, iva, total, nombre_xml, created_at)
+SELECT id, fecha, nit, proveedor, factura, subtotal, descuentos, iva, total, nombre_xml, created_at
+FROM facturas_sin_particion;
+
+DROP TABLE facturas_sin_particion;
+
+ALTER TABLE facturas ADD PRIMARY KEY (id, fecha);
+ALTER TABLE facturas ADD CONSTRAINT facturas_nit_factura_fecha_key UNIQUE (nit, factura, fecha);
+
+CREATE INDEX idx_facturas_proveedor ON facturas (proveedor);
+CREATE INDEX idx_facturas_fecha_proveedor
+    ON facturas (fecha DESC, proveedor, id)
+    INCLUDE (nit, factura, subtotal, descuentos, iva, total, nombre_xml);
+CREATE INDEX idx_facturas_fecha_brin ON facturas USING brin (fecha);
+
+CREATE TRIGGER trg_facturas_resumen
+    AFTER INSERT OR UPDATE OR DELETE ON facturas
+    FOR EACH ROW EXECUTE FUNCTION facturas_resumen_trigger();
@@ -0,0 +1,62 @@
+import os
+import fnmatch
+from typing import Iterator, Optional, Sequence
+
+# Carpetas que genera la propia aplicación (exportaciones y reportes) y no contienen facturas
+DEFAULT_EXCLUDED_DIRS = ('Exportadas', 'Reportes')
+DEFAULT_INCLUDE_PATTERNS = ('*.xml',)
+
+
+def _matches(rel_path: str, patterns: Sequence[str]) -> bool:
+    # Patrones sin "/" se comparan con el nombre; con "/" con la ruta relativa. Sin distinguir mayúsculas.
+    rel_path = rel_path.lower()
+    name = rel_path.rsplit('/', 1)[-1]
+    for pattern in patterns:
+        pattern = pattern.lower()
+        if fnmatch.fnmatchcase(rel_path if '/' in pattern else name, pattern):
+            return True
+    return False
+
+
+def iter_xml_files(
+    directory: str,
+    recursive: bool = False,
+    include_patterns: Optional[Sequence[str]] = None,
+    exclude_patterns: Optional[Sequence[str]] = None,
+    exclude_dirs: Optional[Sequence[str]] = None,
+) -> Iterator[str]:
+    """
+    Genera las rutas de los XML candidatos de un directorio, sin construir la lista completa.
+
+    Usa os.scandir (el tipo de entrada viene del propio listado, sin stat extra) y
+    recorre en profundidad con una pila de directorios pendientes, así la memoria
+    depende de la profundidad del árbol y no del número de archivos. Las entradas
+    de cada carpeta se ordenan para que el resultado sea determinista. Los enlaces
+    simbólicos a carpetas no se siguen (un enlace a un ancestro haría un ciclo);
+    los enlaces a archivos sí se incluyen.
+    """
+    include_patterns = include_patterns or DEFAULT_INCLUDE_PATTERNS
+    exclude_patterns = exclude_patterns or ()
+    excluded_dir_names = {d.lower() for d in (DEFAULT_EXCLUDED_DIRS if exclude_dirs is None else exclude_dirs)}
+
+    pending = [(directory, '')]
+    while pending:
+        current_dir, rel_dir = pending.pop()
+        try:
+            with os.scandir(current_dir) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            continue
+
+        subdirs = []
+        for entry in entries:
+            rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            if entry.is_dir(follow_symlinks=False):
+                if recursive and entry.name.lower() not in excluded_dir_names and not _matches(rel_path, exclude_patterns):
+                    subdirs.append((entry.path, rel_path))
+            elif entry.is_file():
+                if _matches(rel_path, include_patterns) and not _matches(rel_path, exclude_patterns):
+                    yield entry.path
+
+        # Invertidas para que la pila visite las subcarpetas en orden alfabético
+        pending.extend(reversed(subdirs))
@@ -0,0 +1,136 @@
+import os
+import csv
+from fpdf import FPDF
+from openpyxl import Workbook
+from typing import Any, Dict, List
+
+# Encabezados del Excel "humano" (columna de la BD -> título)
+EXCEL_HEADERS = {
+    'fecha': 'Fecha', 'proveedor': 'Proveedor', 'nit': 'NIT',
+    'factura': 'Factura', 'subtotal': 'Subtotal', 'iva': 'IVA',
+    'total': 'Total', 'nombre_xml': 'Archivo XML'
+}
+
+# Formato contable del CSV
+CSV_FIELDS = ['fecha', 'descripcion', 'referencia', 'valor', 'moneda_id', 'cuenta_id', 'terceroid', 'grupoid', 'conceptoid']
+
+PDF_COLUMNS = [
+    ("Fecha", 25), ("Proveedor", 70), ("NIT", 30),
+    ("Factura", 35), ("Subtotal", 30), ("IVA", 25), ("Total", 30)
+]
+
+
+def _remove_partial(path: str):
+    """Borra un archivo de salida incompleto (si llegó a crearse)."""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class ExcelStreamWriter:
+    """Excel en modo write_only de openpyxl: cada fila se serializa al agregarla, sin DataFrame."""
+
+    def __init__(self, path: str, columns: List[str]):
+        self.path = path
+        self.columns = columns
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet("Sheet1")
+        self.sheet.append([EXCEL_HEADERS.get(c, c) for c in columns])
+
+    def write(self, rows: List[Dict[str, Any]]):
+        columns = self.columns
+        for item in rows:
+            self.sheet.append([item.get(c) for c in columns])
+
+    def close(self):
+        self.workbook.save(self.path)
+
+    def abort(self):
+        # Las filas van a un temporal de openpyxl hasta save(): se cierra ese flujo
+        try:
+            if not self.sheet.closed:
+                self.sheet.close()
+        except Exception:
+            pass
+        _remove_partial(self.path)
+
+
+class CsvStreamWriter:
+    """CSV contable escrito fila a fila."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.DictWriter(self.file, fieldnames=CSV_FIELDS)
+        self.writer.writeheader()
+
+    def write(self, rows: List[Dict[str, Any]]):
+        self.writer.writerows({
+            'fecha': item['fecha'],
+            'descripcion': f"Compra {item['proveedor']} Fact {item['factura']}",
+            'referencia': item['factura'],
+            'valor': -abs(item['total']),
+            'moneda_id': 1,
+            'cuenta_id': '',
+            'terceroid': '',
+            'grupoid': '',
+            'conceptoid': ''
+        } for item in rows)
+
+    def close(self):
+        self.file.close()
+
+    def abort(self):
+        self.file.close()
+        _remove_partial(self.path)
+
+
+class PdfStreamWriter:
+    """
+    Reporte PDF alimentado por bloques de filas.
+
+    FPDF arma el documento en memoria hasta output(), así que aquí el ahorro es no
+    tener además la lista completa de facturas; las filas se descartan al dibujarse.
+    """
+
+    def __init__(self, path: str, today_str: str):
+        self.path = path
+        self.pdf = FPDF(orientation='L', unit='mm', format='A4')
+        pdf = self.pdf
+        pdf.add_page()
+        pdf.set_font("Arial", 'B', 16)
+        pdf.cell(0, 10, "Reporte de Facturas Recibidas", ln=True, align='C')
+        pdf.set_font("Arial", '', 10)
+        pdf.cell(0, 10, f"Fecha de generación: {today_str}", ln=True, align='R')
+        pdf.ln(5)
+
+        # Encabezados de tabla
+        pdf.set_font("Arial", 'B', 10)
+        pdf.set_fill_color(240, 240, 240)
+        for col_name, width in PDF_COLUMNS:
+            pdf.cell(width, 10, col_name, border=1, align='C', fill=True)
+        pdf.ln()
+
+        # Datos de la tabla
+        pdf.set_font("Arial", '', 9)
+
+    def write(self, rows: List[Dict[str, Any]]):
+        pdf = self.pdf
+        for item in rows:
+            pdf.cell(25, 8, str(item['fecha']), border=1)
+            # Truncar proveedor si es muy largo
+            prov = str(item['proveedor'])[:35]
+            pdf.cell(70, 8, prov, border=1)
+            pdf.cell(30, 8, str(item['nit']), border=1)
+            pdf.cell(35, 8, str(item['factura']), border=1)
+            pdf.cell(30, 8, f"{item['subtotal']:,.2f}", border=1, align='R')
+            pdf.cell(25, 8, f"{item['iva']:,.2f}", border=1, align='R')
+            pdf.cell(30, 8, f"{item['total']:,.2f}", border=1, align='R')
+            pdf.ln()
+
+    def close(self):
+        self.pdf.output(self.path)
+
+    def abort(self):
+        _remove_partial(self.path)
@@ -1,208 +1,230 @@
 import os
-import csv
-import pandas as pd
 import shutil
-from fpdf import FPDF
-from lxml import etree
-from datetime import datetime
-from typing import List, Dict, Any, Set, Optional
+from itertools import islice, chain
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, date, timedelta
+from typing import List, Dict, Any, Set, Optional, Iterable
+from src.application.services.ubl_parser import parse_ubl_file
+from src.application.services.invoice_filenames import parse_invoice_filename, safe_supplier_name
+from src.application.services.directory_scanner import iter_xml_files
+from src.application.services.ubl_sniffer import sniff_file, DOCUMENT_OTHER
+from src.application.services.export_writers import ExcelStreamWriter, CsvStreamWriter, PdfStreamWriter
+from src.domain.ports.parse_cache import ParseCache, ParseResult
+from src.domain.models.proveedor import normalize_nit
 
-class ExporterService:
-    def __init__(self):
-        self.ns = {
-            'cac': 'urn:oasis:names:specification:ubl:schema:xsd:CommonAggregateComponents-2',
-            'cbc': 'urn:oasis:names:specification:ubl:schema:xsd:CommonBasicComponents-2',
-        }
+# Margen al descartar por la fecha del nombre de archivo: solo se descartan sin
+# parsear los que están claramente fuera del rango; los demás se parsean y se
+# filtran con la fecha real del XML
+PREFILTER_DATE_MARGIN = timedelta(days=3)
+
+# Archivos que se reparten por trabajador en cada lote del modo paralelo
+PARALLEL_BATCH_PER_WORKER = 64
+
+# Filas por bloque al exportar desde la BD (repository.iter_invoices)
+EXPORT_CHUNK_SIZE = 2000
+
+# Facturas por lote en import_to_db (repository.save_many / check_exists_many)
+DEFAULT_SAVE_BATCH_SIZE = 500
+
+
+def _parse_xml_invoice_worker(file_path: str) -> tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """Punto de entrada en los procesos del pool (debe ser una función de módulo para poder serializarse)."""
+    return ExporterService().parse_xml_invoice(file_path)
 
-    def _get_text(self, element, xpath):
-        result = element.xpath(xpath, namespaces=self.ns)
-        return result[0].text.strip() if result else ""
 
+def _batched(iterable, size: int):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class ExporterService:
     def parse_xml_invoice(self, file_path: str) -> tuple[Optional[Dict[str, Any]], Optional[str]]:
-        """Extrae metadatos de un archivo XML de factura. Retorna (data, error_msg)"""
+        """Extrae metadatos y líneas (columnares, en 'lineas') de un archivo XML de factura. Retorna (data, error_msg)"""
+        invoice, error = parse_ubl_file(file_path, with_lines=True)
+        if not invoice:
+            return None, error
+
+        return {
+            'fecha': invoice.issue_date,
+            'proveedor': invoice.supplier_name,
+            'nit': invoice.nit,
+            'factura': invoice.invoice_number,
+            'subtotal': invoice.subtotal,
+            'descuentos': invoice.discounts,
+            'iva': invoice.tax,
+            'total': invoice.total,
+            'nombre_xml': os.path.basename(file_path),
+            'lineas': invoice.lines
+        }, None
+
+    def _iter_parsed(self, candidates: Iterable[tuple[str, str, Optional[ParseResult]]], parse_cache: Optional[ParseCache], workers: int):
+        """
+        Recibe (ruta, tipo_documento, resultado_en_cache) y genera (ruta, tipo_documento, (data, error_msg), desde_cache)
+        en el mismo orden de entrada. Solo se parsean los que no traen resultado de la caché.
+
+        Con workers > 1 esos archivos se parsean en un pool de procesos, por lotes y
+        repartidos en bloques (chunksize) para reducir la sobrecarga de comunicación.
+        executor.map conserva el orden de entrada.
+        """
+        if workers <= 1:
+            for file_path, document_type, cached in candidates:
+                if cached is not None:
+                    yield file_path, document_type, cached, True
+                    continue
+                result = self.parse_xml_invoice(file_path)
+                if parse_cache is not None:
+                    parse_cache.put(file_path, result, document_type)
+                yield file_path, document_type, result, False
+            return
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for batch in _batched(candidates, workers * PARALLEL_BATCH_PER_WORKER):
+                misses = [p for p, _, cached in batch if cached is None]
+                chunksize = max(1, len(misses) // (workers * 4))
+                parsed = executor.map(_parse_xml_invoice_worker, misses, chunksize=chunksize)
+
+                for file_path, document_type, cached in batch:
+                    if cached is not None:
+                        yield file_path, document_type, cached, True
+                        continue
+                    result = next(parsed)
+                    if parse_cache is not None:
+                        parse_cache.put(file_path, result, document_type)
+                    yield file_path, document_type, result, False
+
+    def _check_batch(self, repository: Any, pending: List[tuple[Dict[str, Any], Dict[str, Any]]]) -> Counter:
+        """Previsualización de un lote: una sola consulta de existencia. Retorna el conteo por estado."""
+        existing = repository.check_exists_many([(data['nit'], data['factura']) for _, data in pending])
+        counts = Counter()
+        for res, data in pending:
+            if (data['nit'], data['factura']) in existing:
+                res["status"] = "duplicate"
+                res["message"] = "Ya existe en la base de datos"
+            else:
+                res["status"] = "success"
+            counts[res["status"]] += 1
+        return counts
+
+    def _save_batch(self, repository: Any, pending: List[tuple[Dict[str, Any], Dict[str, Any]]]) -> Counter:
+        """Guarda un lote con save_many y marca el estado de cada resultado. Retorna el conteo por estado."""
+        statuses = repository.save_many([data for _, data in pending])
+        counts = Counter()
+        for (res, _), (save_status, save_msg) in zip(pending, statuses):
+            if save_status == 'inserted':
+                res["status"] = "success"
+            elif save_status == 'updated':
+                res["status"] = "duplicate"
+                res["message"] = "Ya existe (omitido por conflicto)"
+            else:
+                res["status"] = "error"
+                res["message"] = save_msg or "Error desconocido al guardar"
+            counts[res["status"]] += 1
+        return counts
+
+    def _prefilter_by_filename(self, filename: str, start_date: Optional[date], end_date: Optional[date], provider: Optional[str]) -> bool:
+        """True si el nombre "{fecha} {proveedor}.xml" permite descartar el archivo sin parsearlo."""
+        parsed = parse_invoice_filename(filename)
+        if not parsed:
+            return False
+        file_date_str, file_supplier = parsed
         try:
-            tree = etree.parse(file_path)
-            root = tree.getroot()
-            
-            # Manejar AttachedDocument con Invoice embebido
-            if etree.QName(root).localname == 'AttachedDocument':
-                description = self._get_text(root, '//*[local-name()="Attachment"]//*[local-name()="Description"]')
-                if description and '<Invoice' in description:
-                    xml_start = description.find('<Invoice')
-                    xml_end = description.rfind('</Invoice>') + len('</Invoice>')
-                    inner_xml = description[xml_start:xml_end]
-                    root = etree.fromstring(inner_xml.encode('utf-8'))
-
-            # Extraer metadatos - IMPORTANTE: Iterar SOLO hijos directos para evitar UBLExtensions
-            invoice_id = None
-            issue_date = None
-            
-            # Intentar primero con ParentDocumentID (AttachedDocument)
-            invoice_id = self._get_text(root, '//*[local-name()="ParentDocumentID"]')
-            
-            # Buscar ID e IssueDate en los hijos directos del root (evita UBLExtensions)
-            for child in root:
-                localname = etree.QName(child).localname
-                if localname == 'IssueDate' and child.text and not issue_date:
-                    issue_date = child.text
-                elif localname == 'ID' and child.text and not invoice_id:
-                    invoice_id = child.text
-            
-            supplier_name = self._get_text(root, '//*[local-name()="SenderParty"]//*[local-name()="RegistrationName"]') or \
-                            self._get_text(root, '//*[local-name()="AccountingSupplierParty"]//*[local-name()="RegistrationName"]') or \
-                            self._get_text(root, '//*[local-name()="PartyName"]//*[local-name()="Name"]')
-            
-            nit = self._get_text(root, '//*[local-name()="SenderParty"]//*[local-name()="CompanyID"]') or \
-                  self._get_text(root, '//*[local-name()="AccountingSupplierParty"]//*[local-name()="CompanyID"]')
-
-            # DEBUG INICIAL: Ver qué tipo de documento es y qué valores extrae
-            # doc_type = etree.QName(root).localname
-            # print(f"\n📄 DEBUG INICIO - Archivo: {os.path.basename(file_path)}")
-            # print(f"  Tipo de documento: {doc_type}")
-            # print(f"  Proveedor (inicial): {supplier_name}")
-            # print(f"  NIT (inicial): {nit}")
-            # print(f"  Invoice ID (inicial): {invoice_id}")
-            # print(f"  Fecha (inicial): {issue_date}")
-
-            # Intentar extraer valores financieros del documento principal
-            total_amount = self._get_text(root, '//*[local-name()="LegalMonetaryTotal"]//*[local-name()="PayableAmount"]')
-            tax_amount = self._get_text(root, '//*[local-name()="TaxTotal"]/*[local-name()="TaxAmount"]')
-            subtotal = self._get_text(root, '//*[local-name()="LegalMonetaryTotal"]//*[local-name()="LineExtensionAmount"]')
-            allowance = self._get_text(root, '//*[local-name()="LegalMonetaryTotal"]//*[local-name()="AllowanceTotalAmount"]')
-
-            # Si es un AttachedDocument, SIEMPRE buscar en el XML embebido (Invoice o CreditNote)
-            # para obtener los datos reales del documento, no del contenedor
-            is_credit_note = False
-            if etree.QName(root).localname == 'AttachedDocument':
-                # Buscar en el Description del Attachment
-                description = self._get_text(root, '//*[local-name()="Attachment"]//*[local-name()="Description"]')
-                if description:
-                    # Buscar Invoice o CreditNote embebido
-                    inner_xml_start = -1
-                    inner_xml_end = -1
-                    
-                    for doc_type in ['<Invoice', '<CreditNote']:
-                        if doc_type in description:
-                            inner_xml_start = description.find(doc_type)
-                            close_tag = '</Invoice>' if doc_type == '<Invoice' else '</CreditNote>'
-                            inner_xml_end = description.rfind(close_tag) + len(close_tag)
-                            is_credit_note = (doc_type == '<CreditNote')
-                            break
-                    
-                    if inner_xml_start != -1 and inner_xml_end != -1:
-                        try:
-                            inner_xml = description[inner_xml_start:inner_xml_end]
-                            inner_root = etree.fromstring(inner_xml.encode('utf-8'))
-                            
-                            # Extraer valores del documento embebido (PRIORITARIO)
-                            inner_total = self._get_text(inner_root, '//*[local-name()="LegalMonetaryTotal"]//*[local-name()="PayableAmount"]')
-                            inner_tax = self._get_text(inner_root, '//*[local-name()="TaxTotal"]/*[local-name()="TaxAmount"]')
-                            inner_subtotal = self._get_text(inner_root, '//*[local-name()="LegalMonetaryTotal"]//*[local-name()="LineExtensionAmount"]')
-                            inner_allowance = self._get_text(inner_root, '//*[local-name()="LegalMonetaryTotal"]//*[local-name()="AllowanceTotalAmount"]')
-                            
-                            # Sobrescribir con valores del documento interno si existen
-                            if inner_total:
-                                total_amount = inner_total
-                            if inner_tax:
-                                tax_amount = inner_tax
-                            if inner_subtotal:
-                                subtotal = inner_subtotal
-                            if inner_allowance:
-                                allowance = inner_allowance
-                            
-                            # También extraer NIT, proveedor, fecha e ID del documento interno (PRIORITARIO)
-                            inner_nit = self._get_text(inner_root, '//*[local-name()="AccountingSupplierParty"]//*[local-name()="CompanyID"]') or \
-                                       self._get_text(inner_root, '//*[local-name()="SenderParty"]//*[local-name()="CompanyID"]')
-                            if inner_nit:
-                                nit = inner_nit
-                            
-                            inner_supplier = self._get_text(inner_root, '//*[local-name()="AccountingSupplierParty"]//*[local-name()="RegistrationName"]') or \
-                                           self._get_text(inner_root, '//*[local-name()="PartyName"]//*[local-name()="Name"]')
-                            if inner_supplier:
-                                supplier_name = inner_supplier
-                            
-                            # DEBUG: Ver qué estamos extrayendo
-                            # print(f"\n🔍 DEBUG - Procesando AttachedDocument:")
-                            # print(f"  NIT: {nit}")
-                            # print(f"  Proveedor: {supplier_name}")
-                            # print(f"  Fecha (antes): {issue_date}")
-                            # print(f"  Invoice ID (antes): {invoice_id}")
-                            
-                            # IMPORTANTE: Extraer fecha e ID excluyendo UBLExtensions
-                            # Las extensiones pueden tener <ID> y <IssueDate> con valores diferentes
-                            # Buscamos directamente como hijos del elemento raíz (Invoice/CreditNote)
-                            for child in inner_root:
-                                localname = etree.QName(child).localname
-                                if localname == 'IssueDate' and child.text:
-                                    # print(f"  ✅ Encontré IssueDate directo: {child.text}")
-                                    issue_date = child.text
-                                elif localname == 'ID' and child.text:
-                                    # print(f"  ✅ Encontré ID directo: {child.text}")
-                                    invoice_id = child.text
-                            
-                            # print(f"  Fecha (después): {issue_date}")
-                            # print(f"  Invoice ID (después): {invoice_id}")
-                        except Exception as e:
-                            # Si falla el parseo del XML interno, continuamos con los valores que ya tenemos
-                            # print(f"❌ ERROR en parsing embebido: {e}")
-                            pass
-
-            if not invoice_id:
-                return None, "No se encontró ID de factura o ParentDocumentID en el XML"
-            if not supplier_name:
-                return None, "No se encontró el nombre del proveedor en el XML"
-
-            # Convertir a float y aplicar valores negativos si es nota crédito
-            subtotal_val = float(subtotal or 0)
-            descuentos_val = float(allowance or 0)
-            iva_val = float(tax_amount or 0)
-            total_val = float(total_amount or 0)
-            
-            # Los descuentos SIEMPRE son negativos (reducen el total)
-            if descuentos_val > 0:
-                descuentos_val = -descuentos_val
-            
-            if is_credit_note:
-                subtotal_val = -abs(subtotal_val)
-                # descuentos_val ya es negativo, al invertir se vuelve positivo en nota crédito
-                descuentos_val = abs(descuentos_val)
-                iva_val = -abs(iva_val)
-                total_val = -abs(total_val)
-
-            return {
-                'fecha': issue_date,
-                'proveedor': supplier_name,
-                'nit': nit,
-                'factura': invoice_id,
-                'subtotal': subtotal_val,
-                'descuentos': descuentos_val,
-                'iva': iva_val,
-                'total': total_val,
-                'nombre_xml': os.path.basename(file_path)
-            }, None
-        except Exception as e:
-            return None, str(e)
-
-    def import_to_db(self, directory: str, repository: Any, dry_run: bool = False, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        """Procesa XMLs de un directorio y los guarda en la BD (o solo previsualiza)."""
+            file_date = date.fromisoformat(file_date_str)
+        except ValueError:
+            return False
+
+        if start_date and file_date < start_date - PREFILTER_DATE_MARGIN:
+            return True
+        if end_date and file_date > end_date + PREFILTER_DATE_MARGIN:
+            return True
+        # El nombre guarda el proveedor limpio: si no coincide con el filtro limpio, no puede ser igual
+        if provider and safe_supplier_name(provider).upper() != file_supplier.upper():
+            return True
+        return False
+
+    def _iter_candidates(self, directory: str, scan_options: Dict[str, Any], filters: Dict[str, Any], counters: Dict[str, Any], skipped: List[Dict[str, str]], parse_cache: Optional[ParseCache] = None, provider_nits: Optional[Set[str]] = None):
+        """
+        Etapa de escaneo + pre-filtro + clasificación: genera (ruta, tipo_documento, resultado_en_cache).
+
+        Es un generador encadenado al escaneo de directorio, de modo que los archivos
+        fluyen hacia el parseo sin construir la lista completa. Actualiza counters
+        ('found', 'prefiltered', 'document_types') a medida que avanza. Los XML que no
+        son facturas (firmas, ApplicationResponse, ...) se detectan leyendo solo el
+        elemento raíz y van a skipped sin parsearse. Un acierto en parse_cache trae
+        también el tipo de documento, así que esos archivos no se leen.
+        """
+        start_date = filters.get('start_date')
+        end_date = filters.get('end_date')
+        provider = filters.get('provider')
+        if provider_nits:
+            # El proveedor también coincide por NIT (otras grafías del nombre) y el nombre
+            # del archivo no trae el NIT: por proveedor no se puede descartar sin parsear
+            provider = None
+        prefilter = bool(start_date or end_date or provider)
+        prefilter_start = date.fromisoformat(str(start_date)) if start_date else None
+        prefilter_end = date.fromisoformat(str(end_date)) if end_date else None
+
+        for file_path in iter_xml_files(directory, **scan_options):
+            counters['found'] += 1
+            # Pre-filtro por nombre de archivo: evita parsear lo que está claramente fuera de los filtros
+            if prefilter and self._prefilter_by_filename(os.path.basename(file_path), prefilter_start, prefilter_end, provider):
+                counters['prefiltered'] += 1
+                continue
+
+            cached = parse_cache.get(file_path) if parse_cache is not None else None
+            if cached is not None:
+                result, document_type = cached
+            else:
+                result, document_type = None, sniff_file(file_path)
+            counters['document_types'][document_type] = counters['document_types'].get(document_type, 0) + 1
+            if document_type == DOCUMENT_OTHER:
+                skipped.append({"nombre_xml": os.path.basename(file_path), "document_type": document_type})
+                continue
+            yield file_path, document_type, result
+
+    def import_to_db(self, directory: str, repository: Any, dry_run: bool = False, filters: Optional[Dict[str, Any]] = None, parse_cache: Optional[ParseCache] = None, workers: int = 1, scan_options: Optional[Dict[str, Any]] = None, batch_size: int = DEFAULT_SAVE_BATCH_SIZE) -> Dict[str, Any]:
+        """Procesa XMLs de un directorio y los guarda en la BD (o solo previsualiza).
+
+        Con parse_cache solo se parsean los archivos nuevos o modificados desde la última ejecución.
+        Con workers > 1 el parseo se hace en paralelo en varios procesos (opcional).
+        scan_options se pasa a iter_xml_files (recursive, include_patterns, exclude_patterns, exclude_dirs).
+        Las facturas se guardan con repository.save_many en lotes de batch_size; en
+        previsualización los duplicados se buscan con repository.check_exists_many por lote.
+        """
         if not os.path.exists(directory):
             return {"status": "error", "message": f"Directorio no encontrado: {directory}"}
 
-        files = [f for f in os.listdir(directory) if f.lower().endswith('.xml')]
         count_imported = 0
         count_duplicates = 0
         count_errors = 0
         count_filtered = 0
+        count_cached = 0
         results = []
+        skipped = []
+        pending = []
+        batch_counts = Counter()
+        batch_size = max(1, batch_size or 1)
+        process_batch = self._check_batch if dry_run else self._save_batch
+        scan_options = scan_options or {}
+        counters = {'found': 0, 'prefiltered': 0, 'document_types': {}}
         
         # Extraer filtros si existen
         filter_start_date = filters.get('start_date') if filters else None
         filter_end_date = filters.get('end_date') if filters else None
         filter_provider = filters.get('provider') if filters else None
         
-        for filename in files:
-            file_path = os.path.join(directory, filename)
-            data, parse_error = self.parse_xml_invoice(file_path)
+        # No tiene sentido usar más procesos que núcleos
+        workers = max(1, min(workers or 1, os.cpu_count() or 1))
+        # El filtro de proveedor suele ser un nombre canónico de la dimensión (lista de
+        # proveedores): también coinciden las facturas de sus NIT con otra grafía del nombre
+        provider_nits = repository.get_provider_nits(filter_provider) if filter_provider else set()
+        candidates = self._iter_candidates(directory, scan_options, filters or {}, counters, skipped, parse_cache, provider_nits)
+
+        for file_path, document_type, (data, parse_error), from_cache in self._iter_parsed(candidates, parse_cache, workers):
+            filename = os.path.basename(file_path)
+            if from_cache:
+                count_cached += 1
             
             # Aplicar filtros si están definidos y hay datos válidos
             if data:
@@ -222,7 +244,7 @@ class ExporterService:
                 
                 # Filtrar por proveedor
                 if filter_provider and data.get('proveedor') and not skip_record:
-                    if data['proveedor'] != filter_provider:
+                    if data['proveedor'] != filter_provider and normalize_nit(data.get('nit')) not in provider_nits:
                         count_filtered += 1
                         skip_record = True
                 
@@ -239,166 +261,152 @@ class ExporterService:
                 "descuentos": data.get('descuentos', 0) if data else 0,
                 "iva": data.get('iva', 0) if data else 0,
                 "total": data.get('total', 0) if data else 0,
+                "lineas": len(data['lineas']['linea']) if data and data.get('lineas') else 0,
                 "nombre_xml": filename,
+                "document_type": document_type,
                 "attachments": [filename],
                 "status": "pending",
                 "message": None
             }
 
             if data:
-                if dry_run:
-                    # En previsualización solo verificamos si ya existe
-                    exists = repository.check_exists(data['nit'], data['factura'])
-                    if exists:
-                        count_duplicates += 1
-                        res["status"] = "duplicate"
-                        res["message"] = "Ya existe en la base de datos"
-                    else:
-                        count_imported += 1
-                        res["status"] = "success"
-                else:
-                    # En modo normal, guardamos
-                    save_status, save_msg = repository.save(data)
-                    if save_status == 'inserted':
-                        count_imported += 1
-                        res["status"] = "success"
-                    elif save_status == 'updated':
-                        count_duplicates += 1
-                        res["status"] = "duplicate"
-                        res["message"] = "Ya existe (omitido por conflicto)"
-                    else:
-                        count_errors += 1
-                        res["status"] = "error"
-                        res["message"] = save_msg or "Error desconocido al guardar"
+                # Por lotes: en previsualización una consulta de existencia por lote,
+                # en modo normal una transacción por cada batch_size facturas
+                pending.append((res, data))
+                if len(pending) >= batch_size:
+                    batch_counts.update(process_batch(repository, pending))
+                    pending = []
             else:
                 count_errors += 1
                 res["status"] = "error"
                 res["message"] = parse_error or "Error al analizar el XML"
             
             results.append(res)
+
+        if pending:
+            batch_counts.update(process_batch(repository, pending))
+        count_imported += batch_counts['success']
+        count_duplicates += batch_counts['duplicate']
+        count_errors += batch_counts['error']
         
+        if parse_cache is not None:
+            parse_cache.evict_missing(directory, recursive=scan_options.get('recursive', False))
+            parse_cache.flush()
+
+        count_prefiltered = counters['prefiltered']
+        count_filtered += count_prefiltered
         total_processed = len(results)
-        total_found = len(files)
+        total_found = counters['found']
         
         filter_msg = ""
         if count_filtered > 0:
-            filter_msg = f" ({count_filtered} archivos excluidos por filtros)"
+            filter_msg = f" ({count_filtered} archivos excluidos por filtros, {count_prefiltered} sin parsear)"
+        if skipped:
+            filter_msg += f" ({len(skipped)} XML no son facturas)"
         
         return {
             "status": "success",
             "message": f"Se {'previsualizaron' if dry_run else 'procesaron'} {total_processed} de {total_found} archivos locales{filter_msg}.",
             "results": results,
+            "skipped": skipped,
             "dry_run": dry_run,
             "stats": {
                 "total": total_processed,
                 "successful": count_imported,
                 "duplicates": count_duplicates,
-                "errors": count_errors
+                "errors": count_errors,
+                "cached": count_cached,
+                "filtered": count_filtered,
+                "prefiltered": count_prefiltered,
+                "non_invoice": len(skipped),
+                "document_types": counters['document_types']
             }
         }
 
     def export_from_db(self, repository: Any, filters: Dict[str, Any], formats: List[str], output_dir: str) -> Dict[str, Any]:
-        """Genera archivos a partir de datos en la BD."""
-        data_list = repository.get_invoices(
+        """
+        Genera archivos a partir de datos en la BD.
+
+        Las filas llegan por bloques desde repository.iter_invoices (cursor del lado
+        del servidor) y cada bloque se entrega a todos los formatos pedidos en una
+        sola pasada, sin cargar la consulta completa en memoria. Si falla un formato
+        distinto de PDF se abortan todos los escritores y se borran sus archivos.
+        """
+        chunks = repository.iter_invoices(
             start_date=filters.get('start_date'),
             end_date=filters.get('end_date'),
-            provider=filters.get('provider')
+            provider=filters.get('provider'),
+            chunk_size=EXPORT_CHUNK_SIZE
         )
-
-        if not data_list:
+        first_chunk = next(chunks, None)
+        if not first_chunk:
+            chunks.close()
             return {"status": "warning", "message": "No hay datos para exportar con estos filtros."}
 
         today_str = datetime.now().strftime('%Y-%m-%d')
         base_output_name = f"{today_str} facturas_export"
-        generated_files = []
-        
-        # Exportar a Excel
+        writers = []
+
+        # Exportar a Excel (columnas en el orden de la consulta)
         if 'excel' in formats:
             output_xlsx = os.path.join(output_dir, f"{base_output_name}.xlsx")
-            df = pd.DataFrame(data_list)
-            # Renombrar columnas para el Excel humano
-            df_display = df.rename(columns={
-                'fecha': 'Fecha', 'proveedor': 'Proveedor', 'nit': 'NIT', 
-                'factura': 'Factura', 'subtotal': 'Subtotal', 'iva': 'IVA', 
-                'total': 'Total', 'nombre_xml': 'Archivo XML'
-            })
-            df_display.to_excel(output_xlsx, index=False)
-            generated_files.append({"type": "excel", "path": output_xlsx})
+            writers.append(("excel", output_xlsx, ExcelStreamWriter(output_xlsx, list(first_chunk[0].keys()))))
 
         # Exportar a CSV (Formato Contable)
         if 'csv' in formats:
             output_csv = os.path.join(output_dir, f"{base_output_name}.csv")
-            csv_data = []
-            for item in data_list:
-                csv_data.append({
-                    'fecha': item['fecha'],
-                    'descripcion': f"Compra {item['proveedor']} Fact {item['factura']}",
-                    'referencia': item['factura'],
-                    'valor': -abs(item['total']),
-                    'moneda_id': 1,
-                    'cuenta_id': '', 
-                    'terceroid': '',
-                    'grupoid': '',
-                    'conceptoid': ''
-                })
-            
-            if csv_data:
-                keys = csv_data[0].keys()
-                with open(output_csv, 'w', newline='', encoding='utf-8') as f:
-                    dict_writer = csv.DictWriter(f, fieldnames=keys)
-                    dict_writer.writeheader()
-                    dict_writer.writerows(csv_data)
-                generated_files.append({"type": "csv", "path": output_csv})
+            writers.append(("csv", output_csv, CsvStreamWriter(output_csv)))
 
         # PDF
         if 'pdf' in formats:
             output_pdf = os.path.join(output_dir, f"{base_output_name}.pdf")
             try:
-                pdf = FPDF(orientation='L', unit='mm', format='A4')
-                pdf.add_page()
-                pdf.set_font("Arial", 'B', 16)
-                pdf.cell(0, 10, "Reporte de Facturas Recibidas", ln=True, align='C')
-                pdf.set_font("Arial", '', 10)
-                pdf.cell(0, 10, f"Fecha de generación: {today_str}", ln=True, align='R')
-                pdf.ln(5)
-
-                # Encabezados de tabla
-                pdf.set_font("Arial", 'B', 10)
-                pdf.set_fill_color(240, 240, 240)
-                cols = [
-                    ("Fecha", 25), ("Proveedor", 70), ("NIT", 30), 
-                    ("Factura", 35), ("Subtotal", 30), ("IVA", 25), ("Total", 30)
-                ]
-                
-                for col_name, width in cols:
-                    pdf.cell(width, 10, col_name, border=1, align='C', fill=True)
-                pdf.ln()
-
-                # Datos de la tabla
-                pdf.set_font("Arial", '', 9)
-                for item in data_list:
-                    pdf.cell(25, 8, str(item['fecha']), border=1)
-                    # Truncar proveedor si es muy largo
-                    prov = str(item['proveedor'])[:35]
-                    pdf.cell(70, 8, prov, border=1)
-                    pdf.cell(30, 8, str(item['nit']), border=1)
-                    pdf.cell(35, 8, str(item['factura']), border=1)
-                    pdf.cell(30, 8, f"{item['subtotal']:,.2f}", border=1, align='R')
-                    pdf.cell(25, 8, f"{item['iva']:,.2f}", border=1, align='R')
-                    pdf.cell(30, 8, f"{item['total']:,.2f}", border=1, align='R')
-                    pdf.ln()
-
-                pdf.output(output_pdf)
-                generated_files.append({"type": "pdf", "path": output_pdf})
+                writers.append(("pdf", output_pdf, PdfStreamWriter(output_pdf, today_str)))
             except Exception as e:
-                # Si falla PDF no bloqueamos el resto
                 print(f"Error generando PDF: {e}")
-        
+
+        count = 0
+        generated_files = []
+        try:
+            for chunk in chain([first_chunk], chunks):
+                count += len(chunk)
+                for writer_entry in list(writers):
+                    file_type, _, writer = writer_entry
+                    try:
+                        writer.write(chunk)
+                    except Exception as e:
+                        # Si falla PDF no bloqueamos el resto
+                        if file_type != "pdf":
+                            raise
+                        print(f"Error generando PDF: {e}")
+                        writers.remove(writer_entry)
+                        writer.abort()
+
+            for writer_entry in list(writers):
+                file_type, path, writer = writer_entry
+                try:
+                    writer.close()
+                except Exception as e:
+                    if file_type != "pdf":
+                        raise
+                    print(f"Error generando PDF: {e}")
+                    writers.remove(writer_entry)
+                    writer.abort()
+                    continue
+                generated_files.append({"type": file_type, "path": path})
+        except Exception:
+            # Un formato falló: se cierran todos y no quedan archivos a medias (ni los ya completos de esta exportación)
+            for _, _, writer in writers:
+                writer.abort()
+            raise
+        finally:
+            chunks.close()
+
         return {
             "status": "success",
             "message": f"Exportación completada. Se generaron {len(generated_files)} archivos.",
             "files": generated_files,
-            "count": len(data_list)
+            "count": count
         }
 
     # Mantener este método por compatibilidad si es necesario, pero redirigirlo a la nueva lógica si es posible
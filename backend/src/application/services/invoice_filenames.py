@@ -0,0 +1,23 @@
+import re
+from typing import Optional, Tuple
+
+# Convención de nombres de InvoiceProcessorService._handle_zip: "{issue_date} {supplier}.xml"
+_FILENAME_PATTERN = re.compile(r'^(\d{4}-\d{2}-\d{2}) (.+)\.xml$', re.IGNORECASE)
+
+
+def safe_supplier_name(supplier_name: str) -> str:
+    """Limpia caracteres prohibidos en nombres de archivo de Windows."""
+    return "".join(c for c in supplier_name if c.isalnum() or c in (' ', '-', '_')).strip()
+
+
+def invoice_base_name(issue_date: str, supplier_name: str) -> str:
+    """Nombre base (sin extensión) con el que se guardan las facturas descargadas."""
+    return f"{issue_date} {safe_supplier_name(supplier_name)}"
+
+
+def parse_invoice_filename(filename: str) -> Optional[Tuple[str, str]]:
+    """Retorna (fecha, proveedor_limpio) si el nombre sigue la convención, o None si es ambiguo."""
+    match = _FILENAME_PATTERN.match(filename)
+    if not match:
+        return None
+    return match.group(1), match.group(2)
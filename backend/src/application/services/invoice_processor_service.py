@@ -1,36 +1,96 @@
 import zipfile
 import io
 import os
+import queue
 import logging
-from lxml import etree
+import threading
 from datetime import datetime
+from concurrent.futures import Future, ThreadPoolExecutor
 from src.domain.ports.gmail_port import GmailPort
 from src.domain.models.invoice import InvoiceMetadata
+from src.application.services.ubl_parser import parse_ubl_bytes
+from src.application.services.invoice_filenames import invoice_base_name
+from src.application.services.ubl_sniffer import sniff_zip_member, DOCUMENT_INVOICE, DOCUMENT_ATTACHED, DOCUMENT_UNKNOWN
 from typing import List, Dict, Any, Tuple, Optional
 
-UBL_NAMESPACES = {
-    'cac': 'urn:oasis:names:specification:ubl:schema:xsd:CommonAggregateComponents-2',
-    'cbc': 'urn:oasis:names:specification:ubl:schema:xsd:CommonBasicComponents-2',
-    'invoice': 'urn:oasis:names:specification:ubl:schema:xsd:Invoice-2',
-}
-
 logger = logging.getLogger("invoice_processor")
 
+# Tipos que _parse_xml acepta; los no identificables también se parsean para no perder facturas
+ZIP_PARSE_DOCUMENT_TYPES = (DOCUMENT_INVOICE, DOCUMENT_ATTACHED, DOCUMENT_UNKNOWN)
+
+def watermark_can_advance(truncated: bool, processed: int, found: int, errors: int, all_marked: bool) -> bool:
+    """
+    Si la corrida incremental puede guardar el historyId actual. El historial solo
+    trae correos nuevos: lo que quede pendiente (búsqueda completa cortada en el tope,
+    límite de max_emails, errores o etiquetado fallido) no se volvería a ver.
+    Mientras tanto se repiten búsquedas completas hasta que una quepa en el tope.
+    """
+    return not truncated and processed == found and errors == 0 and all_marked
+
+
+class ZipExtractionStage:
+    """
+    Extracción de ZIPs y escritura a disco en un hilo propio, alimentado por una cola.
+
+    Los workers de descarga encolan el contenido y esperan el resultado: un único
+    escritor evita que dos hilos guarden a la vez la misma factura. La cola acotada
+    (max_pending) limita los ZIPs descargados en memoria.
+    """
+
+    def __init__(self, handle_zip, max_pending: int):
+        self._handle_zip = handle_zip
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._run, name="zip-extraction", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            future, zip_content, target_dir = item
+            try:
+                future.set_result(self._handle_zip(zip_content, target_dir))
+            except Exception as e:
+                future.set_exception(e)
+
+    def handle_zip(self, zip_content: bytes, target_dir: str) -> Optional[str]:
+        future = Future()
+        self._queue.put((future, zip_content, target_dir))
+        return future.result()
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
 class InvoiceProcessorService:
     def __init__(self, gmail_service: GmailPort):
         self.gmail_service = gmail_service
         self.processed_label = "Factura_Procesada"
 
-    def process_all_new_invoices(self, target_directory: str, max_emails: int = None):
+    def process_all_new_invoices(self, target_directory: str, max_emails: int = None, incremental: bool = False, concurrency: int = 1):
+        """
+        Procesa los correos sin la etiqueta de procesado.
+
+        Con incremental solo se consultan los correos llegados desde la última corrida
+        exitosa (historial de Gmail desde el historyId guardado); sin marca guardada o
+        con el historial expirado se hace la búsqueda completa. La marca avanza solo si
+        se procesó toda la lista sin errores, para no saltarse correos pendientes.
+
+        Con concurrency > 1 los hilos se descargan y escanean en paralelo (con sus
+        ZIPs) y la extracción y escritura a disco corre en una etapa aparte; los
+        resultados conservan el orden de la corrida secuencial.
+        """
         logger.info(f"Iniciando procesamiento de facturas en: {target_directory}")
         if not os.path.exists(target_directory):
             logger.info(f"Creando directorio de destino: {target_directory}")
             os.makedirs(target_directory, exist_ok=True)
 
         self.gmail_service.ensure_label_exists(self.processed_label)
-        messages = self.gmail_service.search_unprocessed_emails(self.processed_label)
+        messages, sync = self._search_messages(incremental)
         
         logger.info(f"Se encontraron {len(messages)} correos sin procesar.")
+        total_found = len(messages)
         
         # Procesar de más antiguo a más nuevo
         messages.reverse()
@@ -42,74 +102,170 @@ class InvoiceProcessorService:
         else:
             logger.info(f"Procesando {len(messages)} correos (sin límite).")
         
+        # Metadatos de toda la lista de trabajo en lotes, en vez de dos GET por correo
+        metadata_by_id = self.gmail_service.get_messages_metadata([msg['id'] for msg in messages])
+
+        # Agrupar por hilo: respuestas y reenvíos de una misma factura comparten hilo,
+        # que se descarga y escanea una sola vez; sus correos reciben el mismo resultado
+        threads: Dict[str, List[str]] = {}
+        for msg in messages:
+            msg_id = msg['id']
+            meta = metadata_by_id.get(msg_id)
+            thread_key = (meta or {}).get('threadId') or msg.get('threadId') or msg_id
+            threads.setdefault(thread_key, []).append(msg_id)
+
         results = []
         stats = {
             "total_scanned": len(messages),
             "successful": 0,
             "trashed": 0,
             "errors": 0,
-            "files_saved": 0
+            "files_saved": 0,
+            "threads_scanned": len(threads),
+            "threads_successful": 0,
+            "threads_trashed": 0,
+            "threads_errors": 0
         }
+        # Se etiquetan todos juntos al final (batchModify) en vez de uno a uno
+        processed_ids = []
 
-        for msg in messages:
-            msg_id = msg['id']
-            # Metadatos del mensaje detectado para logging inicial
-            initial_metadata = self.gmail_service.get_message_metadata(msg_id)
-            
-            logger.info(f"Procesando correo de: {initial_metadata.get('from')} (ID: {msg_id})")
+        for thread_key, msg_ids, outcome in self._scan_threads(threads, metadata_by_id, target_directory, concurrency):
+            msg_id = msg_ids[0]
+            initial_metadata = outcome["initial_metadata"]
             try:
-                success, saved_files, deep_metadata = self._process_email(msg_id, target_directory)
+                if outcome["error"]:
+                    raise outcome["error"]
+                success, saved_files = outcome["success"], outcome["saved_files"]
                 
                 # Usar metadatos del correo más profundo que contiene el ZIP, o el inicial como fallback
-                final_metadata = deep_metadata if deep_metadata else initial_metadata
-                
-                res = {
-                    "msg_id": msg_id, 
-                    "sender": final_metadata.get("from"),
-                    "subject": final_metadata.get("subject"),
-                    "date": final_metadata.get("date"),
-                    "attachments": saved_files,
-                    "count": len(saved_files)
-                }
+                final_metadata = outcome["deep_metadata"] if outcome["deep_metadata"] else initial_metadata
                 
                 if success:
-                    logger.info(f"Correo {msg_id} procesado exitosamente usando metadatos de {final_metadata.get('from')}. Archivos: {len(saved_files)}")
-                    self.gmail_service.mark_as_processed(msg_id, self.processed_label)
-                    res["status"] = "success"
-                    stats["successful"] += 1
+                    logger.info(f"Hilo de {msg_id} procesado exitosamente usando metadatos de {final_metadata.get('from')}. Archivos: {len(saved_files)}")
+                    processed_ids.extend(msg_ids)
+                    status = "success"
+                    stats["successful"] += len(msg_ids)
+                    stats["threads_successful"] += 1
                     stats["files_saved"] += len(saved_files)
                 else:
-                    logger.warning(f"No se encontraron facturas válidas en el hilo del correo {msg_id}. Moviendo a la papelera.")
-                    self.gmail_service.trash_message(msg_id)
-                    res["status"] = "no_valid_invoices"
-                    stats["trashed"] += 1
+                    logger.warning(f"No se encontraron facturas válidas en el hilo del correo {msg_id}. Moviendo a la papelera {len(msg_ids)} correo(s).")
+                    for member_id in msg_ids:
+                        self.gmail_service.trash_message(member_id)
+                    status = "no_valid_invoices"
+                    stats["trashed"] += len(msg_ids)
+                    stats["threads_trashed"] += 1
                 
-                results.append(res)
+                for member_id in msg_ids:
+                    results.append({
+                        "msg_id": member_id, 
+                        "thread_id": thread_key,
+                        "sender": final_metadata.get("from"),
+                        "subject": final_metadata.get("subject"),
+                        "date": final_metadata.get("date"),
+                        "attachments": saved_files,
+                        "count": len(saved_files),
+                        "status": status
+                    })
+            except Exception as e:
+                logger.error(f"Error procesando el hilo del correo {msg_id}: {str(e)}", exc_info=True)
+                stats["errors"] += len(msg_ids)
+                stats["threads_errors"] += 1
+                for member_id in msg_ids:
+                    results.append({
+                        "msg_id": member_id, 
+                        "thread_id": thread_key,
+                        "sender": initial_metadata.get("from"),
+                        "subject": initial_metadata.get("subject"),
+                        "date": initial_metadata.get("date"),
+                        "status": "error", 
+                        "error": str(e),
+                        "attachments": [],
+                        "count": 0
+                    })
+
+        all_marked = True
+        if processed_ids:
+            try:
+                self.gmail_service.mark_many_as_processed(processed_ids, self.processed_label)
             except Exception as e:
-                logger.error(f"Error procesando el correo {msg_id}: {str(e)}", exc_info=True)
-                stats["errors"] += 1
-                results.append({
-                    "msg_id": msg_id, 
-                    "sender": initial_metadata.get("from"),
-                    "subject": initial_metadata.get("subject"),
-                    "date": initial_metadata.get("date"),
-                    "status": "error", 
-                    "error": str(e),
-                    "attachments": [],
-                    "count": 0
-                })
+                # Los archivos ya están guardados: la próxima corrida los encuentra y los vuelve a marcar
+                all_marked = False
+                logger.error(f"Error marcando {len(processed_ids)} correos como procesados: {str(e)}", exc_info=True)
         
-        return {"results": results, "stats": stats}
+        logger.info(f"{len(messages)} correos en {len(threads)} hilos ({len(messages) - len(threads)} escaneos de hilo evitados)")
 
-    def _process_email(self, msg_id: str, target_dir: str) -> Tuple[bool, List[str], Optional[Dict[str, Any]]]:
-        # Obtener metadatos básicos para conseguir el threadId
-        meta = self.gmail_service.get_message_metadata(msg_id)
+        sync["watermark_saved"] = False
+        if incremental:
+            if watermark_can_advance(sync["truncated"], len(messages), total_found, stats["errors"], all_marked):
+                self.gmail_service.save_history_watermark(sync["history_id"])
+                sync["watermark_saved"] = True
+            else:
+                logger.info("Quedan correos pendientes o con error: la marca de sincronización no avanza")
+
+        return {"results": results, "stats": stats, "sync": sync}
+
+    def _scan_threads(self, threads: Dict[str, List[str]], metadata_by_id: Dict[str, Dict[str, str]], target_dir: str, concurrency: int):
+        """Escanea cada hilo y produce (thread_key, msg_ids, resultado) en el orden de threads."""
+        items = list(threads.items())
+        if concurrency <= 1 or len(items) <= 1:
+            for thread_key, msg_ids in items:
+                yield thread_key, msg_ids, self._scan_thread(msg_ids, metadata_by_id, target_dir, self._handle_zip)
+            return
+
+        logger.info(f"Escaneando {len(items)} hilos con {concurrency} workers")
+        stage = ZipExtractionStage(self._handle_zip, max_pending=concurrency * 2)
+        try:
+            with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="gmail") as pool:
+                # map entrega en el orden de entrada aunque los hilos terminen en otro
+                outcomes = pool.map(
+                    lambda item: self._scan_thread(item[1], metadata_by_id, target_dir, stage.handle_zip), items
+                )
+                for (thread_key, msg_ids), outcome in zip(items, outcomes):
+                    yield thread_key, msg_ids, outcome
+        finally:
+            stage.close()
+
+    def _scan_thread(self, msg_ids: List[str], metadata_by_id: Dict[str, Dict[str, str]], target_dir: str, handle_zip) -> Dict[str, Any]:
+        """Descarga y escanea el hilo del primer correo. No modifica Gmail: puede correr en paralelo."""
+        msg_id = msg_ids[0]
+        outcome = {"initial_metadata": {}, "success": False, "saved_files": [], "deep_metadata": None, "error": None}
+        try:
+            # Metadatos del mensaje detectado para logging inicial (los que fallaron en el lote, uno a uno)
+            outcome["initial_metadata"] = metadata_by_id.get(msg_id) or self.gmail_service.get_message_metadata(msg_id)
+            logger.info(f"Procesando correo de: {outcome['initial_metadata'].get('from')} (ID: {msg_id}, {len(msg_ids)} correo(s) del hilo)")
+            outcome["success"], outcome["saved_files"], outcome["deep_metadata"] = self._process_email(
+                msg_id, target_dir, outcome["initial_metadata"], handle_zip
+            )
+        except Exception as e:
+            outcome["error"] = e
+        return outcome
+
+    def _search_messages(self, incremental: bool) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """Correos sin procesar (más reciente primero) y datos de la sincronización usada."""
+        if not incremental:
+            messages, truncated = self.gmail_service.search_unprocessed_emails(self.processed_label)
+            return messages, {"mode": "full", "truncated": truncated}
+
+        # historyId tomado antes de buscar: lo que llegue durante la corrida queda para la próxima
+        history_id = self.gmail_service.get_current_history_id()
+        watermark = self.gmail_service.load_history_watermark()
+        if watermark:
+            messages = self.gmail_service.search_emails_since(watermark, self.processed_label)
+            if messages is not None:
+                return messages, {"mode": "incremental", "since_history_id": watermark, "history_id": history_id, "truncated": False}
+
+        logger.info("Sin marca de sincronización vigente: búsqueda completa")
+        messages, truncated = self.gmail_service.search_unprocessed_emails(self.processed_label)
+        return messages, {"mode": "full", "since_history_id": watermark, "history_id": history_id, "truncated": truncated}
+
+    def _process_email(self, msg_id: str, target_dir: str, meta: Dict[str, Any], handle_zip=None) -> Tuple[bool, List[str], Optional[Dict[str, Any]]]:
+        # meta: metadatos ya obtenidos del correo (incluyen el threadId)
         thread_id = meta.get("threadId")
         
         if not thread_id:
             logger.debug(f"Correo {msg_id} no tiene threadId, procesando individualmente.")
             attachments = self.gmail_service.get_attachments(msg_id)
-            success, saved_files = self._extract_zips_from_attachments(msg_id, attachments, target_dir)
+            success, saved_files = self._extract_zips_from_attachments(msg_id, attachments, target_dir, handle_zip)
             return success, saved_files, meta
 
         # Buscar en todo el hilo el correo más profundo (primero en orden cronológico) con el ZIP
@@ -128,7 +284,7 @@ class InvoiceProcessorService:
             if zip_attachments:
                 logger.info(f"Encontrado ZIP en mensaje index {i} (ID: {msg_obj.get('id')}) de: {current_meta.get('from')} el {current_meta.get('date')}")
                 
-                success, saved_files = self._extract_zips_from_attachments(msg_obj['id'], zip_attachments, target_dir)
+                success, saved_files = self._extract_zips_from_attachments(msg_obj['id'], zip_attachments, target_dir, handle_zip)
                 if success:
                     logger.debug(f"Procesado exitosamente usando metadatos profundos de: {current_meta.get('from')}")
                     return True, saved_files, current_meta
@@ -138,13 +294,15 @@ class InvoiceProcessorService:
         logger.warning(f"No se encontró ningún mensaje con ZIP en el hilo {thread_id}")
         return False, [], None
 
-    def _extract_zips_from_attachments(self, msg_id: str, attachments: List[Dict[str, Any]], target_dir: str) -> Tuple[bool, List[str]]:
+    def _extract_zips_from_attachments(self, msg_id: str, attachments: List[Dict[str, Any]], target_dir: str, handle_zip=None) -> Tuple[bool, List[str]]:
+        # handle_zip: extracción y escritura (la etapa de extracción cuando se escanea en paralelo)
+        handle_zip = handle_zip or self._handle_zip
         saved_files = []
         for att in attachments:
             if att['filename'].lower().endswith('.zip'):
                 logger.debug(f"Descargando adjunto ZIP: {att['filename']}")
                 content = self.gmail_service.download_attachment(msg_id, att['attachmentId'])
-                saved_filename = self._handle_zip(content, target_dir)
+                saved_filename = handle_zip(content, target_dir)
                 if saved_filename:
                     saved_files.append(saved_filename)
         return len(saved_files) > 0, saved_files
@@ -165,6 +323,12 @@ class InvoiceProcessorService:
                 invoice_data = None
                 xml_data_bytes = None
                 for xml_file in xml_files:
+                    # Clasificar por el elemento raíz (solo se descomprime el inicio):
+                    # firmas, ApplicationResponse y notas crédito no se parsean
+                    document_type = sniff_zip_member(zf, xml_file)
+                    if document_type not in ZIP_PARSE_DOCUMENT_TYPES:
+                        logger.debug(f"XML omitido ({document_type}): {xml_file}")
+                        continue
                     xml_content = zf.read(xml_file)
                     data = self._parse_xml(xml_content)
                     if data:
@@ -176,9 +340,8 @@ class InvoiceProcessorService:
                     logger.warning("No se encontró un XML de factura válido (ni Invoice ni AttachedDocument) dentro del ZIP.")
                     return None
 
-                # Limpiar caracteres prohibidos en nombres de archivo de Windows
-                safe_supplier = "".join(c for c in invoice_data.supplier_name if c.isalnum() or c in (' ', '-', '_')).strip()
-                base_name = f"{invoice_data.issue_date} {safe_supplier}"
+                # Nombre "{fecha} {proveedor}" sin caracteres prohibidos en Windows
+                base_name = invoice_base_name(invoice_data.issue_date, invoice_data.supplier_name)
                 logger.info(f"Factura identificada: {base_name}")
                 
                 # Guardar XML
@@ -205,70 +368,19 @@ class InvoiceProcessorService:
             return None
 
     def _parse_xml(self, xml_content: bytes) -> Optional[InvoiceMetadata]:
-        try:
-            root = etree.fromstring(xml_content)
-            tag_name = etree.QName(root).localname
-            
-            # Caso 1: Es un Invoice directo
-            if tag_name == 'Invoice':
-                return self._extract_invoice_metadata(root)
-            
-            # Caso 2: Es un AttachedDocument (Contenedor común en Colombia)
-            if tag_name == 'AttachedDocument':
-                # Intentar extraer ID de la factura original
-                invoice_id = self._xpath_text(root, '//*[local-name()="ParentDocumentID"]')
-                
-                # Intentar extraer fecha
-                issue_date = self._xpath_text(root, '//*[local-name()="ParentDocumentLineReference"]//*[local-name()="IssueDate"]')
-                if not issue_date:
-                    issue_date = self._xpath_text(root, '//*[local-name()="IssueDate"]')
-                
-                # Intentar extraer el nombre del emisor (SenderParty suele ser el emisor en el AttachedDocument)
-                supplier_name = self._xpath_text(root, '//*[local-name()="SenderParty"]//*[local-name()="RegistrationName"]')
-                if not supplier_name:
-                    supplier_name = self._xpath_text(root, '//*[local-name()="SenderParty"]//*[local-name()="Name"]')
-                
-                if invoice_id and supplier_name:
-                    return InvoiceMetadata(
-                        invoice_number=invoice_id,
-                        issue_date=issue_date or datetime.now().strftime('%Y-%m-%d'),
-                        supplier_name=supplier_name,
-                        nit=""
-                    )
-                
-            return None
-        except Exception as e:
-            logger.debug(f"Error parseando XML: {str(e)}")
+        # Modo rápido: solo identificación de la factura, sin totales
+        invoice, error = parse_ubl_bytes(xml_content, metadata_only=True)
+        if not invoice:
+            logger.debug(f"Error parseando XML: {error}")
             return None
 
-    def _extract_invoice_metadata(self, element) -> Optional[InvoiceMetadata]:
-        try:
-            # Usamos local-name() para ignorar prefijos de namespace que varían entre versiones de UBL
-            invoice_id = self._xpath_text(element, '//*[local-name()="ID"]')
-            issue_date = self._xpath_text(element, '//*[local-name()="IssueDate"]')
-            supplier_name = self._xpath_text(element, '//*[local-name()="AccountingSupplierParty"]//*[local-name()="RegistrationName"]')
-            nit = self._xpath_text(element, '//*[local-name()="AccountingSupplierParty"]//*[local-name()="CompanyID"]')
-
-            if not invoice_id or not supplier_name:
-                return None
-
-            return InvoiceMetadata(
-                invoice_number=invoice_id,
-                issue_date=issue_date or datetime.now().strftime('%Y-%m-%d'),
-                supplier_name=supplier_name,
-                nit=nit or ""
-            )
-        except Exception:
+        # Solo Invoice directo o AttachedDocument (contenedor común en Colombia)
+        if invoice.document_type not in ('Invoice', 'AttachedDocument'):
             return None
 
-    def _xpath_text(self, element, xpath_query: str) -> Optional[str]:
-        try:
-            # Búsqueda flexible usando local-name() si es necesario
-            result = element.xpath(xpath_query)
-            if result:
-                if isinstance(result[0], etree._Element):
-                    return result[0].text.strip() if result[0].text else None
-                return str(result[0]).strip()
-        except Exception:
-            pass
-        return None
+        return InvoiceMetadata(
+            invoice_number=invoice.invoice_number,
+            issue_date=invoice.issue_date or datetime.now().strftime('%Y-%m-%d'),
+            supplier_name=invoice.supplier_name,
+            nit=invoice.nit or ""
+        )
@@ -0,0 +1,35 @@
+import pandas as pd
+from typing import Any, Dict, List
+from src.domain.models.invoice import LINE_COLUMNS
+
+# Columnas de la factura que se repiten en cada línea del frame
+HEADER_COLUMNS = ['fecha', 'nit', 'proveedor', 'factura']
+NUMERIC_COLUMNS = ['cantidad', 'precio_unitario', 'valor', 'iva']
+SUMMARY_GROUPS = ('descripcion', 'proveedor', 'nit', 'codigo')
+
+
+def lines_frame_from_columns(columns: Dict[str, List]) -> pd.DataFrame:
+    """DataFrame a partir de columnas ya planas (p. ej. FacturaRepository.get_invoice_lines)."""
+    frame = pd.DataFrame({c: columns.get(c, []) for c in HEADER_COLUMNS + LINE_COLUMNS})
+    for column in NUMERIC_COLUMNS:
+        frame[column] = frame[column].astype('float64')
+    return frame
+
+
+def summarize_lines(frame: pd.DataFrame, group_by: str = 'descripcion', limit: int = 50) -> List[Dict[str, Any]]:
+    """Agrega las líneas por group_by (cantidad, valor, IVA, número de líneas), ordenado por valor descendente."""
+    if group_by not in SUMMARY_GROUPS:
+        raise ValueError(f"group_by debe ser uno de {', '.join(SUMMARY_GROUPS)}")
+    if frame.empty:
+        return []
+
+    summary = (
+        frame.groupby(group_by, dropna=False)
+        .agg(lineas=('linea', 'size'), cantidad=('cantidad', 'sum'), valor=('valor', 'sum'), iva=('iva', 'sum'))
+        .sort_values('valor', ascending=False)
+        .head(limit)
+        .reset_index()
+    )
+    # NaN (descripción vacía) no es JSON válido
+    summary[group_by] = summary[group_by].astype(object).where(summary[group_by].notna(), None)
+    return summary.to_dict(orient='records')
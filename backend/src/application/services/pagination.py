@@ -0,0 +1,24 @@
+import json
+import base64
+from datetime import date
+from src.domain.models.invoice import InvoiceKey
+
+
+def encode_cursor(key: InvoiceKey) -> str:
+    """Cursor opaco para la siguiente página: la clave de orden de la última fila entregada."""
+    fecha, proveedor, invoice_id = key
+    raw = json.dumps([str(fecha), proveedor, int(invoice_id)], ensure_ascii=False, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> InvoiceKey:
+    """Inverso de encode_cursor. Lanza ValueError si el cursor no es válido."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        fecha, proveedor, invoice_id = json.loads(raw.decode('utf-8'))
+        date.fromisoformat(fecha)
+        if not isinstance(proveedor, str) or not isinstance(invoice_id, int):
+            raise ValueError
+    except (ValueError, TypeError):
+        raise ValueError("Cursor de paginación inválido")
+    return fecha, proveedor, invoice_id
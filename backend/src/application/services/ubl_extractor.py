@@ -0,0 +1,82 @@
+from lxml import etree
+from typing import Dict, Iterable, Optional, Tuple
+
+# Consultas que antes se hacían con XPath del tipo
+# '//*[local-name()="Ancla"]//*[local-name()="Objetivo"]'.
+# Formato: clave -> (ancla, objetivo, solo_hijos_directos).
+# Si el objetivo es None el valor buscado es la propia ancla.
+UBL_QUERIES: Dict[str, Tuple[str, Optional[str], bool]] = {
+    'description': ('Attachment', 'Description', False),
+    'parent_document_id': ('ParentDocumentID', None, False),
+    'sender_registration_name': ('SenderParty', 'RegistrationName', False),
+    'sender_company_id': ('SenderParty', 'CompanyID', False),
+    'supplier_registration_name': ('AccountingSupplierParty', 'RegistrationName', False),
+    'supplier_company_id': ('AccountingSupplierParty', 'CompanyID', False),
+    'party_name': ('PartyName', 'Name', False),
+    'payable_amount': ('LegalMonetaryTotal', 'PayableAmount', False),
+    'line_extension_amount': ('LegalMonetaryTotal', 'LineExtensionAmount', False),
+    'allowance_total_amount': ('LegalMonetaryTotal', 'AllowanceTotalAmount', False),
+    'tax_amount': ('TaxTotal', 'TaxAmount', True),
+}
+
+
+def _localname(tag: str) -> str:
+    return tag.rpartition('}')[2]
+
+
+class UBLFields:
+    """Resultado de un recorrido: primer elemento encontrado para cada consulta."""
+
+    def __init__(self, matches: Dict[str, etree._Element]):
+        self._matches = matches
+
+    def element(self, key: str) -> Optional[etree._Element]:
+        return self._matches.get(key)
+
+    def text(self, key: str) -> str:
+        # Mismo contrato que el antiguo _get_text: "" si no hay coincidencia
+        # (ni texto: un elemento vacío como <cbc:Note/> tiene text None)
+        element = self._matches.get(key)
+        if element is None or element.text is None:
+            return ""
+        return element.text.strip()
+
+
+def extract_fields(root: etree._Element, keys: Optional[Iterable[str]] = None) -> UBLFields:
+    """
+    Resuelve las consultas de UBL_QUERIES en un único recorrido del documento.
+
+    El árbol se recorre una sola vez (en C, filtrando por las anclas) y, por
+    cada ancla, solo se explora su subárbol. El recorrido termina en cuanto
+    todas las consultas pedidas tienen valor, de modo que normalmente no se
+    visitan las líneas de la factura. El resultado coincide con el primer
+    elemento en orden de documento que devolvería el XPath equivalente.
+    """
+    wanted = list(keys) if keys is not None else list(UBL_QUERIES)
+
+    by_anchor: Dict[str, list] = {}
+    for key in wanted:
+        anchor, target, direct = UBL_QUERIES[key]
+        by_anchor.setdefault(anchor, []).append((key, target, direct))
+
+    matches: Dict[str, etree._Element] = {}
+    remaining = len(wanted)
+    anchor_tags = [f'{{*}}{anchor}' for anchor in by_anchor]
+
+    for anchor_el in root.iter(*anchor_tags):
+        for key, target, direct in by_anchor[_localname(anchor_el.tag)]:
+            if key in matches:
+                continue
+            if target is None:
+                match = anchor_el
+            elif direct:
+                match = next(anchor_el.iterchildren(f'{{*}}{target}'), None)
+            else:
+                match = next(anchor_el.iterdescendants(f'{{*}}{target}'), None)
+            if match is not None:
+                matches[key] = match
+                remaining -= 1
+        if remaining == 0:
+            break
+
+    return UBLFields(matches)
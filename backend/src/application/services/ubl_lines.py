@@ -0,0 +1,70 @@
+from lxml import etree
+from typing import Dict, List, Optional
+from src.domain.models.invoice import LINE_COLUMNS
+
+_LINE_TAGS = ('{*}InvoiceLine', '{*}CreditNoteLine')
+_QUANTITY_TAGS = ('InvoicedQuantity', 'CreditedQuantity')
+
+
+def _localname(tag: str) -> str:
+    return tag.rpartition('}')[2]
+
+
+def _to_float(text: Optional[str]) -> float:
+    try:
+        return float(text) if text else 0.0
+    except ValueError:
+        return 0.0
+
+
+def empty_lines() -> Dict[str, list]:
+    return {column: [] for column in LINE_COLUMNS}
+
+
+def extract_lines(root: etree._Element, is_credit_note: bool = False) -> Dict[str, List]:
+    """
+    Extrae las líneas (InvoiceLine / CreditNoteLine) de un Invoice o CreditNote en formato columnar.
+
+    Retorna un dict columna -> lista, no una lista de registros: así se cargan en
+    bloque a la BD y a un DataFrame sin crear un objeto por línea. Cada línea se
+    recorre una sola vez por sus hijos directos (hay facturas con cientos de líneas).
+    En notas crédito valor e IVA se guardan negativos, igual que los totales.
+    """
+    columns = empty_lines()
+    linea, codigo, descripcion = columns['linea'], columns['codigo'], columns['descripcion']
+    cantidad, precio, valor, iva = columns['cantidad'], columns['precio_unitario'], columns['valor'], columns['iva']
+
+    for number, line in enumerate(root.iterchildren(*_LINE_TAGS), start=1):
+        line_id = description = None
+        quantity = price = amount = tax = 0.0
+        for child in line.iterchildren(etree.Element):
+            name = _localname(child.tag)
+            if name == 'ID':
+                line_id = child.text
+            elif name in _QUANTITY_TAGS:
+                quantity = _to_float(child.text)
+            elif name == 'LineExtensionAmount':
+                amount = _to_float(child.text)
+            elif name == 'TaxTotal':
+                # Una línea puede tener varios impuestos (IVA, INC): se suman
+                tax_el = next(child.iterchildren('{*}TaxAmount'), None)
+                if tax_el is not None:
+                    tax += _to_float(tax_el.text)
+            elif name == 'Item':
+                description_el = next(child.iterchildren('{*}Description'), None)
+                if description_el is not None and description_el.text:
+                    description = description_el.text.strip()
+            elif name == 'Price':
+                price_el = next(child.iterchildren('{*}PriceAmount'), None)
+                if price_el is not None:
+                    price = _to_float(price_el.text)
+
+        linea.append(number)
+        codigo.append(line_id.strip() if line_id else None)
+        descripcion.append(description)
+        cantidad.append(quantity)
+        precio.append(price)
+        valor.append(-abs(amount) if is_credit_note else amount)
+        iva.append(-abs(tax) if is_credit_note else tax)
+
+    return columns
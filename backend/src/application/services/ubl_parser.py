@@ -0,0 +1,178 @@
+from lxml import etree
+from typing import Optional, Tuple
+from src.domain.models.invoice import UBLInvoice
+from src.application.services.ubl_extractor import extract_fields, UBLFields
+from src.application.services.ubl_lines import extract_lines, empty_lines
+from src.domain.models.proveedor import strip_check_digit
+
+# Incrementar cuando cambien las reglas de extracción: invalida las cachés de parseo
+PARSER_VERSION = 3
+
+# Campos necesarios para identificar la factura. En modo rápido (metadata_only)
+# solo se buscan estos, el recorrido termina antes de los totales y las líneas
+# y no se convierten importes.
+METADATA_KEYS = [
+    'parent_document_id',
+    'sender_registration_name',
+    'sender_company_id',
+    'supplier_registration_name',
+    'supplier_company_id',
+    'party_name',
+]
+
+
+def parse_ubl_file(file_path: str, metadata_only: bool = False, with_lines: bool = False) -> Tuple[Optional[UBLInvoice], Optional[str]]:
+    """Parsea un archivo XML UBL. Retorna (factura, error_msg). Con with_lines también extrae las líneas."""
+    try:
+        root = etree.parse(file_path).getroot()
+        return _parse_root(root, metadata_only, with_lines)
+    except Exception as e:
+        return None, str(e)
+
+
+def parse_ubl_bytes(xml_content: bytes, metadata_only: bool = False, with_lines: bool = False) -> Tuple[Optional[UBLInvoice], Optional[str]]:
+    """Parsea el contenido de un XML UBL ya cargado en memoria. Retorna (factura, error_msg)"""
+    try:
+        root = etree.fromstring(xml_content)
+        return _parse_root(root, metadata_only, with_lines)
+    except Exception as e:
+        return None, str(e)
+
+
+def parse_embedded_document(description: str) -> Tuple[Optional[etree._Element], bool]:
+    """Parsea el Invoice/CreditNote embebido en el CDATA de un AttachedDocument. Retorna (root, es_nota_credito)"""
+    for open_tag, close_tag in (('<Invoice', '</Invoice>'), ('<CreditNote', '</CreditNote>')):
+        xml_start = description.find(open_tag)
+        if xml_start == -1:
+            continue
+        xml_end = description.rfind(close_tag) + len(close_tag)
+        # El texto va directo al parser, sin .encode(); si el CDATA solo contiene
+        # el documento, el slice devuelve el mismo objeto y no hay ninguna copia
+        return etree.fromstring(description[xml_start:xml_end]), open_tag == '<CreditNote'
+    return None, False
+
+
+def _direct_id_and_date(root: etree._Element, keep_first: bool, invoice_id: Optional[str], issue_date: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    # IMPORTANTE: Iterar SOLO hijos directos para evitar UBLExtensions,
+    # que pueden tener <ID> y <IssueDate> con valores diferentes
+    for child in root:
+        localname = etree.QName(child).localname
+        if localname == 'IssueDate' and child.text and not (keep_first and issue_date):
+            issue_date = child.text
+        elif localname == 'ID' and child.text and not (keep_first and invoice_id):
+            invoice_id = child.text
+    return invoice_id, issue_date
+
+
+def _company_id(fields: UBLFields, *keys: str) -> str:
+    """CompanyID de la primera clave con valor, sin el DV si el emisor lo pegó y lo declara en schemeID."""
+    for key in keys:
+        nit = fields.text(key)
+        if nit:
+            element = fields.element(key)
+            return strip_check_digit(nit, element.get('schemeID'), element.get('schemeName'))
+    return ""
+
+
+def _parse_root(root: etree._Element, metadata_only: bool, with_lines: bool = False) -> Tuple[Optional[UBLInvoice], Optional[str]]:
+    document_type = etree.QName(root).localname
+    is_attached = document_type == 'AttachedDocument'
+
+    keys = None
+    if metadata_only:
+        keys = METADATA_KEYS + ['description'] if is_attached else METADATA_KEYS
+    fields = extract_fields(root, keys)
+
+    # Intentar primero con ParentDocumentID (AttachedDocument)
+    invoice_id, issue_date = _direct_id_and_date(root, True, fields.text('parent_document_id'), None)
+
+    supplier_name = fields.text('sender_registration_name') or \
+                    fields.text('supplier_registration_name') or \
+                    fields.text('party_name')
+    nit = _company_id(fields, 'sender_company_id', 'supplier_company_id')
+
+    amounts = None if metadata_only else _amounts(fields)
+
+    # Si es un AttachedDocument, SIEMPRE buscar en el XML embebido (Invoice o CreditNote)
+    # para obtener los datos reales del documento, no del contenedor.
+    # El CDATA se lee una vez y el documento embebido se parsea una sola vez.
+    is_credit_note = False
+    # Documento que contiene las líneas: el propio Invoice/CreditNote o el embebido
+    lines_root = None if is_attached else root
+    if is_attached:
+        description = fields.text('description')
+        inner_root = None
+        if description:
+            try:
+                inner_root, is_credit_note = parse_embedded_document(description)
+            except Exception:
+                # Una factura embebida ilegible es un error; en una nota crédito
+                # continuamos con los valores que ya tenemos del contenedor
+                if '<Invoice' in description:
+                    raise
+
+        if inner_root is not None:
+            lines_root = inner_root
+            inner_fields = extract_fields(inner_root, METADATA_KEYS if metadata_only else None)
+
+            # Valores del documento embebido (PRIORITARIOS) si existen
+            if amounts is not None:
+                amounts = tuple(inner or outer for inner, outer in zip(_amounts(inner_fields), amounts))
+
+            inner_nit = _company_id(inner_fields, 'supplier_company_id', 'sender_company_id')
+            if inner_nit:
+                nit = inner_nit
+
+            inner_supplier = inner_fields.text('supplier_registration_name') or \
+                             inner_fields.text('party_name')
+            if inner_supplier:
+                supplier_name = inner_supplier
+
+            invoice_id, issue_date = _direct_id_and_date(inner_root, False, invoice_id, issue_date)
+
+    if not invoice_id:
+        return None, "No se encontró ID de factura o ParentDocumentID en el XML"
+    if not supplier_name:
+        return None, "No se encontró el nombre del proveedor en el XML"
+
+    invoice = UBLInvoice(
+        document_type=document_type,
+        invoice_number=invoice_id,
+        issue_date=issue_date,
+        supplier_name=supplier_name,
+        nit=nit,
+        is_credit_note=is_credit_note,
+    )
+
+    if with_lines:
+        invoice.lines = extract_lines(lines_root, is_credit_note) if lines_root is not None else empty_lines()
+
+    if amounts is not None:
+        subtotal, allowance, tax_amount, total_amount = amounts
+        invoice.subtotal = float(subtotal or 0)
+        invoice.discounts = float(allowance or 0)
+        invoice.tax = float(tax_amount or 0)
+        invoice.total = float(total_amount or 0)
+
+        # Los descuentos SIEMPRE son negativos (reducen el total)
+        if invoice.discounts > 0:
+            invoice.discounts = -invoice.discounts
+
+        if is_credit_note:
+            invoice.subtotal = -abs(invoice.subtotal)
+            # descuentos ya es negativo, al invertir se vuelve positivo en nota crédito
+            invoice.discounts = abs(invoice.discounts)
+            invoice.tax = -abs(invoice.tax)
+            invoice.total = -abs(invoice.total)
+
+    return invoice, None
+
+
+def _amounts(fields: UBLFields) -> Tuple[str, str, str, str]:
+    """(subtotal, descuentos, iva, total) como texto, en el orden de UBLInvoice"""
+    return (
+        fields.text('line_extension_amount'),
+        fields.text('allowance_total_amount'),
+        fields.text('tax_amount'),
+        fields.text('payable_amount'),
+    )
@@ -0,0 +1,56 @@
+import zipfile
+from lxml import etree
+from typing import BinaryIO
+
+# Tipos de documento que reconoce el clasificador (nombre local del elemento raíz)
+DOCUMENT_INVOICE = 'Invoice'
+DOCUMENT_CREDIT_NOTE = 'CreditNote'
+DOCUMENT_ATTACHED = 'AttachedDocument'
+# Otro XML bien formado (firmas, ApplicationResponse, ...): no es una factura
+DOCUMENT_OTHER = 'other'
+# No se pudo determinar en los primeros bytes: se deja al parser completo
+DOCUMENT_UNKNOWN = 'unknown'
+
+INVOICE_DOCUMENT_TYPES = (DOCUMENT_INVOICE, DOCUMENT_CREDIT_NOTE, DOCUMENT_ATTACHED)
+
+SNIFF_CHUNK_SIZE = 1024
+SNIFF_MAX_BYTES = 8 * 1024
+
+
+def sniff_document_type(stream: BinaryIO, max_bytes: int = SNIFF_MAX_BYTES) -> str:
+    """
+    Clasifica un XML leyendo solo su inicio hasta encontrar el elemento raíz.
+
+    El parser incremental descarta declaración, BOM y comentarios igual que el
+    parser completo, y se detiene en el primer evento de inicio de elemento.
+    """
+    parser = etree.XMLPullParser(events=('start',))
+    read = 0
+    try:
+        while read < max_bytes:
+            chunk = stream.read(SNIFF_CHUNK_SIZE)
+            if not chunk:
+                break
+            read += len(chunk)
+            parser.feed(chunk)
+            for _, element in parser.read_events():
+                localname = etree.QName(element).localname
+                return localname if localname in INVOICE_DOCUMENT_TYPES else DOCUMENT_OTHER
+    except etree.XMLSyntaxError:
+        pass
+    return DOCUMENT_UNKNOWN
+
+
+def sniff_file(file_path: str) -> str:
+    """Clasifica un archivo XML del disco."""
+    try:
+        with open(file_path, 'rb') as f:
+            return sniff_document_type(f)
+    except OSError:
+        return DOCUMENT_UNKNOWN
+
+
+def sniff_zip_member(zf: zipfile.ZipFile, member: str) -> str:
+    """Clasifica un XML dentro de un ZIP descomprimiendo solo su inicio."""
+    with zf.open(member) as f:
+        return sniff_document_type(f)
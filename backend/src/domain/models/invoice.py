@@ -1,5 +1,15 @@
 from dataclasses import dataclass
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
+
+# Columnas de una factura en los listados (get_invoices) y las que se pueden proyectar con fields
+INVOICE_FIELDS = ['fecha', 'nit', 'proveedor', 'factura', 'subtotal', 'descuentos', 'iva', 'total', 'nombre_xml']
+SELECTABLE_INVOICE_FIELDS = ['id'] + INVOICE_FIELDS
+
+# Clave de orden de los listados de facturas (fecha DESC, proveedor ASC, id ASC): base del cursor
+InvoiceKey = Tuple[str, str, int]
+
+# Columnas de las líneas de factura (mismos nombres que la tabla factura_lineas)
+LINE_COLUMNS = ['linea', 'codigo', 'descripcion', 'cantidad', 'precio_unitario', 'valor', 'iva']
 
 @dataclass
 class InvoiceMetadata:
@@ -7,3 +17,20 @@ class InvoiceMetadata:
     issue_date: str
     supplier_name: str
     nit: str
+
+@dataclass(slots=True)
+class UBLInvoice:
+    """Registro compacto extraído de un XML UBL (Invoice, CreditNote o AttachedDocument)."""
+    document_type: str
+    invoice_number: Optional[str]
+    issue_date: Optional[str]
+    supplier_name: Optional[str]
+    nit: Optional[str]
+    is_credit_note: bool = False
+    # Solo se llenan en modo completo (metadata_only=False)
+    subtotal: Optional[float] = None
+    discounts: Optional[float] = None
+    tax: Optional[float] = None
+    total: Optional[float] = None
+    # Solo con with_lines=True: columna -> lista de valores (ver LINE_COLUMNS)
+    lines: Optional[Dict[str, List]] = None
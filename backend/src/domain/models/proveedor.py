@@ -0,0 +1,57 @@
+import re
+from typing import Optional
+
+_NO_DIGITS = re.compile(r'\D')
+# NIT de persona jurídica (9 dígitos, empieza por 8 o 9) con el dígito de verificación pegado
+_NIT_WITH_CHECK_DIGIT = re.compile(r'[89]\d{9}')
+# schemeName del CompanyID cuando el identificador es un NIT (13 = cédula)
+NIT_SCHEME_NAME = '31'
+# Pesos del dígito de verificación DIAN, del dígito menos significativo al más
+_CHECK_DIGIT_WEIGHTS = (3, 7, 13, 17, 19, 23, 29, 37, 41, 43, 47, 53, 59, 67, 71)
+
+
+def nit_check_digit(base: str) -> int:
+    """Dígito de verificación DIAN (módulo 11) de un NIT sin DV, solo dígitos."""
+    total = sum(int(digit) * weight for digit, weight in zip(reversed(base), _CHECK_DIGIT_WEIGHTS))
+    remainder = total % 11
+    return remainder if remainder < 2 else 11 - remainder
+
+
+def strip_check_digit(nit: str, check_digit: Optional[str], scheme_name: Optional[str] = None) -> str:
+    """
+    Quita el dígito de verificación que el emisor pegó al NIT sin guion, si
+    check_digit (el schemeID del CompanyID en UBL) lo declara y es el correcto:
+    ('8001972684', '4') -> '800197268'. Solo aplica a NITs (schemeName 31) de 10
+    dígitos: con 9 no se distingue un NIT de persona jurídica de una cédula de 8
+    con su DV. En cualquier otro caso retorna nit tal cual.
+    """
+    if scheme_name and scheme_name != NIT_SCHEME_NAME:
+        return nit
+    if not check_digit or not check_digit.isdigit() or not nit.isdigit() or len(nit) != 10:
+        return nit
+    base = nit[:-1]
+    if nit[-1] == check_digit and nit_check_digit(base) == int(check_digit):
+        return base
+    return nit
+
+
+def normalize_nit(nit: Optional[str]) -> Optional[str]:
+    """
+    NIT sin dígito de verificación ni separadores: '900.123.456-7' -> '900123456'.
+
+    Sin guion, el DV solo se reconoce en NITs de persona jurídica (10 dígitos que
+    empiezan por 8 o 9) cuyo último dígito es el DV de los 9 primeros; una cédula
+    se conserva completa. Es la clave de la dimensión proveedores y la forma en que
+    se guarda facturas.nit. Un identificador sin dígitos (proveedor extranjero) se
+    conserva, sin espacios alrededor.
+    Debe coincidir con la función SQL normalizar_nit (migrations/0006_nit_digito_verificacion.sql).
+    """
+    if not nit:
+        return nit
+    nit = nit.strip()
+    digits = _NO_DIGITS.sub('', nit.split('-', 1)[0])
+    if not digits:
+        return nit
+    if _NIT_WITH_CHECK_DIGIT.fullmatch(digits) and nit_check_digit(digits[:9]) == int(digits[9]):
+        return digits[:9]
+    return digits
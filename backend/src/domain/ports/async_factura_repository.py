@@ -0,0 +1,45 @@
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+from datetime import date
+from src.domain.models.invoice import InvoiceKey
+
+class AsyncFacturaRepository(ABC):
+    """
+    Consultas de facturas para la API, con métodos awaitables que no bloquean el event loop.
+
+    Solo cubre lecturas: la importación y exportación masivas (y los scripts) siguen
+    usando FacturaRepository síncrono.
+    """
+
+    @abstractmethod
+    async def get_distinct_providers(self, start_date: Optional[date] = None, end_date: Optional[date] = None) -> List[str]:
+        """Obtiene la lista de proveedores únicos filtrados por fecha."""
+        pass
+
+    @abstractmethod
+    async def get_invoices_page(
+        self,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        provider: Optional[str] = None,
+        limit: Optional[int] = None,
+        after: Optional[InvoiceKey] = None,
+        fields: Optional[List[str]] = None
+    ) -> Tuple[List[dict], Optional[InvoiceKey]]:
+        """Igual que FacturaRepository.get_invoices_page."""
+        pass
+
+    @abstractmethod
+    async def count_invoices(self, start_date: Optional[date] = None, end_date: Optional[date] = None, provider: Optional[str] = None) -> int:
+        """Cuenta las facturas que cumplen los filtros (total de la paginación)."""
+        pass
+
+    @abstractmethod
+    async def get_invoice_lines(self, start_date: Optional[date] = None, end_date: Optional[date] = None, provider: Optional[str] = None) -> Dict[str, list]:
+        """Igual que FacturaRepository.get_invoice_lines (columnar)."""
+        pass
+
+    @abstractmethod
+    async def get_stats(self, start_date: Optional[date] = None, end_date: Optional[date] = None) -> dict:
+        """Obtiene estadísticas agregadas de las facturas."""
+        pass
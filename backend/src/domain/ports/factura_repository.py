@@ -1,12 +1,17 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from typing import Dict, Iterator, List, Optional, Set, Tuple
 from datetime import date
-from src.domain.models.invoice import InvoiceMetadata
+from src.domain.models.invoice import InvoiceMetadata, InvoiceKey
 
 class FacturaRepository(ABC):
     @abstractmethod
     def save(self, factura: dict) -> tuple[str, Optional[str]]:
-        """Guarda una factura en la base de datos. Retorna (status, message)"""
+        """Guarda una factura (y sus líneas en 'lineas', si vienen) en la base de datos. Retorna (status, message)"""
+        pass
+
+    @abstractmethod
+    def save_many(self, facturas: List[dict]) -> List[tuple[str, Optional[str]]]:
+        """Guarda un lote de facturas en una sola transacción. Retorna (status, message) por factura, en el mismo orden."""
         pass
 
     @abstractmethod
@@ -14,16 +19,57 @@ class FacturaRepository(ABC):
         """Obtiene la lista de proveedores únicos filtrados por fecha."""
         pass
 
+    @abstractmethod
+    def get_provider_nits(self, provider: str) -> Set[str]:
+        """NIT normalizados de los proveedores cuyo nombre canónico es provider (vacío si no hay)."""
+        pass
+
     @abstractmethod
     def check_exists(self, nit: str, factura: str) -> bool:
         """Verifica si una factura ya existe en la base de datos."""
         pass
 
+    @abstractmethod
+    def check_exists_many(self, keys: List[Tuple[str, str]]) -> Set[Tuple[str, str]]:
+        """Verifica un lote de claves (nit, factura) en una sola consulta. Retorna las que ya existen."""
+        pass
+
     @abstractmethod
     def get_invoices(self, start_date: Optional[date] = None, end_date: Optional[date] = None, provider: Optional[str] = None) -> List[dict]:
         """Obtiene facturas según filtros de fecha y proveedor."""
         pass
 
+    @abstractmethod
+    def get_invoices_page(
+        self,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        provider: Optional[str] = None,
+        limit: Optional[int] = None,
+        after: Optional[InvoiceKey] = None,
+        fields: Optional[List[str]] = None
+    ) -> Tuple[List[dict], Optional[InvoiceKey]]:
+        """
+        Página de facturas en orden (fecha DESC, proveedor, id), continuando después de la clave after.
+        Retorna (facturas, clave_siguiente); clave_siguiente es None en la última página.
+        """
+        pass
+
+    @abstractmethod
+    def iter_invoices(self, start_date: Optional[date] = None, end_date: Optional[date] = None, provider: Optional[str] = None, chunk_size: int = 2000) -> Iterator[List[dict]]:
+        """Recorre las facturas filtradas (mismo orden que get_invoices) en bloques de hasta chunk_size filas."""
+        pass
+
+    @abstractmethod
+    def count_invoices(self, start_date: Optional[date] = None, end_date: Optional[date] = None, provider: Optional[str] = None) -> int:
+        """Cuenta las facturas que cumplen los filtros (total de la paginación)."""
+        pass
+
+    @abstractmethod
+    def get_invoice_lines(self, start_date: Optional[date] = None, end_date: Optional[date] = None, provider: Optional[str] = None) -> Dict[str, list]:
+        """Obtiene las líneas de las facturas filtradas en formato columnar (columna -> lista)."""
+        pass
+
     @abstractmethod
     def get_stats(self, start_date: Optional[date] = None, end_date: Optional[date] = None) -> dict:
         """Obtiene estadísticas de las facturas en el repositorio."""
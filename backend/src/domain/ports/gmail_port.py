@@ -1,10 +1,35 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 
 class GmailPort(ABC):
+    """
+    Acceso a Gmail. get_attachments, download_attachment, get_message_metadata,
+    get_thread_messages y trash_message pueden llamarse desde varios hilos a la vez.
+    """
+
+    @abstractmethod
+    def search_unprocessed_emails(self, label_name: str) -> Tuple[List[Dict[str, Any]], bool]:
+        """Busca correos que no tengan la etiqueta de procesado. Retorna (correos, truncada): truncada si quedaron correos por fuera del tope."""
+        pass
+
+    @abstractmethod
+    def get_current_history_id(self) -> str:
+        """historyId actual del buzón (punto de partida de la próxima sincronización)."""
+        pass
+
+    @abstractmethod
+    def search_emails_since(self, history_id: str, label_name: str) -> Optional[List[Dict[str, Any]]]:
+        """Correos llegados al INBOX desde history_id y aún sin la etiqueta; None si ese historial ya expiró."""
+        pass
+
     @abstractmethod
-    def search_unprocessed_emails(self, label_name: str) -> List[Dict[str, Any]]:
-        """Busca correos que no tengan la etiqueta de procesado."""
+    def load_history_watermark(self) -> Optional[str]:
+        """Último historyId guardado tras una corrida exitosa, o None."""
+        pass
+
+    @abstractmethod
+    def save_history_watermark(self, history_id: str):
+        """Guarda el historyId hasta el que se sincronizó."""
         pass
 
     @abstractmethod
@@ -22,6 +47,11 @@ class GmailPort(ABC):
         """Aplica la etiqueta de procesado al correo."""
         pass
 
+    @abstractmethod
+    def mark_many_as_processed(self, message_ids: List[str], label_name: str):
+        """Aplica la etiqueta de procesado a varios correos con el mínimo de llamadas."""
+        pass
+
     @abstractmethod
     def ensure_label_exists(self, label_name: str):
         """Asegura que la etiqueta exista en Gmail."""
@@ -32,6 +62,11 @@ class GmailPort(ABC):
         """Obtiene metadatos básicos del correo (Remitente, Fecha)."""
         pass
 
+    @abstractmethod
+    def get_messages_metadata(self, message_ids: List[str]) -> Dict[str, Dict[str, str]]:
+        """Metadatos de varios correos en lotes (una petición HTTP por lote). Retorna id -> metadatos; omite los que fallen."""
+        pass
+
     @abstractmethod
     def extract_metadata(self, message: Dict[str, Any]) -> Dict[str, str]:
         """Extrae metadatos de un objeto de mensaje ya cargado."""
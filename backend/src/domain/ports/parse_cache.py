@@ -0,0 +1,27 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional, Tuple
+
+ParseResult = Tuple[Optional[Dict[str, Any]], Optional[str]]
+# (resultado del parseo, tipo de documento del clasificador): con un acierto no hace falta leer el archivo
+CacheEntry = Tuple[ParseResult, str]
+
+class ParseCache(ABC):
+    @abstractmethod
+    def get(self, file_path: str) -> Optional[CacheEntry]:
+        """Retorna ((data, error_msg), tipo_documento) si el archivo no ha cambiado, o None."""
+        pass
+
+    @abstractmethod
+    def put(self, file_path: str, result: ParseResult, document_type: str):
+        """Guarda el resultado del parseo de un archivo y su tipo de documento."""
+        pass
+
+    @abstractmethod
+    def evict_missing(self, directory: str, recursive: bool = False):
+        """Elimina las entradas de archivos del directorio (y subcarpetas si recursive) que ya no existen."""
+        pass
+
+    @abstractmethod
+    def flush(self):
+        """Persiste los cambios pendientes y aplica el límite de tamaño."""
+        pass
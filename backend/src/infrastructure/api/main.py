@@ -5,11 +5,22 @@ from src.application.services.invoice_processor_service import InvoiceProcessorS
 from src.application.services.exporter_service import ExporterService
 from src.infrastructure.external.google_gmail_service import GoogleGmailService
 from src.infrastructure.database.postgres_factura_repository import PostgresFacturaRepository
+from src.infrastructure.database.async_postgres_factura_repository import AsyncPostgresFacturaRepository
+from src.infrastructure.database.async_connection import open_async_pool, close_async_pool, get_async_pool_stats
+from src.infrastructure.database.connection import init_connection_pool, close_all_connections, get_pool_stats
+from src.infrastructure.cache.sqlite_parse_cache import SqliteParseCache
+from src.infrastructure.cache.result_cache import ResultCache, WriteGeneration
+from src.infrastructure.cache.cached_factura_repository import CachedAsyncFacturaRepository
+from src.application.services.ubl_parser import PARSER_VERSION
+from src.application.services.line_items import lines_frame_from_columns, summarize_lines, SUMMARY_GROUPS
+from src.application.services.pagination import encode_cursor, decode_cursor
+from src.domain.models.invoice import SELECTABLE_INVOICE_FIELDS
 import os
 import asyncio
 import subprocess
 import logging
 import sys
+from contextlib import asynccontextmanager
 from datetime import date
 from typing import Optional, List
 
@@ -28,7 +39,19 @@ logging.basicConfig(
 logger = logging.getLogger("api")
 logger.info(f"Iniciando API. Log en: {LOG_PATH}")
 
-app = FastAPI(title="Gmail Invoice Processor API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pools creados (y precalentados) en el arranque: el síncrono de importación/exportación
+    # y el asíncrono de las consultas del dashboard
+    await asyncio.to_thread(init_connection_pool)
+    await open_async_pool()
+    try:
+        yield
+    finally:
+        await close_async_pool()
+        close_all_connections()
+
+app = FastAPI(title="Gmail Invoice Processor API", lifespan=lifespan)
 
 # Configurar CORS robusto
 app.add_middleware(
@@ -46,12 +69,57 @@ class ProcessRequest(BaseModel):
     start_date: Optional[date] = None
     end_date: Optional[date] = None
     provider: Optional[str] = None
+    # Procesos para parsear XMLs en import-db (1 = secuencial)
+    workers: int = 1
+    # Facturas por lote en import-db (transacción al guardar, consulta en previsualización)
+    batch_size: int = 500
+    # Escaneo de import-db: subcarpetas (2023/, 2024/...), globs y carpetas a omitir
+    recursive: bool = False
+    include_patterns: Optional[List[str]] = None
+    exclude_patterns: Optional[List[str]] = None
+    exclude_dirs: Optional[List[str]] = None
+    # process: solo correos nuevos desde la última corrida exitosa (historial de Gmail)
+    incremental: bool = False
+    # process: hilos de Gmail descargados en paralelo (None = GMAIL_CONCURRENCY, 1 = secuencial)
+    concurrency: Optional[int] = None
+
+# Tamaño máximo de página en GET /api/v1/invoices
+MAX_PAGE_SIZE = 1000
 
 CREDENTIALS_PATH = os.path.abspath("credentials.json")
 TOKEN_PATH = os.path.abspath("token.json")
+# Último historyId sincronizado con Gmail (process con incremental)
+GMAIL_SYNC_STATE_PATH = os.getenv('GMAIL_SYNC_STATE_PATH', os.path.abspath("gmail_sync_state.json"))
+# Descargas simultáneas de Gmail en process: secuencial salvo que se suba (la cuota por usuario limita cuánto sirve)
+GMAIL_CONCURRENCY = int(os.getenv('GMAIL_CONCURRENCY', '1'))
+MAX_GMAIL_CONCURRENCY = 16
+
+# Instancias globales de los repositorios: el síncrono para importar/exportar
+# (corre en hilos con asyncio.to_thread) y el asíncrono para las consultas.
+# Las consultas pasan por una caché que se invalida cuando el síncrono guarda facturas.
+write_generation = WriteGeneration()
+factura_repo = PostgresFacturaRepository(write_generation=write_generation)
+result_cache = ResultCache(
+    write_generation,
+    max_entries=int(os.getenv('RESULT_CACHE_MAX_ENTRIES', '512')),
+    ttl=float(os.getenv('RESULT_CACHE_TTL', '300'))
+)
+async_factura_repo = CachedAsyncFacturaRepository(
+    AsyncPostgresFacturaRepository(),
+    result_cache,
+    max_rows=int(os.getenv('RESULT_CACHE_MAX_ROWS', '10000'))
+)
 
-# Instancia global del repositorio
-factura_repo = PostgresFacturaRepository()
+# Caché de parseo de XMLs (evita re-parsear archivos sin cambios en import-db)
+PARSE_CACHE_PATH = os.getenv(
+    'PARSE_CACHE_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(BASE_DIR))), "parse_cache.sqlite3")
+)
+parse_cache = SqliteParseCache(
+    PARSE_CACHE_PATH,
+    parser_version=PARSER_VERSION,
+    max_entries=int(os.getenv('PARSE_CACHE_MAX_ENTRIES', '50000'))
+)
 
 @app.get("/api/v1/utils/list-directory")
 async def list_directory(path: str = Query("/app/data")):
@@ -93,10 +161,14 @@ async def process_invoices(request: ProcessRequest):
             logger.error(f"Archivo de credenciales no encontrado en: {CREDENTIALS_PATH}")
             raise FileNotFoundError(f"Falta 'credentials.json' en {CREDENTIALS_PATH}")
 
-        gmail_service = GoogleGmailService(CREDENTIALS_PATH, TOKEN_PATH)
+        gmail_service = GoogleGmailService(CREDENTIALS_PATH, TOKEN_PATH, GMAIL_SYNC_STATE_PATH)
         processor = InvoiceProcessorService(gmail_service)
+        concurrency = max(1, min(request.concurrency or GMAIL_CONCURRENCY, MAX_GMAIL_CONCURRENCY))
         
-        process_data = processor.process_all_new_invoices(request.target_directory, request.max_emails)
+        process_data = await asyncio.to_thread(
+            processor.process_all_new_invoices, request.target_directory, request.max_emails,
+            request.incremental, concurrency
+        )
         results = process_data["results"]
         stats = process_data["stats"]
         
@@ -105,6 +177,7 @@ async def process_invoices(request: ProcessRequest):
             "status": "completed",
             "results": results,
             "stats": stats,
+            "sync": process_data["sync"],
             "message": f"Se procesaron {len(results)} correos."
         }
     except FileNotFoundError as e:
@@ -116,7 +189,7 @@ async def process_invoices(request: ProcessRequest):
 
 @app.post("/api/v1/invoices/import-db")
 async def import_invoices_to_db(request: ProcessRequest):
-    logger.info(f"Petición POST /api/v1/invoices/import-db - Dir: {request.target_directory}, Preview: {request.dry_run}, Filtros: {request.start_date} a {request.end_date}, Prov: {request.provider}")
+    logger.info(f"Petición POST /api/v1/invoices/import-db - Dir: {request.target_directory}, Preview: {request.dry_run}, Filtros: {request.start_date} a {request.end_date}, Prov: {request.provider}, Workers: {request.workers}, Recursivo: {request.recursive}")
     try:
         exporter = ExporterService()
         filters = {
@@ -124,7 +197,18 @@ async def import_invoices_to_db(request: ProcessRequest):
             'end_date': request.end_date,
             'provider': request.provider
         }
-        result = exporter.import_to_db(request.target_directory, factura_repo, dry_run=request.dry_run, filters=filters)
+        scan_options = {
+            'recursive': request.recursive,
+            'include_patterns': request.include_patterns,
+            'exclude_patterns': request.exclude_patterns,
+            'exclude_dirs': request.exclude_dirs
+        }
+        result = await asyncio.to_thread(
+            exporter.import_to_db,
+            request.target_directory, factura_repo, dry_run=request.dry_run, filters=filters,
+            parse_cache=parse_cache, workers=request.workers, scan_options=scan_options,
+            batch_size=request.batch_size
+        )
         return result
     except Exception as e:
         logger.error(f"Error en import_invoices_to_db: {str(e)}")
@@ -138,7 +222,7 @@ async def get_invoices_stats(
     """Endpoint para obtener estadísticas del dashboard"""
     logger.info(f"Petición GET /api/v1/invoices/stats - Filtros: {start_date} a {end_date}")
     try:
-        stats = factura_repo.get_stats(start_date, end_date)
+        stats = await async_factura_repo.get_stats(start_date, end_date)
         return {"stats": stats}
     except Exception as e:
         logger.error(f"Error en get_invoices_stats: {str(e)}")
@@ -151,7 +235,7 @@ async def get_providers(
 ):
     logger.info(f"Petición GET /api/v1/invoices/providers - Filtros: {start_date} a {end_date}")
     try:
-        providers = factura_repo.get_distinct_providers(start_date, end_date)
+        providers = await async_factura_repo.get_distinct_providers(start_date, end_date)
         logger.info(f"Proveedores encontrados: {len(providers)}")
         return {"providers": providers}
     except Exception as e:
@@ -169,16 +253,73 @@ class ExportDBRequest(BaseModel):
 async def get_invoices_list(
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
-    provider: Optional[str] = Query(None)
+    provider: Optional[str] = Query(None),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None),
+    include_count: bool = Query(True)
 ):
-    logger.info(f"Petición GET /api/v1/invoices - Filtros: {start_date} a {end_date}, Prov: {provider}")
+    """
+    Listado de facturas. Sin limit retorna todas (compatibilidad); con limit pagina por
+    keyset: next_cursor se pasa como cursor para pedir la siguiente página. fields
+    (separados por coma) limita las columnas. count sale de un COUNT(*) aparte y se
+    puede omitir con include_count=false en las páginas siguientes.
+    """
+    logger.info(f"Petición GET /api/v1/invoices - Filtros: {start_date} a {end_date}, Prov: {provider}, Límite: {limit}, Cursor: {bool(cursor)}")
+    selected_fields = None
+    if fields:
+        selected_fields = [f.strip() for f in fields.split(',') if f.strip()]
+        invalid = [f for f in selected_fields if f not in SELECTABLE_INVOICE_FIELDS]
+        if invalid:
+            raise HTTPException(status_code=400, detail=f"Campos no válidos: {', '.join(invalid)}")
     try:
-        invoices = factura_repo.get_invoices(start_date, end_date, provider)
-        return {"invoices": invoices, "count": len(invoices)}
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        invoices, next_key = await async_factura_repo.get_invoices_page(
+            start_date, end_date, provider, limit=limit, after=after, fields=selected_fields
+        )
+        if limit is None:
+            count = len(invoices)
+        else:
+            count = await async_factura_repo.count_invoices(start_date, end_date, provider) if include_count else None
+        return {
+            "invoices": invoices,
+            "count": count,
+            "next_cursor": encode_cursor(next_key) if next_key else None
+        }
     except Exception as e:
         logger.error(f"Error en get_invoices_list: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/v1/invoices/lines/summary")
+async def get_invoice_lines_summary(
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
+    provider: Optional[str] = Query(None),
+    group_by: str = Query("descripcion"),
+    limit: int = Query(50, ge=1, le=1000)
+):
+    """Agregado de las líneas de factura (cantidad, valor, IVA) para análisis de costos"""
+    logger.info(f"Petición GET /api/v1/invoices/lines/summary - Filtros: {start_date} a {end_date}, Prov: {provider}, Agrupar: {group_by}")
+    if group_by not in SUMMARY_GROUPS:
+        raise HTTPException(status_code=400, detail=f"group_by debe ser uno de {', '.join(SUMMARY_GROUPS)}")
+    try:
+        columns = await async_factura_repo.get_invoice_lines(start_date, end_date, provider)
+        # La agregación con pandas es CPU: se hace fuera del event loop
+        frame = await asyncio.to_thread(lines_frame_from_columns, columns)
+        summary = await asyncio.to_thread(summarize_lines, frame, group_by, limit)
+        return {
+            "summary": summary,
+            "total_lines": len(frame),
+            "group_by": group_by
+        }
+    except Exception as e:
+        logger.error(f"Error en get_invoice_lines_summary: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/api/v1/invoices/export-db")
 async def export_invoices_db(request: ExportDBRequest):
     logger.info(f"Petición POST /api/v1/invoices/export-db - Formatos: {request.formats}")
@@ -189,12 +330,19 @@ async def export_invoices_db(request: ExportDBRequest):
             'end_date': request.end_date,
             'provider': request.provider
         }
-        result = exporter.export_from_db(factura_repo, filters, request.formats, request.output_directory)
+        result = await asyncio.to_thread(
+            exporter.export_from_db, factura_repo, filters, request.formats, request.output_directory
+        )
         return result
     except Exception as e:
         logger.error(f"Error en export_invoices_db: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/v1/utils/db-pool")
+async def db_pool_stats():
+    """Métricas de los pools de conexiones (espera de checkout, en uso, agotamientos) y de la caché de consultas"""
+    return {"sync": get_pool_stats(), "async": get_async_pool_stats(), "result_cache": result_cache.stats()}
+
 @app.get("/health")
 async def health_check():
     return {"status": "ok"}
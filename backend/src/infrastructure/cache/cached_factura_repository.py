@@ -0,0 +1,72 @@
+from src.domain.ports.async_factura_repository import AsyncFacturaRepository
+from src.infrastructure.cache.result_cache import ResultCache
+from src.domain.models.invoice import InvoiceKey
+from datetime import date
+from typing import Callable, List, Optional, Dict, Any
+
+# Filas máximas de un listado sin limit para guardarlo en la caché
+DEFAULT_MAX_CACHED_ROWS = 10000
+
+
+class CachedAsyncFacturaRepository(AsyncFacturaRepository):
+    """
+    Caché de las lecturas del dashboard delante de otro AsyncFacturaRepository.
+
+    La clave es el método con sus filtros; entre importaciones (sin cambios de la
+    generación de escritura) las consultas repetidas se responden desde memoria.
+    La caché se acota por número de entradas, así que las páginas sin limit (el
+    listado completo del dashboard) solo se guardan si tienen hasta max_rows filas;
+    las líneas no se guardan.
+    """
+
+    def __init__(self, repository: AsyncFacturaRepository, cache: ResultCache, max_rows: int = DEFAULT_MAX_CACHED_ROWS):
+        self.repository = repository
+        self.cache = cache
+        self.max_rows = max_rows
+
+    async def _cached(self, key: tuple, query, cacheable: Optional[Callable[[Any], bool]] = None):
+        value = self.cache.get(key)
+        if not self.cache.is_miss(value):
+            return value
+        # Generación leída antes de consultar: una escritura concurrente invalida este resultado
+        generation = self.cache.generation.value
+        value = await query()
+        if cacheable is None or cacheable(value):
+            self.cache.put(key, value, generation)
+        return value
+
+    async def get_distinct_providers(self, start_date: Optional[date] = None, end_date: Optional[date] = None) -> List[str]:
+        return await self._cached(
+            ('providers', start_date, end_date),
+            lambda: self.repository.get_distinct_providers(start_date, end_date)
+        )
+
+    async def get_invoices_page(
+        self,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        provider: Optional[str] = None,
+        limit: Optional[int] = None,
+        after: Optional[InvoiceKey] = None,
+        fields: Optional[List[str]] = None
+    ) -> tuple[List[Dict[str, Any]], Optional[InvoiceKey]]:
+        query = lambda: self.repository.get_invoices_page(start_date, end_date, provider, limit, after, fields)
+        key = ('invoices_page', start_date, end_date, provider, limit, after, tuple(fields) if fields else None)
+        if limit:
+            return await self._cached(key, query)
+        return await self._cached(key, query, cacheable=lambda page: len(page[0]) <= self.max_rows)
+
+    async def count_invoices(self, start_date: Optional[date] = None, end_date: Optional[date] = None, provider: Optional[str] = None) -> int:
+        return await self._cached(
+            ('count', start_date, end_date, provider),
+            lambda: self.repository.count_invoices(start_date, end_date, provider)
+        )
+
+    async def get_invoice_lines(self, start_date: Optional[date] = None, end_date: Optional[date] = None, provider: Optional[str] = None) -> Dict[str, list]:
+        return await self.repository.get_invoice_lines(start_date, end_date, provider)
+
+    async def get_stats(self, start_date: Optional[date] = None, end_date: Optional[date] = None) -> Dict[str, Any]:
+        return await self._cached(
+            ('stats', start_date, end_date),
+            lambda: self.repository.get_stats(start_date, end_date)
+        )
@@ -0,0 +1,91 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+_MISS = object()
+
+
+class WriteGeneration:
+    """
+    Contador de escrituras a la base. Los repositorios lo incrementan al confirmar
+    facturas nuevas; un resultado en caché solo vale si se calculó en la generación actual.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._value = 0
+
+    @property
+    def value(self) -> int:
+        return self._value
+
+    def bump(self) -> int:
+        with self._lock:
+            self._value += 1
+            return self._value
+
+
+class ResultCache:
+    """
+    Caché LRU en memoria de resultados de consultas, acotada a max_entries.
+
+    Cada entrada guarda la generación de escritura con la que se calculó: al cambiar
+    la generación deja de servirse (y se descarta al pedirla). ttl acota además la
+    antigüedad, para escrituras que no pasan por este proceso (scripts, otros workers).
+    Los valores se comparten entre peticiones: quien los lee no debe modificarlos.
+    """
+
+    def __init__(self, generation: WriteGeneration, max_entries: int = 512, ttl: Optional[float] = 300.0):
+        self.generation = generation
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[int, float, Any]]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key: Hashable) -> Any:
+        """Valor guardado y vigente para key, o _MISS (usar is_miss)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                generation, stored_at, value = entry
+                if generation == self.generation.value and (self.ttl is None or time.monotonic() - stored_at < self.ttl):
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return value
+                del self._entries[key]
+            self._misses += 1
+            return _MISS
+
+    def put(self, key: Hashable, value: Any, generation: int):
+        """Guarda value calculado en generation (la leída ANTES de consultar: si hubo una escritura en medio, la entrada ya nace vencida)."""
+        with self._lock:
+            self._entries[key] = (generation, time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    @staticmethod
+    def is_miss(value: Any) -> bool:
+        return value is _MISS
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'generation': self.generation.value,
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'hit_rate': round(self._hits / lookups, 4) if lookups else 0.0,
+            }
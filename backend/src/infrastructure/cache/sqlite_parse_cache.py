@@ -0,0 +1,167 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Optional
+from src.domain.ports.parse_cache import CacheEntry, ParseCache, ParseResult
+
+logger = logging.getLogger("parse_cache")
+
+# Escrituras acumuladas antes de volcarlas a disco (memoria acotada en importaciones grandes)
+FLUSH_EVERY = 1000
+
+
+class SqliteParseCache(ParseCache):
+    """
+    Caché persistente de resultados de parseo en SQLite.
+
+    La clave es la identidad del archivo: (ruta, tamaño, mtime, hash del contenido).
+    Si tamaño y mtime coinciden se confía en la entrada sin leer el archivo; si
+    solo coincide el tamaño se compara el hash (archivo copiado o "tocado").
+    Toda la caché se invalida cuando cambia la versión del parser.
+    """
+
+    def __init__(self, db_path: str, parser_version: int, max_entries: int = 50000):
+        self.db_path = db_path
+        self.parser_version = parser_version
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._pending_puts = []
+        self._pending_touches = {}
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._init_schema()
+
+    def _init_schema(self):
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    path TEXT PRIMARY KEY,
+                    directory TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_directory ON entries(directory)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_last_used ON entries(last_used)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'parser_version'").fetchone()
+            if row is None or row[0] != str(self.parser_version):
+                if row is not None:
+                    logger.info(f"Versión del parser cambió ({row[0]} -> {self.parser_version}), invalidando caché de parseo")
+                self._conn.execute("DELETE FROM entries")
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('parser_version', ?)",
+                    (str(self.parser_version),)
+                )
+
+    @staticmethod
+    def _content_hash(file_path: str) -> str:
+        with open(file_path, 'rb') as f:
+            return hashlib.file_digest(f, 'sha256').hexdigest()
+
+    def get(self, file_path: str) -> Optional[CacheEntry]:
+        file_path = os.path.abspath(file_path)
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            return None
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns, content_hash, result FROM entries WHERE path = ?",
+                (file_path,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        size, mtime_ns, content_hash, result = row
+        if size != st.st_size:
+            return None
+        if mtime_ns != st.st_mtime_ns:
+            # Mismo tamaño pero otro mtime: solo es válida si el contenido es idéntico
+            if self._content_hash(file_path) != content_hash:
+                return None
+
+        with self._lock:
+            self._pending_touches[file_path] = (st.st_mtime_ns, time.time())
+            should_flush = len(self._pending_puts) + len(self._pending_touches) >= FLUSH_EVERY
+        if should_flush:
+            self.flush()
+        entry = json.loads(result)
+        if len(entry) != 3:
+            # Entrada guardada sin tipo de documento: se vuelve a clasificar y parsear
+            return None
+        data, error, document_type = entry
+        return (data, error), document_type
+
+    def put(self, file_path: str, result: ParseResult, document_type: str):
+        file_path = os.path.abspath(file_path)
+        try:
+            st = os.stat(file_path)
+            content_hash = self._content_hash(file_path)
+        except OSError:
+            return
+
+        with self._lock:
+            self._pending_puts.append((
+                file_path, os.path.dirname(file_path), st.st_size, st.st_mtime_ns,
+                content_hash, json.dumps([*result, document_type]), time.time()
+            ))
+            should_flush = len(self._pending_puts) + len(self._pending_touches) >= FLUSH_EVERY
+        if should_flush:
+            self.flush()
+
+    def evict_missing(self, directory: str, recursive: bool = False):
+        directory = os.path.abspath(directory)
+        with self._lock, self._conn:
+            if recursive:
+                # Prefijo con separador para no tocar carpetas hermanas con el mismo inicio
+                prefix = directory.rstrip(os.sep) + os.sep
+                rows = self._conn.execute(
+                    "SELECT path FROM entries WHERE directory = ? OR substr(directory, 1, ?) = ?",
+                    (directory, len(prefix), prefix)
+                )
+            else:
+                rows = self._conn.execute("SELECT path FROM entries WHERE directory = ?", (directory,))
+            deleted = [(path,) for (path,) in rows.fetchall() if not os.path.exists(path)]
+            if deleted:
+                self._conn.executemany("DELETE FROM entries WHERE path = ?", deleted)
+                logger.debug(f"Caché de parseo: {len(deleted)} entradas eliminadas de {directory}")
+
+    def flush(self):
+        with self._lock, self._conn:
+            if self._pending_puts:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO entries (path, directory, size, mtime_ns, content_hash, result, last_used) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    self._pending_puts
+                )
+            if self._pending_touches:
+                self._conn.executemany(
+                    "UPDATE entries SET mtime_ns = ?, last_used = ? WHERE path = ?",
+                    [(mtime_ns, used, path) for path, (mtime_ns, used) in self._pending_touches.items()]
+                )
+            self._pending_puts = []
+            self._pending_touches = {}
+
+            # Límite de tamaño: expulsar las entradas usadas hace más tiempo
+            count = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            overflow = count - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM entries WHERE path IN (SELECT path FROM entries ORDER BY last_used ASC LIMIT ?)",
+                    (overflow,)
+                )
+                logger.debug(f"Caché de parseo: {overflow} entradas expulsadas por tamaño")
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._conn.close()
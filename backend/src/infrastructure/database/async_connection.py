@@ -0,0 +1,61 @@
+import os
+import logging
+from typing import Dict, Optional
+from psycopg.conninfo import make_conninfo
+from psycopg_pool import AsyncConnectionPool
+from src.infrastructure.database.connection import DB_CONFIG
+
+logger = logging.getLogger("database")
+
+# Pool asíncrono (psycopg 3) de la API. Convive con el pool psycopg2 de
+# connection.py, que siguen usando la importación/exportación y los scripts.
+_async_pool: Optional[AsyncConnectionPool] = None
+
+
+def _conninfo() -> str:
+    # psycopg 3 usa 'dbname' donde psycopg2 acepta 'database'
+    params = {('dbname' if k == 'database' else k): v for k, v in DB_CONFIG.items()}
+    return make_conninfo(**params)
+
+
+async def open_async_pool() -> AsyncConnectionPool:
+    """
+    Crea y abre el pool asíncrono global (se llama en el arranque de la API).
+
+    Usa los mismos DB_POOL_MIN_SIZE / DB_POOL_MAX_SIZE que el pool síncrono, con
+    DB_ASYNC_POOL_MAX_SIZE para ajustar solo el de la API.
+    """
+    global _async_pool
+
+    if _async_pool is None:
+        min_size = int(os.getenv('DB_POOL_MIN_SIZE', '1'))
+        max_size = int(os.getenv('DB_ASYNC_POOL_MAX_SIZE', os.getenv('DB_POOL_MAX_SIZE', '10')))
+        logger.info(f"Inicializando pool asíncrono: min={min_size}, max={max_size}")
+        _async_pool = AsyncConnectionPool(_conninfo(), min_size=min_size, max_size=max_size, open=False)
+        await _async_pool.open()
+        logger.info("Pool asíncrono inicializado correctamente")
+
+    return _async_pool
+
+
+def get_async_pool() -> AsyncConnectionPool:
+    """Pool asíncrono ya abierto por open_async_pool."""
+    if _async_pool is None:
+        raise RuntimeError("El pool asíncrono no está inicializado (falta open_async_pool en el arranque)")
+    return _async_pool
+
+
+def get_async_pool_stats() -> Optional[Dict[str, int]]:
+    """Métricas de psycopg_pool (requests_waiting, requests_wait_ms, pool_size...), None si no está abierto."""
+    return _async_pool.get_stats() if _async_pool is not None else None
+
+
+async def close_async_pool():
+    """Cierra el pool asíncrono. Debe llamarse al shutdown de la aplicación."""
+    global _async_pool
+
+    if _async_pool is not None:
+        logger.info("Cerrando pool asíncrono...")
+        await _async_pool.close()
+        _async_pool = None
+        logger.info("Pool asíncrono cerrado")
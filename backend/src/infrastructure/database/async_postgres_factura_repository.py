@@ -0,0 +1,57 @@
+from src.domain.ports.async_factura_repository import AsyncFacturaRepository
+from src.infrastructure.database.async_connection import get_async_pool
+from src.infrastructure.database import factura_queries as queries
+from src.domain.models.invoice import INVOICE_FIELDS, InvoiceKey
+from datetime import date
+from typing import List, Optional, Dict, Any
+
+
+class AsyncPostgresFacturaRepository(AsyncFacturaRepository):
+    """
+    Lecturas de la API sobre el pool asíncrono de psycopg 3.
+
+    Ejecuta las mismas consultas que PostgresFacturaRepository (factura_queries),
+    pero mientras PostgreSQL responde el event loop sigue atendiendo otras peticiones.
+    """
+
+    async def _fetchall(self, query: str, params: list) -> list:
+        async with get_async_pool().connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(query, params)
+                return await cur.fetchall()
+
+    async def _fetchone(self, query: str, params: list) -> tuple:
+        async with get_async_pool().connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(query, params)
+                return await cur.fetchone()
+
+    async def get_distinct_providers(self, start_date: Optional[date] = None, end_date: Optional[date] = None) -> List[str]:
+        rows = await self._fetchall(*queries.distinct_providers_query(start_date, end_date))
+        return [row[0] for row in rows]
+
+    async def get_invoices_page(
+        self,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        provider: Optional[str] = None,
+        limit: Optional[int] = None,
+        after: Optional[InvoiceKey] = None,
+        fields: Optional[List[str]] = None
+    ) -> tuple[List[Dict[str, Any]], Optional[InvoiceKey]]:
+        fields = list(fields) if fields else list(INVOICE_FIELDS)
+        query, params, select = queries.invoices_page_query(start_date, end_date, provider, limit, after, fields)
+        rows = await self._fetchall(query, params)
+        return queries.invoices_page_result(rows, fields, select, limit)
+
+    async def count_invoices(self, start_date: Optional[date] = None, end_date: Optional[date] = None, provider: Optional[str] = None) -> int:
+        row = await self._fetchone(*queries.count_query(start_date, end_date, provider))
+        return row[0]
+
+    async def get_invoice_lines(self, start_date: Optional[date] = None, end_date: Optional[date] = None, provider: Optional[str] = None) -> Dict[str, list]:
+        rows = await self._fetchall(*queries.invoice_lines_query(start_date, end_date, provider))
+        return queries.invoice_lines_result(rows)
+
+    async def get_stats(self, start_date: Optional[date] = None, end_date: Optional[date] = None) -> Dict[str, Any]:
+        row = await self._fetchone(*queries.stats_query(start_date, end_date))
+        return queries.stats_result(row)
@@ -1,8 +1,11 @@
 import psycopg2
 from psycopg2 import pool
 import os
+import time
 import logging
-from typing import Generator
+import threading
+import psycopg2.extensions
+from typing import Any, Dict, Generator, Optional
 from dotenv import load_dotenv
 
 logger = logging.getLogger("database")
@@ -26,12 +29,129 @@ if not DB_CONFIG['password']:
         "Por favor, define DB_PASSWORD en el archivo .env"
     )
 
+class InstrumentedConnectionPool(pool.ThreadedConnectionPool):
+    """
+    ThreadedConnectionPool (seguro entre hilos) con espera, chequeo de salud y métricas.
+
+    - Si no hay conexión libre, getconn espera hasta `timeout` segundos en vez de
+      fallar de inmediato con "connection pool exhausted" (cuenta como agotamiento).
+    - Antes de entregar una conexión descarta las cerradas y, si estuvo inactiva
+      más de `health_check_idle` segundos, la verifica con SELECT 1.
+    - stats() expone espera de checkout, conexiones en uso y agotamientos.
+
+    Como en psycopg2, las conexiones por encima de minconn se cierran al devolverse:
+    connections_opened en stats() muestra si DB_POOL_MIN_SIZE se queda corto.
+    """
+
+    def __init__(self, minconn: int, maxconn: int, *args, timeout: float = 30.0, health_check_idle: float = 30.0, **kwargs):
+        self.timeout = timeout
+        self.health_check_idle = health_check_idle
+        # Un permiso por conexión: acotar aquí evita el PoolError del pool base
+        self._slots = threading.BoundedSemaphore(int(maxconn))
+        self._stats_lock = threading.Lock()
+        self._idle_since: Dict[int, float] = {}
+        self._checkouts = 0
+        self._exhausted = 0
+        self._timeouts = 0
+        self._discarded = 0
+        self._opened = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        # El pool base abre minconn conexiones aquí (precalentamiento)
+        super().__init__(minconn, maxconn, *args, **kwargs)
+
+    def _connect(self, key=None):
+        conn = super()._connect(key)
+        with self._stats_lock:
+            self._opened += 1
+            self._idle_since[id(conn)] = time.monotonic()
+        return conn
+
+    def _is_healthy(self, conn) -> bool:
+        if conn.closed or conn.info.transaction_status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+            return False
+        with self._stats_lock:
+            idle_since = self._idle_since.pop(id(conn), 0.0)
+        if time.monotonic() - idle_since < self.health_check_idle:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self, key=None):
+        start = time.perf_counter()
+        if not self._slots.acquire(blocking=False):
+            with self._stats_lock:
+                self._exhausted += 1
+            if not self._slots.acquire(timeout=self.timeout):
+                with self._stats_lock:
+                    self._timeouts += 1
+                raise pool.PoolError(f"Pool de conexiones agotado: sin conexión libre tras {self.timeout}s")
+        waited = time.perf_counter() - start
+
+        try:
+            # Cada conexión rota se cierra y se pide otra (el pool base abre una nueva si hace falta)
+            for _ in range(self.maxconn + 1):
+                conn = super().getconn(key)
+                if self._is_healthy(conn):
+                    break
+                with self._stats_lock:
+                    self._discarded += 1
+                logger.warning("Conexión rota descartada del pool")
+                super().putconn(conn, key, close=True)
+            else:
+                raise pool.PoolError("No se pudo obtener una conexión sana del pool")
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._stats_lock:
+            self._checkouts += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        return conn
+
+    def putconn(self, conn, key=None, close=False):
+        # Si el pool base la rechaza (PoolError: conexión ajena o devuelta dos veces)
+        # no se libera permiso: esa conexión no tenía uno tomado
+        super().putconn(conn, key, close)
+        with self._stats_lock:
+            if close or conn.closed:
+                self._idle_since.pop(id(conn), None)
+            else:
+                self._idle_since[id(conn)] = time.monotonic()
+        self._slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            in_use, idle = len(self._used), len(self._pool)
+        with self._stats_lock:
+            return {
+                'min_size': self.minconn,
+                'max_size': self.maxconn,
+                'in_use': in_use,
+                'idle': idle,
+                'checkouts': self._checkouts,
+                'exhausted': self._exhausted,
+                'timeouts': self._timeouts,
+                'discarded': self._discarded,
+                'connections_opened': self._opened,
+                'wait_avg_ms': round(self._wait_total / self._checkouts * 1000, 3) if self._checkouts else 0.0,
+                'wait_max_ms': round(self._wait_max * 1000, 3),
+            }
+
+
 # Pool de conexiones global
-# Se inicializa como None y se creará al primer uso
+# La API lo crea en el arranque (init_connection_pool); los scripts, al primer uso
 _connection_pool = None
+_pool_lock = threading.Lock()
 
 
-def get_connection_pool() -> pool.SimpleConnectionPool:
+def get_connection_pool() -> InstrumentedConnectionPool:
     """
     Obtiene o crea el pool de conexiones global.
     
@@ -39,34 +159,56 @@ def get_connection_pool() -> pool.SimpleConnectionPool:
     imports circulares y permitir que la configuración se cargue primero.
     
     Returns:
-        SimpleConnectionPool: Pool de conexiones a PostgreSQL
+        InstrumentedConnectionPool: Pool de conexiones a PostgreSQL
     """
     global _connection_pool
     
     if _connection_pool is None:
-        # Configurar tamaño del pool desde variables de entorno
-        min_connections = int(os.getenv('DB_POOL_MIN_SIZE', '1'))
-        max_connections = int(os.getenv('DB_POOL_MAX_SIZE', '10'))
-        
-        logger.info(
-            f"Inicializando connection pool: "
-            f"min={min_connections}, max={max_connections}"
-        )
-        
-        try:
-            _connection_pool = pool.SimpleConnectionPool(
-                minconn=min_connections,
-                maxconn=max_connections,
-                **DB_CONFIG
-            )
-            logger.info("Connection pool inicializado correctamente")
-        except psycopg2.Error as e:
-            logger.error(f"Error al inicializar connection pool: {e}")
-            raise
+        with _pool_lock:
+            if _connection_pool is None:
+                _connection_pool = _create_pool()
     
     return _connection_pool
 
 
+def _create_pool() -> InstrumentedConnectionPool:
+    # Configurar tamaño del pool desde variables de entorno
+    min_connections = int(os.getenv('DB_POOL_MIN_SIZE', '1'))
+    max_connections = int(os.getenv('DB_POOL_MAX_SIZE', '10'))
+    
+    logger.info(
+        f"Inicializando connection pool: "
+        f"min={min_connections}, max={max_connections}"
+    )
+    
+    try:
+        connection_pool = InstrumentedConnectionPool(
+            minconn=min_connections,
+            maxconn=max_connections,
+            timeout=float(os.getenv('DB_POOL_TIMEOUT', '30')),
+            health_check_idle=float(os.getenv('DB_POOL_HEALTH_CHECK_IDLE', '30')),
+            **DB_CONFIG
+        )
+        logger.info("Connection pool inicializado correctamente")
+        return connection_pool
+    except psycopg2.Error as e:
+        logger.error(f"Error al inicializar connection pool: {e}")
+        raise
+
+
+def init_connection_pool() -> InstrumentedConnectionPool:
+    """
+    Crea el pool en el arranque de la aplicación, ya con DB_POOL_MIN_SIZE conexiones
+    abiertas, para que la primera petición no pague la conexión.
+    """
+    return get_connection_pool()
+
+
+def get_pool_stats() -> Optional[Dict[str, Any]]:
+    """Métricas del pool global (None si aún no se creó)."""
+    return _connection_pool.stats() if _connection_pool is not None else None
+
+
 def get_db_connection() -> Generator:
     """
     Dependency provider for database connection.
@@ -102,8 +244,9 @@ def close_all_connections():
     """
     global _connection_pool
     
-    if _connection_pool is not None:
-        logger.info("Cerrando todas las conexiones del pool...")
-        _connection_pool.closeall()
-        _connection_pool = None
-        logger.info("Todas las conexiones cerradas")
+    with _pool_lock:
+        if _connection_pool is not None:
+            logger.info("Cerrando todas las conexiones del pool...")
+            _connection_pool.closeall()
+            _connection_pool = None
+            logger.info("Todas las conexiones cerradas")
@@ -0,0 +1,260 @@
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from src.domain.models.invoice import LINE_COLUMNS, INVOICE_FIELDS, InvoiceKey
+
+# Consultas de lectura de facturas compartidas por los repositorios síncrono
+# (psycopg2) y asíncrono (psycopg 3): ambos usan el estilo de parámetros %s, así
+# que cada función retorna (query, params) y el repositorio solo la ejecuta.
+
+# Expresión SQL de cada columna proyectable: las conversiones (fecha a texto,
+# DECIMAL a float) las hace PostgreSQL y no un bucle en Python
+FIELD_SQL = {
+    'id': 'id',
+    'fecha': 'fecha::text',
+    'nit': 'nit',
+    'proveedor': 'proveedor',
+    'factura': 'factura',
+    'subtotal': 'subtotal::float8',
+    'descuentos': 'descuentos::float8',
+    'iva': 'iva::float8',
+    'total': 'total::float8',
+    'nombre_xml': 'nombre_xml',
+}
+
+ORDER_BY = " ORDER BY fecha DESC, proveedor ASC, id ASC"
+
+LINE_RESULT_COLUMNS = ['fecha', 'nit', 'proveedor', 'factura'] + LINE_COLUMNS
+
+
+def filter_conditions(start_date: Optional[date], end_date: Optional[date], provider: Optional[str], alias: str = '') -> Tuple[List[str], list]:
+    conditions = []
+    params = []
+    if start_date:
+        conditions.append(f"{alias}fecha >= %s")
+        params.append(start_date)
+    if end_date:
+        conditions.append(f"{alias}fecha <= %s")
+        params.append(end_date)
+    if provider:
+        # El nombre canónico de la dimensión trae todas las facturas de sus NIT,
+        # aunque se hayan emitido con otra grafía del nombre
+        conditions.append(
+            f"({alias}proveedor = %s OR {alias}nit = ANY (ARRAY(SELECT nit FROM proveedores WHERE nombre = %s)))"
+        )
+        params.extend([provider, provider])
+    return conditions, params
+
+
+def _where(conditions: List[str]) -> str:
+    return " WHERE " + " AND ".join(conditions) if conditions else ""
+
+
+def distinct_providers_query(start_date: Optional[date], end_date: Optional[date]) -> Tuple[str, list]:
+    """
+    Nombres canónicos de la dimensión proveedores.
+
+    Sin fechas basta la dimensión (index-only scan sobre idx_proveedores_nombre). Con
+    fechas solo los proveedores con alguna factura dentro del rango: sus NIT salen de
+    facturas_resumen_mensual para los meses completos y de facturas para los días
+    sueltos de los extremos, como en stats_query.
+    """
+    if not start_date and not end_date:
+        return "SELECT DISTINCT nombre FROM proveedores ORDER BY nombre", []
+
+    rollup_conditions, rollup_params, edge_conditions, edge_params = _month_split(start_date, end_date)
+    query = f"""
+    SELECT DISTINCT p.nombre
+    FROM proveedores p
+    WHERE p.nit IN (
+        SELECT nit FROM facturas_resumen_mensual
+        {_where(rollup_conditions)}
+        UNION
+        SELECT nit FROM facturas
+        {_where(edge_conditions)}
+    )
+    ORDER BY p.nombre
+    """
+    return query, rollup_params + edge_params
+
+
+def provider_nits_query(provider: str) -> Tuple[str, list]:
+    """NIT de la dimensión cuyo nombre canónico es provider."""
+    return "SELECT nit FROM proveedores WHERE nombre = %s", [provider]
+
+
+def invoices_list_query(start_date: Optional[date], end_date: Optional[date], provider: Optional[str]) -> Tuple[str, list]:
+    """Todas las facturas filtradas con las columnas de INVOICE_FIELDS (exportación)."""
+    conditions, params = filter_conditions(start_date, end_date, provider)
+    query = f"SELECT {', '.join(FIELD_SQL[c] for c in INVOICE_FIELDS)} FROM facturas" + _where(conditions) + ORDER_BY
+    return query, params
+
+
+def invoices_page_query(
+    start_date: Optional[date],
+    end_date: Optional[date],
+    provider: Optional[str],
+    limit: Optional[int],
+    after: Optional[InvoiceKey],
+    fields: List[str]
+) -> Tuple[str, list, List[str]]:
+    """Página por keyset. Retorna (query, params, columnas_seleccionadas)."""
+    # La clave de orden se lee siempre (al final) para poder armar el cursor
+    select = fields + [c for c in ('fecha', 'proveedor', 'id') if c not in fields]
+    conditions, params = filter_conditions(start_date, end_date, provider)
+    if after:
+        # Keyset: filas posteriores a la última entregada en el orden (fecha DESC, proveedor, id)
+        after_fecha, after_proveedor, after_id = after
+        conditions.append(
+            "(fecha < %s OR (fecha = %s AND (proveedor > %s OR (proveedor = %s AND id > %s))))"
+        )
+        params.extend([after_fecha, after_fecha, after_proveedor, after_proveedor, after_id])
+
+    query = f"SELECT {', '.join(FIELD_SQL[c] for c in select)} FROM facturas" + _where(conditions) + ORDER_BY
+    if limit:
+        # Una fila de más indica si hay página siguiente
+        query += " LIMIT %s"
+        params.append(limit + 1)
+    return query, params, select
+
+
+def invoices_page_result(rows: list, fields: List[str], select: List[str], limit: Optional[int]) -> Tuple[List[Dict[str, Any]], Optional[InvoiceKey]]:
+    next_key = None
+    if limit and len(rows) > limit:
+        rows = rows[:limit]
+        last = dict(zip(select, rows[-1]))
+        next_key = (last['fecha'], last['proveedor'], last['id'])
+    # zip corta en len(fields): las columnas extra de la clave no se devuelven
+    return [dict(zip(fields, row)) for row in rows], next_key
+
+
+def count_query(start_date: Optional[date], end_date: Optional[date], provider: Optional[str]) -> Tuple[str, list]:
+    conditions, params = filter_conditions(start_date, end_date, provider)
+    return "SELECT COUNT(*) FROM facturas" + _where(conditions), params
+
+
+def check_exists_many_query(keys: List[Tuple[str, str]]) -> Tuple[str, list]:
+    """Una sola consulta para todo el lote: unnest de los dos arreglos contra el índice único (nit, factura)."""
+    nits, facturas = zip(*set(keys))
+    query = """
+    SELECT f.nit, f.factura
+    FROM unnest(%s::text[], %s::text[]) AS k(nit, factura)
+    JOIN facturas f ON f.nit = k.nit AND f.factura = k.factura
+    """
+    return query, [list(nits), list(facturas)]
+
+
+def invoice_lines_query(start_date: Optional[date], end_date: Optional[date], provider: Optional[str]) -> Tuple[str, list]:
+    conditions, params = filter_conditions(start_date, end_date, provider, alias='f.')
+    # ::float8 evita convertir Decimal valor por valor en Python
+    query = """
+    SELECT f.fecha::text, f.nit, f.proveedor, f.factura,
+           l.linea, l.codigo, l.descripcion,
+           l.cantidad::float8, l.precio_unitario::float8, l.valor::float8, l.iva::float8
+    FROM factura_lineas l
+    JOIN facturas f ON f.id = l.factura_id
+    """
+    query += _where(conditions)
+    query += " ORDER BY f.fecha DESC, f.proveedor ASC, l.factura_id, l.linea"
+    return query, params
+
+
+def invoice_lines_result(rows: list) -> Dict[str, list]:
+    if not rows:
+        return {name: [] for name in LINE_RESULT_COLUMNS}
+    # Transponer filas a columnas (zip(*rows) corre en C)
+    return {name: list(values) for name, values in zip(LINE_RESULT_COLUMNS, zip(*rows))}
+
+
+def full_month_range(start_date: Optional[date], end_date: Optional[date]) -> Tuple[Optional[date], Optional[date]]:
+    """
+    Meses completos dentro de [start_date, end_date]: retorna (primer mes, mes siguiente
+    al último) como primeros días de mes, con None si el rango no tiene límite por ese lado.
+    """
+    full_start = None
+    if start_date:
+        full_start = start_date.replace(day=1)
+        if start_date.day != 1:
+            full_start = (full_start + timedelta(days=32)).replace(day=1)
+    full_end = None
+    if end_date:
+        next_day = end_date + timedelta(days=1)
+        full_end = next_day.replace(day=1)
+    return full_start, full_end
+
+
+def _month_split(start_date: Optional[date], end_date: Optional[date]) -> Tuple[List[str], list, List[str], list]:
+    """
+    Reparte el rango entre el resumen mensual (meses completos) y la tabla base (días
+    sueltos de los meses de los extremos). Retorna (condiciones_resumen, params_resumen,
+    condiciones_facturas, params_facturas).
+    """
+    full_start, full_end = full_month_range(start_date, end_date)
+    edge_conditions, edge_params = filter_conditions(start_date, end_date, None)
+    rollup_conditions, rollup_params = [], []
+
+    if full_start and full_end and full_start >= full_end:
+        # Rango sin ningún mes completo: todo sale de la tabla base
+        rollup_conditions.append("FALSE")
+    else:
+        outside = []
+        if full_start:
+            rollup_conditions.append("mes >= %s")
+            rollup_params.append(full_start)
+            outside.append("fecha < %s")
+            edge_params.append(full_start)
+        if full_end:
+            rollup_conditions.append("mes < %s")
+            rollup_params.append(full_end)
+            outside.append("fecha >= %s")
+            edge_params.append(full_end)
+        # De la tabla base solo los días fuera de los meses completos
+        edge_conditions.append(f"({' OR '.join(outside)})" if outside else "FALSE")
+    return rollup_conditions, rollup_params, edge_conditions, edge_params
+
+
+def stats_query(start_date: Optional[date], end_date: Optional[date]) -> Tuple[str, list]:
+    """
+    Estadísticas del rango: los meses completos se leen de facturas_resumen_mensual
+    (mantenida por trigger en cada INSERT) y solo los días sueltos de los meses de
+    los extremos se leen de facturas. Los distintos de proveedor/NIT salen de las
+    filas del resumen (una por mes, proveedor y NIT), no de recorrer la tabla base.
+    """
+    rollup_conditions, rollup_params, edge_conditions, edge_params = _month_split(start_date, end_date)
+
+    query = f"""
+    WITH partes AS (
+        SELECT proveedor, nit, facturas, subtotal, descuentos, iva, total, fecha_min, fecha_max
+        FROM facturas_resumen_mensual
+        {_where(rollup_conditions)}
+        UNION ALL
+        SELECT proveedor, nit, 1, subtotal, descuentos, iva, total, fecha, fecha
+        FROM facturas
+        {_where(edge_conditions)}
+    )
+    SELECT
+        COALESCE(SUM(facturas), 0) as total_facturas,
+        COALESCE(SUM(subtotal), 0) as total_subtotal,
+        COALESCE(SUM(descuentos), 0) as total_descuentos,
+        COALESCE(SUM(iva), 0) as total_iva,
+        COALESCE(SUM(total), 0) as total_monto,
+        COUNT(DISTINCT proveedor) as total_proveedores,
+        COUNT(DISTINCT nit) as total_nits,
+        MIN(fecha_min) as fecha_min,
+        MAX(fecha_max) as fecha_max
+    FROM partes
+    """
+    return query, rollup_params + edge_params
+
+
+def stats_result(row: tuple) -> Dict[str, Any]:
+    return {
+        'total_facturas': int(row[0] or 0),
+        'total_subtotal': float(row[1] or 0),
+        'total_descuentos': float(row[2] or 0),
+        'total_iva': float(row[3] or 0),
+        'total_monto': float(row[4] or 0),
+        'total_proveedores': row[5] or 0,
+        'total_nits': row[6] or 0,
+        'fecha_min': str(row[7]) if row[7] else None,
+        'fecha_max': str(row[8]) if row[8] else None
+    }
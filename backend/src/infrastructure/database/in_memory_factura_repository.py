@@ -0,0 +1,170 @@
+from src.domain.ports.factura_repository import FacturaRepository
+from src.domain.models.invoice import LINE_COLUMNS, INVOICE_FIELDS, InvoiceKey
+from src.domain.models.proveedor import normalize_nit
+from src.infrastructure.cache.result_cache import WriteGeneration
+from datetime import date
+from typing import List, Optional, Dict, Any, Iterator, Set, Tuple
+
+
+class InMemoryFacturaRepository(FacturaRepository):
+    """
+    Repositorio en memoria con la misma semántica que PostgresFacturaRepository
+    (clave única (nit, factura), ON CONFLICT DO NOTHING, orden fecha DESC, proveedor ASC).
+
+    Sirve para benchmarks y pruebas manuales sin base de datos: aísla el costo de
+    parseo/exportación del costo de la BD.
+    """
+
+    def __init__(self, write_generation: Optional[WriteGeneration] = None):
+        self.write_generation = write_generation
+        self._facturas: Dict[tuple, Dict[str, Any]] = {}
+        self._lineas: Dict[tuple, Dict[str, list]] = {}
+        # Dimensión proveedores: nit normalizado -> {nombre, primera_factura, ultima_factura}
+        self._proveedores: Dict[str, Dict[str, str]] = {}
+
+    @staticmethod
+    def _in_range(fecha: str, start_date: Optional[date], end_date: Optional[date]) -> bool:
+        if start_date and fecha < str(start_date):
+            return False
+        if end_date and fecha > str(end_date):
+            return False
+        return True
+
+    def save(self, f: Dict[str, Any]) -> tuple[str, Optional[str]]:
+        nit = normalize_nit(f['nit'])
+        key = (nit, f['factura'])
+        if key in self._facturas:
+            return 'updated', None
+        fecha = str(f['fecha'])
+        self._facturas[key] = {
+            'id': len(self._facturas) + 1,
+            'fecha': fecha,
+            'nit': nit,
+            'proveedor': f['proveedor'],
+            'factura': f['factura'],
+            'subtotal': float(f['subtotal']),
+            'descuentos': float(f.get('descuentos', 0)),
+            'iva': float(f['iva']),
+            'total': float(f['total']),
+            'nombre_xml': f.get('nombre_xml'),
+        }
+        if f.get('lineas'):
+            self._lineas[key] = f['lineas']
+
+        proveedor = self._proveedores.get(nit)
+        if proveedor is None:
+            self._proveedores[nit] = {'nombre': f['proveedor'], 'primera_factura': fecha, 'ultima_factura': fecha}
+        else:
+            if fecha >= proveedor['ultima_factura']:
+                proveedor['nombre'], proveedor['ultima_factura'] = f['proveedor'], fecha
+            proveedor['primera_factura'] = min(proveedor['primera_factura'], fecha)
+        if self.write_generation is not None:
+            self.write_generation.bump()
+        return 'inserted', None
+
+    def save_many(self, facturas: List[Dict[str, Any]]) -> List[tuple[str, Optional[str]]]:
+        statuses = []
+        for f in facturas:
+            try:
+                statuses.append(self.save(f))
+            except KeyError as e:
+                statuses.append(('error', f"Falta el campo {e}"))
+        return statuses
+
+    def get_distinct_providers(self, start_date: Optional[date] = None, end_date: Optional[date] = None) -> List[str]:
+        if not start_date and not end_date:
+            return sorted({p['nombre'] for p in self._proveedores.values()})
+        # Con fechas, solo los proveedores con alguna factura dentro del rango
+        nits = {f['nit'] for f in self._facturas.values() if self._in_range(f['fecha'], start_date, end_date)}
+        return sorted({self._proveedores[nit]['nombre'] for nit in nits})
+
+    def get_provider_nits(self, provider: str) -> Set[str]:
+        return {nit for nit, p in self._proveedores.items() if p['nombre'] == provider}
+
+    def get_invoices(self, start_date: Optional[date] = None, end_date: Optional[date] = None, provider: Optional[str] = None) -> List[Dict[str, Any]]:
+        invoices, _ = self.get_invoices_page(start_date, end_date, provider)
+        return invoices
+
+    def _filtered(self, start_date: Optional[date], end_date: Optional[date], provider: Optional[str]) -> List[Dict[str, Any]]:
+        nits = self.get_provider_nits(provider) if provider else set()
+        return [
+            f for f in self._facturas.values()
+            if self._in_range(f['fecha'], start_date, end_date)
+            and (not provider or f['proveedor'] == provider or f['nit'] in nits)
+        ]
+
+    def get_invoices_page(
+        self,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        provider: Optional[str] = None,
+        limit: Optional[int] = None,
+        after: Optional[InvoiceKey] = None,
+        fields: Optional[List[str]] = None
+    ) -> tuple[List[Dict[str, Any]], Optional[InvoiceKey]]:
+        fields = list(fields) if fields else list(INVOICE_FIELDS)
+        rows = self._filtered(start_date, end_date, provider)
+        if after:
+            after_fecha, after_proveedor, after_id = after
+            rows = [
+                f for f in rows
+                if f['fecha'] < after_fecha or (f['fecha'] == after_fecha and (
+                    f['proveedor'] > after_proveedor or (f['proveedor'] == after_proveedor and f['id'] > after_id)
+                ))
+            ]
+        # Dos pasadas estables: (proveedor, id) ASC y luego fecha DESC
+        rows.sort(key=lambda f: (f['proveedor'], f['id']))
+        rows.sort(key=lambda f: f['fecha'], reverse=True)
+
+        next_key = None
+        if limit and len(rows) > limit:
+            rows = rows[:limit]
+            next_key = (rows[-1]['fecha'], rows[-1]['proveedor'], rows[-1]['id'])
+        return [{c: f[c] for c in fields} for f in rows], next_key
+
+    def iter_invoices(self, start_date: Optional[date] = None, end_date: Optional[date] = None, provider: Optional[str] = None, chunk_size: int = 2000) -> Iterator[List[Dict[str, Any]]]:
+        invoices = self.get_invoices(start_date, end_date, provider)
+        for i in range(0, len(invoices), chunk_size):
+            yield invoices[i:i + chunk_size]
+
+    def count_invoices(self, start_date: Optional[date] = None, end_date: Optional[date] = None, provider: Optional[str] = None) -> int:
+        return len(self._filtered(start_date, end_date, provider))
+
+    def check_exists(self, nit: str, factura: str) -> bool:
+        return (normalize_nit(nit), factura) in self._facturas
+
+    def check_exists_many(self, keys: List[Tuple[str, str]]) -> Set[Tuple[str, str]]:
+        return {(nit, factura) for nit, factura in keys if (normalize_nit(nit), factura) in self._facturas}
+
+    def get_invoice_lines(self, start_date: Optional[date] = None, end_date: Optional[date] = None, provider: Optional[str] = None) -> Dict[str, list]:
+        names = ['fecha', 'nit', 'proveedor', 'factura'] + LINE_COLUMNS
+        columns = {name: [] for name in names}
+        for f in self.get_invoices(start_date, end_date, provider):
+            lineas = self._lineas.get((f['nit'], f['factura']))
+            if not lineas:
+                continue
+            count = len(lineas['linea'])
+            for name in ('fecha', 'nit', 'proveedor', 'factura'):
+                columns[name].extend([f[name]] * count)
+            for name in LINE_COLUMNS:
+                columns[name].extend(lineas[name])
+        return columns
+
+    def get_stats(self, start_date: Optional[date] = None, end_date: Optional[date] = None) -> Dict[str, Any]:
+        rows = [f for f in self._facturas.values() if self._in_range(f['fecha'], start_date, end_date)]
+        return {
+            'total_facturas': len(rows),
+            'total_subtotal': sum(f['subtotal'] for f in rows),
+            'total_descuentos': sum(f['descuentos'] for f in rows),
+            'total_iva': sum(f['iva'] for f in rows),
+            'total_monto': sum(f['total'] for f in rows),
+            'total_proveedores': len({f['proveedor'] for f in rows}),
+            'total_nits': len({f['nit'] for f in rows}),
+            'fecha_min': min((f['fecha'] for f in rows), default=None),
+            'fecha_max': max((f['fecha'] for f in rows), default=None),
+        }
+
+    def clear(self):
+        self._facturas.clear()
+        self._lineas.clear()
+        self._proveedores.clear()
@@ -0,0 +1,114 @@
+import os
+import logging
+from datetime import date
+from typing import List, Set, Tuple
+
+logger = logging.getLogger("database")
+
+# backend/migrations: NNNN_nombre.sql se aplican en orden; opcional/ solo si se piden
+MIGRATIONS_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))),
+    "migrations"
+)
+OPTIONAL_DIR = os.path.join(MIGRATIONS_DIR, "opcional")
+PARTITION_MIGRATION = "particion_anual"
+
+# Clave de pg_advisory_lock: dos migradores a la vez esperan en vez de pisarse
+MIGRATION_LOCK_KEY = 72_310_001
+
+# Años por delante del actual con partición ya creada
+PARTITION_YEARS_AHEAD = 1
+
+CREATE_MIGRATIONS_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version VARCHAR(100) PRIMARY KEY,
+    aplicada_en TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+
+def list_migrations() -> List[Tuple[str, str]]:
+    """Migraciones numeradas como (versión, ruta), en orden de aplicación."""
+    names = sorted(
+        name for name in os.listdir(MIGRATIONS_DIR)
+        if name.endswith('.sql') and name[:4].isdigit()
+    )
+    return [(name[:-4], os.path.join(MIGRATIONS_DIR, name)) for name in names]
+
+
+def applied_migrations(conn) -> Set[str]:
+    with conn.cursor() as cur:
+        cur.execute(CREATE_MIGRATIONS_TABLE)
+        cur.execute("SELECT version FROM schema_migrations")
+        applied = {row[0] for row in cur.fetchall()}
+    conn.commit()
+    return applied
+
+
+def _apply(conn, version: str, path: str):
+    """Aplica un archivo SQL y lo registra en la misma transacción (todo o nada)."""
+    with open(path, encoding='utf-8') as f:
+        sql = f.read()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(sql)
+            cur.execute("INSERT INTO schema_migrations (version) VALUES (%s)", (version,))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        # Avisos de la migración (RAISE WARNING/NOTICE), p. ej. filas que no pudo corregir
+        for notice in conn.notices:
+            logger.warning(f"{version}: {notice.strip()}")
+        del conn.notices[:]
+    logger.info(f"Migración aplicada: {version}")
+
+
+def ensure_year_partitions(conn, years_ahead: int = PARTITION_YEARS_AHEAD):
+    """Crea (si faltan) las particiones del año actual y de los years_ahead siguientes."""
+    current = date.today().year
+    with conn.cursor() as cur:
+        for year in range(current, current + years_ahead + 1):
+            cur.execute("SELECT facturas_crear_particion(%s)", (year,))
+    conn.commit()
+
+
+def migrate(conn, partition_by_year: bool = False, dry_run: bool = False) -> List[str]:
+    """
+    Lleva la base al esquema canónico aplicando las migraciones pendientes.
+
+    Cada migración corre en su propia transacción y queda registrada en
+    schema_migrations. Con partition_by_year se aplica además
+    opcional/particion_anual.sql; una vez particionada, cada ejecución crea las
+    particiones de los años que vienen. Con dry_run solo retorna las pendientes.
+    Las migraciones nuevas deben funcionar con y sin particionado.
+    """
+    applied = applied_migrations(conn)
+    migrations = list_migrations()
+    if partition_by_year or PARTITION_MIGRATION in applied:
+        migrations.append((PARTITION_MIGRATION, os.path.join(OPTIONAL_DIR, f"{PARTITION_MIGRATION}.sql")))
+    pending = [(version, path) for version, path in migrations if version not in applied]
+    if dry_run:
+        return [version for version, _ in pending]
+
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_KEY,))
+    conn.commit()
+    try:
+        # Otro proceso pudo aplicar migraciones mientras se esperaba el lock
+        applied = applied_migrations(conn)
+        done = []
+        for version, path in pending:
+            if version in applied:
+                continue
+            _apply(conn, version, path)
+            done.append(version)
+
+        if PARTITION_MIGRATION in applied or PARTITION_MIGRATION in done:
+            ensure_year_partitions(conn)
+        return done
+    finally:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_KEY,))
+        conn.commit()
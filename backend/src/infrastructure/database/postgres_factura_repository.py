@@ -1,29 +1,106 @@
 import os
+import uuid
+import psycopg2
+from itertools import chain, repeat
+from psycopg2.extras import execute_values
 from src.domain.ports.factura_repository import FacturaRepository
 from src.infrastructure.database.connection import get_connection_pool
+from src.infrastructure.database import factura_queries as queries
+from src.domain.models.invoice import LINE_COLUMNS, INVOICE_FIELDS, InvoiceKey
+from src.domain.models.proveedor import normalize_nit
+from src.infrastructure.cache.result_cache import WriteGeneration
 from datetime import date
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterator, Set, Tuple
+
+# Filas por sentencia INSERT ... VALUES en las cargas masivas
+LINES_PAGE_SIZE = 1000
+FACTURAS_PAGE_SIZE = 1000
+
+# ON CONFLICT sin columnas: vale con UNIQUE (nit, factura) y con el
+# UNIQUE (nit, factura, fecha) de la tabla particionada por año
+INSERT_FACTURAS_SQL = """
+INSERT INTO facturas
+(fecha, nit, proveedor, factura, subtotal, descuentos, iva, total, nombre_xml)
+VALUES %s
+ON CONFLICT DO NOTHING
+RETURNING id, nit, factura
+"""
+
+# Dimensión proveedores: el nombre canónico es el de la factura más reciente
+UPSERT_PROVEEDORES_SQL = """
+INSERT INTO proveedores AS p (nit, nombre, primera_factura, ultima_factura)
+VALUES %s
+ON CONFLICT (nit) DO UPDATE SET
+    nombre = CASE WHEN EXCLUDED.ultima_factura >= p.ultima_factura THEN EXCLUDED.nombre ELSE p.nombre END,
+    primera_factura = LEAST(p.primera_factura, EXCLUDED.primera_factura),
+    ultima_factura = GREATEST(p.ultima_factura, EXCLUDED.ultima_factura)
+"""
 
 class PostgresFacturaRepository(FacturaRepository):
+    def __init__(self, write_generation: Optional[WriteGeneration] = None):
+        # Se incrementa al confirmar facturas nuevas (invalida la caché de resultados de la API)
+        self.write_generation = write_generation
+
+    def _written(self):
+        if self.write_generation is not None:
+            self.write_generation.bump()
+
+    @staticmethod
+    def _factura_row(f: Dict[str, Any]) -> tuple:
+        return (
+            f['fecha'], normalize_nit(f['nit']), f['proveedor'], f['factura'],
+            f['subtotal'], f.get('descuentos', 0), f['iva'], f['total'], f.get('nombre_xml')
+        )
+
+    def _insert_facturas(self, cur, rows: List[tuple]) -> Dict[tuple, int]:
+        """INSERT multi-fila con ON CONFLICT DO NOTHING. Retorna {(nit, factura): id} de las insertadas."""
+        inserted = execute_values(cur, INSERT_FACTURAS_SQL, rows, page_size=FACTURAS_PAGE_SIZE, fetch=True)
+        return {(nit, factura): factura_id for factura_id, nit, factura in inserted}
+
+    def _upsert_proveedores(self, cur, rows: List[tuple]):
+        """Actualiza la dimensión proveedores con las filas de facturas recién insertadas (una fila por NIT)."""
+        proveedores: Dict[str, list] = {}
+        for fecha, nit, proveedor, *_ in rows:
+            fecha = str(fecha)
+            current = proveedores.get(nit)
+            if current is None:
+                proveedores[nit] = [nit, proveedor, fecha, fecha]
+            else:
+                if fecha >= current[3]:
+                    current[1], current[3] = proveedor, fecha
+                current[2] = min(current[2], fecha)
+        # Orden fijo por NIT: dos lotes concurrentes bloquean las filas en el mismo orden
+        execute_values(cur, UPSERT_PROVEEDORES_SQL, sorted(proveedores.values()))
+
+    def _insert_lines(self, cur, items):
+        """Carga masiva de las líneas de varias facturas: items son pares (factura_id, lineas)."""
+        # zip sobre las columnas arma las tuplas en C, sin dicts por línea
+        rows = chain.from_iterable(
+            zip(repeat(factura_id), *(lineas[c] for c in LINE_COLUMNS))
+            for factura_id, lineas in items if lineas and lineas.get('linea')
+        )
+        execute_values(
+            cur,
+            f"INSERT INTO factura_lineas (factura_id, {', '.join(LINE_COLUMNS)}) VALUES %s "
+            "ON CONFLICT (factura_id, linea) DO NOTHING",
+            rows,
+            page_size=LINES_PAGE_SIZE
+        )
+
     def save(self, f: Dict[str, Any]) -> tuple[str, Optional[str]]:
         pool = get_connection_pool()
         conn = pool.getconn()
         try:
             with conn.cursor() as cur:
-                query = """
-                INSERT INTO facturas 
-                (fecha, nit, proveedor, factura, subtotal, descuentos, iva, total, nombre_xml)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                ON CONFLICT (nit, factura) DO NOTHING
-                RETURNING 1;
-                """
-                cur.execute(query, (
-                    f['fecha'], f['nit'], f['proveedor'], f['factura'],
-                    f['subtotal'], f.get('descuentos', 0), f['iva'], f['total'], f.get('nombre_xml')
-                ))
-                result = cur.fetchone()
-                status = 'inserted' if result else 'updated'
+                inserted = self._insert_facturas(cur, [self._factura_row(f)])
+                status = 'inserted' if inserted else 'updated'
+                # Las líneas y el proveedor solo se cargan con la factura nueva, en la misma transacción
+                if inserted:
+                    self._upsert_proveedores(cur, [self._factura_row(f)])
+                    self._insert_lines(cur, [(factura_id, f.get('lineas')) for factura_id in inserted.values()])
             conn.commit()
+            if inserted:
+                self._written()
             return status, None
         except Exception as e:
             conn.rollback()
@@ -31,73 +108,156 @@ class PostgresFacturaRepository(FacturaRepository):
         finally:
             pool.putconn(conn)
 
+    def save_many(self, facturas: List[Dict[str, Any]]) -> List[tuple[str, Optional[str]]]:
+        """
+        Guarda un lote con una sola conexión, sentencias multi-fila y un único commit.
+
+        Si una fila inválida hace fallar el INSERT del lote, se vuelve al savepoint
+        y se reintenta fila por fila (cada una con su savepoint) para reportar el
+        error solo en esa factura. Las repetidas dentro del lote cuentan como duplicadas
+        de la que sí quedó guardada: si la primera falla, se intenta con la siguiente.
+        """
+        statuses: List[Optional[tuple[str, Optional[str]]]] = [None] * len(facturas)
+        # (nit, factura) -> filas del lote con esa clave, en orden
+        candidates: Dict[tuple, List[tuple[int, tuple]]] = {}
+        for i, f in enumerate(facturas):
+            try:
+                row = self._factura_row(f)
+                key = (row[1], f['factura'])
+            except KeyError as e:
+                statuses[i] = ('error', f"Falta el campo {e}")
+                continue
+            candidates.setdefault(key, []).append((i, row))
+
+        if not candidates:
+            return statuses
+
+        pool = get_connection_pool()
+        conn = pool.getconn()
+        try:
+            with conn.cursor() as cur:
+                # (nit, factura) -> (posición en el lote, factura_id) de las filas insertadas
+                inserted: Dict[tuple, tuple[int, int]] = {}
+                cur.execute("SAVEPOINT save_many")
+                try:
+                    ids = self._insert_facturas(cur, [rows[0][1] for rows in candidates.values()])
+                    cur.execute("RELEASE SAVEPOINT save_many")
+                    for key, rows in candidates.items():
+                        first = rows[0][0]
+                        if key in ids:
+                            inserted[key] = (first, ids[key])
+                        statuses[first] = ('inserted', None) if key in ids else ('updated', None)
+                        for i, _ in rows[1:]:
+                            statuses[i] = ('updated', None)
+                except psycopg2.Error:
+                    cur.execute("ROLLBACK TO SAVEPOINT save_many")
+                    for key, rows in candidates.items():
+                        stored = False
+                        for i, row in rows:
+                            if stored:
+                                statuses[i] = ('updated', None)
+                                continue
+                            cur.execute("SAVEPOINT save_one")
+                            try:
+                                ids = self._insert_facturas(cur, [row])
+                                cur.execute("RELEASE SAVEPOINT save_one")
+                            except psycopg2.Error as e:
+                                cur.execute("ROLLBACK TO SAVEPOINT save_one")
+                                statuses[i] = ('error', str(e).strip())
+                                continue
+                            # Insertada o ya existente: las siguientes con la misma clave son duplicadas
+                            stored = True
+                            if key in ids:
+                                inserted[key] = (i, ids[key])
+                                statuses[i] = ('inserted', None)
+                            else:
+                                statuses[i] = ('updated', None)
+
+                self._upsert_proveedores(cur, [self._factura_row(facturas[i]) for i, _ in inserted.values()])
+                self._insert_lines(cur, [(factura_id, facturas[i].get('lineas')) for i, factura_id in inserted.values()])
+            conn.commit()
+            if inserted:
+                self._written()
+            return statuses
+        except Exception as e:
+            # Falló la transacción completa: nada del lote quedó guardado
+            conn.rollback()
+            return [st if st and st[0] == 'error' else ('error', str(e)) for st in statuses]
+        finally:
+            pool.putconn(conn)
+
     def get_distinct_providers(self, start_date: Optional[date] = None, end_date: Optional[date] = None) -> List[str]:
         pool = get_connection_pool()
         conn = pool.getconn()
         try:
             with conn.cursor() as cur:
-                query = "SELECT DISTINCT proveedor FROM facturas WHERE 1=1"
-                params = []
-                if start_date:
-                    query += " AND fecha >= %s"
-                    params.append(start_date)
-                if end_date:
-                    query += " AND fecha <= %s"
-                    params.append(end_date)
-                query += " ORDER BY proveedor"
-                cur.execute(query, params)
+                cur.execute(*queries.distinct_providers_query(start_date, end_date))
                 return [row[0] for row in cur.fetchall()]
         finally:
             pool.putconn(conn)
 
+    def get_provider_nits(self, provider: str) -> Set[str]:
+        pool = get_connection_pool()
+        conn = pool.getconn()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(*queries.provider_nits_query(provider))
+                return {row[0] for row in cur.fetchall()}
+        finally:
+            pool.putconn(conn)
+
     def get_invoices(self, start_date: Optional[date] = None, end_date: Optional[date] = None, provider: Optional[str] = None) -> List[Dict[str, Any]]:
+        invoices, _ = self.get_invoices_page(start_date, end_date, provider)
+        return invoices
+
+    def get_invoices_page(
+        self,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        provider: Optional[str] = None,
+        limit: Optional[int] = None,
+        after: Optional[InvoiceKey] = None,
+        fields: Optional[List[str]] = None
+    ) -> tuple[List[Dict[str, Any]], Optional[InvoiceKey]]:
+        fields = list(fields) if fields else list(INVOICE_FIELDS)
+        query, params, select = queries.invoices_page_query(start_date, end_date, provider, limit, after, fields)
+
         pool = get_connection_pool()
         conn = pool.getconn()
         try:
             with conn.cursor() as cur:
-                query = "SELECT fecha, nit, proveedor, factura, subtotal, descuentos, iva, total, nombre_xml FROM facturas"
-                params = []
-                conditions = []
-
-                if start_date:
-                    conditions.append("fecha >= %s")
-                    params.append(start_date)
-                if end_date:
-                    conditions.append("fecha <= %s")
-                    params.append(end_date)
-                if provider:
-                    conditions.append("proveedor = %s")
-                    params.append(provider)
-                
-                if conditions:
-                    query += " WHERE " + " AND ".join(conditions)
-                
-                query += " ORDER BY fecha DESC, proveedor ASC"
-                print(f"DEBUG SQL: {query} -- PARAMS: {params}")
                 cur.execute(query, params)
-                
-                rows = cur.fetchall()
-                print(f"DEBUG SQL RESULT: {len(rows)} records found")
-                
-                if len(rows) == 0:
-                    cur.execute("SELECT count(*) FROM facturas")
-                    total = cur.fetchone()[0]
-                    print(f"DEBUG ADVERTENCIA: La consulta retorno 0, pero hay un TOTAL de {total} registros en la tabla 'facturas'")
-                
-                result = []
-                for row in rows:
-                    result.append({
-                        'fecha': str(row[0]),
-                        'nit': row[1],
-                        'proveedor': row[2],
-                        'factura': row[3],
-                        'subtotal': float(row[4]),
-                        'descuentos': float(row[5]),
-                        'iva': float(row[6]),
-                        'total': float(row[7]),
-                        'nombre_xml': row[8]
-                    })
-                return result
+                return queries.invoices_page_result(cur.fetchall(), fields, select, limit)
+        finally:
+            pool.putconn(conn)
+
+    def iter_invoices(self, start_date: Optional[date] = None, end_date: Optional[date] = None, provider: Optional[str] = None, chunk_size: int = 2000) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Recorre las facturas con un cursor con nombre (del lado del servidor): PostgreSQL
+        conserva el resultado y entrega chunk_size filas por viaje, así la memoria no
+        depende de cuántas facturas cumplan los filtros.
+        """
+        pool = get_connection_pool()
+        conn = pool.getconn()
+        try:
+            query, params = queries.invoices_list_query(start_date, end_date, provider)
+            with conn.cursor(name=f"export_facturas_{uuid.uuid4().hex}") as cur:
+                cur.itersize = chunk_size
+                cur.execute(query, params)
+                while rows := cur.fetchmany(chunk_size):
+                    yield [dict(zip(INVOICE_FIELDS, row)) for row in rows]
+        finally:
+            # El cursor con nombre vive en una transacción: se cierra antes de devolver la conexión
+            conn.rollback()
+            pool.putconn(conn)
+
+    def count_invoices(self, start_date: Optional[date] = None, end_date: Optional[date] = None, provider: Optional[str] = None) -> int:
+        pool = get_connection_pool()
+        conn = pool.getconn()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(*queries.count_query(start_date, end_date, provider))
+                return cur.fetchone()[0]
         finally:
             pool.putconn(conn)
 
@@ -108,52 +268,44 @@ class PostgresFacturaRepository(FacturaRepository):
         try:
             with conn.cursor() as cur:
                 query = "SELECT 1 FROM facturas WHERE nit = %s AND factura = %s"
-                cur.execute(query, (nit, factura))
+                cur.execute(query, (normalize_nit(nit), factura))
                 return cur.fetchone() is not None
         finally:
             pool.putconn(conn)
 
+    def get_invoice_lines(self, start_date: Optional[date] = None, end_date: Optional[date] = None, provider: Optional[str] = None) -> Dict[str, list]:
+        pool = get_connection_pool()
+        conn = pool.getconn()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(*queries.invoice_lines_query(start_date, end_date, provider))
+                return queries.invoice_lines_result(cur.fetchall())
+        finally:
+            pool.putconn(conn)
+
+    def check_exists_many(self, keys: List[Tuple[str, str]]) -> Set[Tuple[str, str]]:
+        if not keys:
+            return set()
+        # Las facturas se guardan con el NIT normalizado: se consulta así y se responde con las claves recibidas
+        by_normalized: Dict[Tuple[str, str], List[Tuple[str, str]]] = {}
+        for nit, factura in keys:
+            by_normalized.setdefault((normalize_nit(nit), factura), []).append((nit, factura))
+        pool = get_connection_pool()
+        conn = pool.getconn()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(*queries.check_exists_many_query(list(by_normalized)))
+                return {key for found in cur.fetchall() for key in by_normalized.get(tuple(found), ())}
+        finally:
+            pool.putconn(conn)
+
     def get_stats(self, start_date: Optional[date] = None, end_date: Optional[date] = None) -> Dict[str, Any]:
-        """Obtiene estadísticas agregadas de las facturas"""
+        """Obtiene estadísticas agregadas de las facturas (ver factura_queries.stats_query)."""
         pool = get_connection_pool()
         conn = pool.getconn()
         try:
             with conn.cursor() as cur:
-                query = """
-                SELECT 
-                    COUNT(*) as total_facturas,
-                    COALESCE(SUM(subtotal), 0) as total_subtotal,
-                    COALESCE(SUM(descuentos), 0) as total_descuentos,
-                    COALESCE(SUM(iva), 0) as total_iva,
-                    COALESCE(SUM(total), 0) as total_monto,
-                    COUNT(DISTINCT proveedor) as total_proveedores,
-                    COUNT(DISTINCT nit) as total_nits,
-                    MIN(fecha) as fecha_min,
-                    MAX(fecha) as fecha_max
-                FROM facturas
-                WHERE 1=1
-                """
-                params = []
-                if start_date:
-                    query += " AND fecha >= %s"
-                    params.append(start_date)
-                if end_date:
-                    query += " AND fecha <= %s"
-                    params.append(end_date)
-                
-                cur.execute(query, params)
-                row = cur.fetchone()
-                
-                return {
-                    'total_facturas': row[0] or 0,
-                    'total_subtotal': float(row[1] or 0),
-                    'total_descuentos': float(row[2] or 0),
-                    'total_iva': float(row[3] or 0),
-                    'total_monto': float(row[4] or 0),
-                    'total_proveedores': row[5] or 0,
-                    'total_nits': row[6] or 0,
-                    'fecha_min': str(row[7]) if row[7] else None,
-                    'fecha_max': str(row[8]) if row[8] else None
-                }
+                cur.execute(*queries.stats_query(start_date, end_date))
+                return queries.stats_result(cur.fetchone())
         finally:
             pool.putconn(conn)
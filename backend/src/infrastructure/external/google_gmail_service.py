@@ -1,22 +1,43 @@
 import os
+import json
 import base64
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+from google_auth_httplib2 import AuthorizedHttp
+import httplib2
 import logging
+import threading
 import email.utils
 from datetime import datetime
 from src.domain.ports.gmail_port import GmailPort
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterable, Tuple
 
 SCOPES = ['https://www.googleapis.com/auth/gmail.modify']
 logger = logging.getLogger("gmail_service")
 
+# Subpeticiones por BatchHttpRequest (límite de Gmail: 100)
+BATCH_SIZE = 100
+# Cabeceras que usa extract_metadata: el resto no se descarga
+METADATA_HEADERS = ['From', 'Date', 'Subject']
+# IDs por llamada a messages.batchModify (límite de Gmail: 1000)
+BATCH_MODIFY_SIZE = 1000
+# Tope de correos de una búsqueda completa (search_unprocessed_emails)
+MAX_SEARCH_RESULTS = 2000
+
 class GoogleGmailService(GmailPort):
-    def __init__(self, credentials_path: str, token_path: str):
+    def __init__(self, credentials_path: str, token_path: str, sync_state_path: Optional[str] = None):
         self.credentials_path = credentials_path
         self.token_path = token_path
+        # JSON con el último historyId sincronizado (modo incremental)
+        self.sync_state_path = sync_state_path
+        self.credentials = None
+        # httplib2.Http no es thread-safe: cada hilo ejecuta con su propio AuthorizedHttp
+        self._local = threading.local()
+        # nombre de etiqueta -> ID, vive lo que la instancia; se recarga ante un nombre desconocido
+        self._label_ids: Dict[str, str] = {}
         logger.info("Inicializando servicio de Gmail...")
         self.service = self._authenticate()
 
@@ -47,15 +68,31 @@ class GoogleGmailService(GmailPort):
                 token.write(creds.to_json())
                 logger.info(f"Nuevo token guardado en {self.token_path}")
 
+        self.credentials = creds
         return build('gmail', 'v1', credentials=creds)
 
-    def ensure_label_exists(self, label_name: str):
+    def _http(self) -> AuthorizedHttp:
+        """Http autorizado del hilo actual (las lecturas que corren en paralelo ejecutan con este)."""
+        http = getattr(self._local, 'http', None)
+        if http is None:
+            http = AuthorizedHttp(self.credentials, http=httplib2.Http())
+            self._local.http = http
+        return http
+
+    def _refresh_label_ids(self):
         results = self.service.users().labels().list(userId='me').execute()
-        labels = results.get('labels', [])
-        
-        for label in labels:
-            if label['name'] == label_name:
-                return label['id']
+        self._label_ids = {label['name']: label['id'] for label in results.get('labels', [])}
+
+    def _get_label_id(self, label_name: str) -> Optional[str]:
+        """ID de la etiqueta desde la caché; ante un fallo se vuelve a listar una vez (creada o renombrada fuera)."""
+        if label_name not in self._label_ids:
+            self._refresh_label_ids()
+        return self._label_ids.get(label_name)
+
+    def ensure_label_exists(self, label_name: str):
+        label_id = self._get_label_id(label_name)
+        if label_id:
+            return label_id
         
         # Crear si no existe
         label_body = {
@@ -64,9 +101,10 @@ class GoogleGmailService(GmailPort):
             'messageListVisibility': 'show'
         }
         new_label = self.service.users().labels().create(userId='me', body=label_body).execute()
+        self._label_ids[label_name] = new_label['id']
         return new_label['id']
 
-    def search_unprocessed_emails(self, label_name: str) -> List[Dict[str, Any]]:
+    def search_unprocessed_emails(self, label_name: str) -> Tuple[List[Dict[str, Any]], bool]:
         # Modo agresivo: Buscamos TODO en el INBOX que no haya sido procesado ya.
         # Esto incluye Principal, Promociones, Social, etc.
         query = f"label:INBOX -label:{label_name}"
@@ -81,14 +119,89 @@ class GoogleGmailService(GmailPort):
             messages.extend(results.get('messages', []))
             next_page_token = results.get('nextPageToken')
             
-            if not next_page_token or len(messages) >= 2000:
+            if not next_page_token or len(messages) >= MAX_SEARCH_RESULTS:
                 break
         
-        logger.info(f"Búsqueda finalizada. Query: '{query}'. Encontrados: {len(messages)}")
+        # Con página siguiente pendiente la búsqueda quedó cortada en el tope
+        truncated = bool(next_page_token)
+        logger.info(f"Búsqueda finalizada. Query: '{query}'. Encontrados: {len(messages)}{' (truncada en el tope)' if truncated else ''}")
+        return messages, truncated
+
+    def get_current_history_id(self) -> str:
+        profile = self.service.users().getProfile(userId='me').execute()
+        return str(profile['historyId'])
+
+    def search_emails_since(self, history_id: str, label_name: str) -> Optional[List[Dict[str, Any]]]:
+        # Solo eventos messageAdded del INBOX posteriores al historyId guardado
+        added = {}
+        next_page_token = None
+        try:
+            while True:
+                results = self.service.users().history().list(
+                    userId='me', startHistoryId=history_id, historyTypes=['messageAdded'],
+                    labelId='INBOX', pageToken=next_page_token
+                ).execute()
+                for record in results.get('history', []):
+                    for event in record.get('messagesAdded', []):
+                        message = event['message']
+                        added[message['id']] = message
+                next_page_token = results.get('nextPageToken')
+                if not next_page_token:
+                    break
+        except HttpError as e:
+            # 404: historyId fuera de la ventana que conserva Gmail (~1 semana)
+            if getattr(e.resp, 'status', None) == 404:
+                logger.warning(f"Historial de Gmail desde {history_id} no disponible; se requiere búsqueda completa")
+                return None
+            raise
+
+        # Estado actual de las etiquetas (un lote por cada 100): se descartan los ya
+        # procesados, los que salieron del INBOX y los borrados desde el evento
+        label_id = self._get_label_id(label_name)
+        responses = self._execute_batch(
+            (message_id, self.service.users().messages().get(userId='me', id=message_id, format='minimal'))
+            for message_id in added
+        )
+        messages = []
+        for message_id in added:
+            message, error = responses[message_id]
+            if error is not None:
+                if getattr(getattr(error, 'resp', None), 'status', None) != 404:
+                    # Ante la duda se incluye: procesarlo de nuevo es idempotente
+                    logger.warning(f"No se pudo consultar el correo {message_id} ({error}); se incluye en la sincronización")
+                    messages.append({'id': message_id, 'threadId': added[message_id].get('threadId')})
+                continue
+            labels = message.get('labelIds', [])
+            if 'INBOX' in labels and label_id not in labels:
+                messages.append({'id': message_id, 'threadId': message.get('threadId')})
+
+        # Mismo orden que messages.list (más reciente primero); el historial viene cronológico
+        messages.reverse()
+        logger.info(f"Sincronización incremental desde historyId {history_id}: {len(added)} correos nuevos, {len(messages)} sin procesar")
         return messages
 
+    def load_history_watermark(self) -> Optional[str]:
+        if not self.sync_state_path or not os.path.exists(self.sync_state_path):
+            return None
+        try:
+            with open(self.sync_state_path, encoding='utf-8') as f:
+                return json.load(f).get('history_id')
+        except (OSError, ValueError) as e:
+            logger.warning(f"No se pudo leer el estado de sincronización {self.sync_state_path}: {e}")
+            return None
+
+    def save_history_watermark(self, history_id: str):
+        if not self.sync_state_path:
+            return
+        # Escritura atómica: un corte a mitad no deja un JSON truncado
+        tmp_path = f"{self.sync_state_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'history_id': history_id, 'saved_at': datetime.now().isoformat(timespec='seconds')}, f)
+        os.replace(tmp_path, self.sync_state_path)
+        logger.info(f"Marca de sincronización guardada: historyId {history_id}")
+
     def get_attachments(self, message_id: str) -> List[Dict[str, Any]]:
-        message = self.service.users().messages().get(userId='me', id=message_id).execute()
+        message = self.service.users().messages().get(userId='me', id=message_id).execute(http=self._http())
         return self.extract_attachments(message)
 
     def extract_attachments(self, message: Dict[str, Any]) -> List[Dict[str, Any]]:
@@ -111,28 +224,83 @@ class GoogleGmailService(GmailPort):
     def download_attachment(self, message_id: str, attachment_id: str) -> bytes:
         attachment = self.service.users().messages().attachments().get(
             userId='me', messageId=message_id, id=attachment_id
-        ).execute()
+        ).execute(http=self._http())
         data = attachment.get('data')
         if data:
             return base64.urlsafe_b64decode(data)
         return b''
 
     def mark_as_processed(self, message_id: str, label_name: str):
-        # Primero obtenemos el ID de la etiqueta por nombre
-        results = self.service.users().labels().list(userId='me').execute()
-        label_id = next((l['id'] for l in results.get('labels', []) if l['name'] == label_name), None)
-        
-        if label_id:
-            body = {
-                'addLabelIds': [label_id],
-                'removeLabelIds': ['INBOX'] # Opcionalmente quitar de INBOX
-            }
-            self.service.users().messages().modify(userId='me', id=message_id, body=body).execute()
+        self.mark_many_as_processed([message_id], label_name)
+
+    def mark_many_as_processed(self, message_ids: List[str], label_name: str):
+        label_id = self._get_label_id(label_name)
+        if not label_id:
+            logger.warning(f"La etiqueta {label_name} no existe; no se marcaron {len(message_ids)} correos.")
+            return
+
+        body = {
+            'addLabelIds': [label_id],
+            'removeLabelIds': ['INBOX'] # Opcionalmente quitar de INBOX
+        }
+        if len(message_ids) == 1:
+            self.service.users().messages().modify(userId='me', id=message_ids[0], body=body).execute()
+            return
+        for i in range(0, len(message_ids), BATCH_MODIFY_SIZE):
+            chunk = message_ids[i:i + BATCH_MODIFY_SIZE]
+            self.service.users().messages().batchModify(userId='me', body=dict(body, ids=chunk)).execute()
+        logger.info(f"{len(message_ids)} correos marcados como {label_name}")
 
     def get_message_metadata(self, message_id: str) -> Dict[str, str]:
-        message = self.service.users().messages().get(userId='me', id=message_id, format='metadata').execute()
+        message = self.service.users().messages().get(userId='me', id=message_id, format='metadata').execute(http=self._http())
         return self.extract_metadata(message)
 
+    def _execute_batch(self, requests: Iterable[Tuple[str, Any]]) -> Dict[str, Tuple[Any, Optional[Exception]]]:
+        """
+        Ejecuta peticiones de la API en BatchHttpRequest de hasta BATCH_SIZE (un viaje HTTP por lote).
+        requests son pares (request_id, petición); retorna request_id -> (respuesta, excepción).
+        """
+        responses = {}
+
+        def callback(request_id, response, exception):
+            responses[request_id] = (response, exception)
+
+        batch, pending = None, 0
+        for request_id, request in requests:
+            if batch is None:
+                batch = self.service.new_batch_http_request(callback=callback)
+            batch.add(request, request_id=request_id)
+            pending += 1
+            if pending == BATCH_SIZE:
+                batch.execute()
+                batch, pending = None, 0
+        if batch is not None:
+            batch.execute()
+        return responses
+
+    def get_messages_metadata(self, message_ids: List[str]) -> Dict[str, Dict[str, str]]:
+        # dict.fromkeys: sin IDs repetidos (el batch exige request_id únicos) y en orden
+        responses = self._execute_batch(
+            (message_id, self.service.users().messages().get(
+                userId='me', id=message_id, format='metadata', metadataHeaders=METADATA_HEADERS
+            ))
+            for message_id in dict.fromkeys(message_ids)
+        )
+
+        metadata = {}
+        for message_id, (message, error) in responses.items():
+            if error is None:
+                metadata[message_id] = self.extract_metadata(message)
+                continue
+            # Subpetición rechazada (p. ej. 429 por cuota): se reintenta sola
+            logger.debug(f"Metadatos de {message_id} fallaron en el lote ({error}), reintentando individualmente")
+            try:
+                metadata[message_id] = self.get_message_metadata(message_id)
+            except HttpError as e:
+                logger.warning(f"No se pudieron obtener los metadatos de {message_id}: {e}")
+        logger.info(f"Metadatos de {len(metadata)} correos obtenidos en {-(-len(responses) // BATCH_SIZE)} lote(s)")
+        return metadata
+
     def extract_metadata(self, message: Dict[str, Any]) -> Dict[str, str]:
         headers = message.get('payload', {}).get('headers', [])
         
@@ -165,7 +333,7 @@ class GoogleGmailService(GmailPort):
         return metadata
 
     def get_thread_messages(self, thread_id: str) -> List[Dict[str, Any]]:
-        thread = self.service.users().threads().get(userId='me', id=thread_id).execute()
+        thread = self.service.users().threads().get(userId='me', id=thread_id).execute(http=self._http())
         messages = thread.get('messages', [])
         # Asegurar orden cronológico (el más antiguo primero)
         messages.sort(key=lambda x: int(x.get('internalDate', 0)))
@@ -173,4 +341,4 @@ class GoogleGmailService(GmailPort):
 
     def trash_message(self, message_id: str):
         logger.info(f"Moviendo correo {message_id} a la papelera.")
-        self.service.users().messages().trash(userId='me', id=message_id).execute()
+        self.service.users().messages().trash(userId='me', id=message_id).execute(http=self._http())
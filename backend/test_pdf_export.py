@@ -29,6 +29,9 @@ class MockRepository:
             }
         ]
 
+    def iter_invoices(self, chunk_size=2000, **kwargs):
+        yield self.get_invoices(**kwargs)
+
 def test_pdf():
     service = ExporterService()
     repo = MockRepository()
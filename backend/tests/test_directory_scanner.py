@@ -0,0 +1,33 @@
+import os
+
+import pytest
+
+from src.application.services.directory_scanner import iter_xml_files
+
+
+def _touch(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'w').close()
+
+
+def test_recursive_scan_filters_and_orders(tmp_path):
+    _touch(tmp_path / 'b.xml')
+    _touch(tmp_path / 'a.XML')
+    _touch(tmp_path / 'notas.txt')
+    _touch(tmp_path / 'sub' / 'c.xml')
+    _touch(tmp_path / 'Exportadas' / 'x.xml')
+
+    found = [os.path.relpath(p, tmp_path) for p in iter_xml_files(str(tmp_path), recursive=True)]
+    assert found == ['a.XML', 'b.xml', os.path.join('sub', 'c.xml')]
+    assert [os.path.basename(p) for p in iter_xml_files(str(tmp_path))] == ['a.XML', 'b.xml']
+
+
+@pytest.mark.skipif(not hasattr(os, 'symlink'), reason='sin enlaces simbólicos')
+def test_symlinked_directories_are_not_followed(tmp_path):
+    _touch(tmp_path / 'sub' / 'c.xml')
+    # Enlace al directorio raíz desde una subcarpeta: seguirlo sería un ciclo infinito
+    os.symlink(tmp_path, tmp_path / 'sub' / 'loop', target_is_directory=True)
+    os.symlink(tmp_path / 'sub' / 'c.xml', tmp_path / 'enlace.xml')
+
+    found = sorted(os.path.relpath(p, tmp_path) for p in iter_xml_files(str(tmp_path), recursive=True))
+    assert found == ['enlace.xml', os.path.join('sub', 'c.xml')]
@@ -0,0 +1,51 @@
+import os
+
+import pytest
+
+from src.application.services.exporter_service import ExporterService
+
+
+def _row(i, **overrides):
+    row = {
+        'fecha': '2024-02-03', 'proveedor': 'ACME S.A.S.', 'nit': '900219834', 'factura': f'FE-{i}',
+        'subtotal': 100.0, 'descuentos': 0.0, 'iva': 19.0, 'total': 119.0, 'nombre_xml': f'{i}.xml',
+    }
+    row.update(overrides)
+    return row
+
+
+class ChunkRepository:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.closed = False
+
+    def iter_invoices(self, start_date=None, end_date=None, provider=None, chunk_size=2000):
+        try:
+            yield from self.chunks
+        finally:
+            self.closed = True
+
+
+def test_export_writes_every_format(tmp_path):
+    repo = ChunkRepository([[_row(1), _row(2)], [_row(3)]])
+    result = ExporterService().export_from_db(repo, {}, ['excel', 'csv'], str(tmp_path))
+
+    assert result['status'] == 'success' and result['count'] == 3
+    assert sorted(f['type'] for f in result['files']) == ['csv', 'excel']
+    assert all(os.path.getsize(f['path']) > 0 for f in result['files'])
+    with open(next(f['path'] for f in result['files'] if f['type'] == 'csv'), encoding='utf-8') as f:
+        assert len(f.read().splitlines()) == 4
+    assert repo.closed
+
+
+def test_failing_writer_leaves_no_partial_files(tmp_path):
+    # El CSV necesita 'total': el segundo bloque lo hace fallar a mitad del flujo
+    bad = _row(3)
+    del bad['total']
+    repo = ChunkRepository([[_row(1), _row(2)], [bad]])
+
+    with pytest.raises(KeyError):
+        ExporterService().export_from_db(repo, {}, ['excel', 'csv'], str(tmp_path))
+
+    assert os.listdir(tmp_path) == []
+    assert repo.closed
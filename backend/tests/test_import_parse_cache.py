@@ -0,0 +1,51 @@
+import os
+
+from src.application.services import exporter_service
+from src.application.services.exporter_service import ExporterService
+from src.infrastructure.cache.sqlite_parse_cache import SqliteParseCache
+
+INVOICE = b"""<Invoice xmlns="urn:oasis:names:specification:ubl:schema:xsd:Invoice-2"
+    xmlns:cac="urn:oasis:names:specification:ubl:schema:xsd:CommonAggregateComponents-2"
+    xmlns:cbc="urn:oasis:names:specification:ubl:schema:xsd:CommonBasicComponents-2">
+  <cbc:ID>FE-1</cbc:ID><cbc:IssueDate>2024-02-03</cbc:IssueDate>
+  <cac:AccountingSupplierParty><cac:Party><cac:PartyTaxScheme>
+    <cbc:RegistrationName>ACME S.A.S.</cbc:RegistrationName>
+    <cbc:CompanyID schemeID="2" schemeName="31">900219834</cbc:CompanyID>
+  </cac:PartyTaxScheme></cac:Party></cac:AccountingSupplierParty>
+  <cac:LegalMonetaryTotal><cbc:PayableAmount>119.00</cbc:PayableAmount></cac:LegalMonetaryTotal>
+</Invoice>"""
+
+SIGNATURE = b'<ds:Signature xmlns:ds="http://www.w3.org/2000/09/xmldsig#"/>'
+
+
+class PreviewRepository:
+    def check_exists_many(self, keys):
+        return set()
+
+
+def test_cache_hit_skips_sniff_and_parse(tmp_path, monkeypatch):
+    xml_dir = tmp_path / 'xml'
+    xml_dir.mkdir()
+    (xml_dir / 'factura.xml').write_bytes(INVOICE)
+    (xml_dir / 'firma.xml').write_bytes(SIGNATURE)
+    cache = SqliteParseCache(str(tmp_path / 'cache.sqlite3'), parser_version=1)
+    service = ExporterService()
+
+    sniffed = []
+    sniff_file = exporter_service.sniff_file
+    monkeypatch.setattr(exporter_service, 'sniff_file', lambda path: sniffed.append(path) or sniff_file(path))
+
+    first = service.import_to_db(str(xml_dir), PreviewRepository(), dry_run=True, parse_cache=cache)
+    assert first['stats']['successful'] == 1 and first['stats']['non_invoice'] == 1
+    assert len(sniffed) == 2
+
+    sniffed.clear()
+    monkeypatch.setattr(service, 'parse_xml_invoice', lambda path: (_ for _ in ()).throw(AssertionError(path)))
+    second = service.import_to_db(str(xml_dir), PreviewRepository(), dry_run=True, parse_cache=cache)
+
+    # La factura sale de la caché con su tipo: solo la firma (no cacheada) se vuelve a clasificar
+    assert [os.path.basename(p) for p in sniffed] == ['firma.xml']
+    assert second['stats']['cached'] == 1 and second['stats']['successful'] == 1
+    assert second['stats']['document_types'] == first['stats']['document_types'] == {'Invoice': 1, 'other': 1}
+    assert second['results'][0]['document_type'] == 'Invoice'
+    cache.close()
@@ -0,0 +1,121 @@
+import pytest
+
+from src.application.services.invoice_processor_service import InvoiceProcessorService, watermark_can_advance
+from src.domain.ports.gmail_port import GmailPort
+
+
+@pytest.mark.parametrize('truncated, processed, found, errors, all_marked, expected', [
+    (False, 5, 5, 0, True, True),
+    (False, 0, 0, 0, True, True),
+    # Búsqueda completa cortada en el tope: lo que quedó fuera no llegaría por el historial
+    (True, 5, 5, 0, True, False),
+    # max_emails dejó correos pendientes
+    (False, 3, 5, 0, True, False),
+    (False, 5, 5, 1, True, False),
+    (False, 5, 5, 0, False, False),
+])
+def test_watermark_can_advance(truncated, processed, found, errors, all_marked, expected):
+    assert watermark_can_advance(truncated, processed, found, errors, all_marked) is expected
+
+
+class FakeGmail(GmailPort):
+    """Buzón en memoria: correos sin ZIP (se van a la papelera) y un historial configurable."""
+
+    def __init__(self, inbox, truncated=False, history=None, watermark=None):
+        self.inbox = inbox
+        self.truncated = truncated
+        # None: historial expirado
+        self.history = history
+        self.watermark = watermark
+        self.saved = []
+        self.full_searches = 0
+
+    def search_unprocessed_emails(self, label_name):
+        self.full_searches += 1
+        return [{'id': m, 'threadId': m} for m in self.inbox], self.truncated
+
+    def get_current_history_id(self):
+        return '200'
+
+    def search_emails_since(self, history_id, label_name):
+        if self.history is None:
+            return None
+        return [{'id': m, 'threadId': m} for m in self.history]
+
+    def load_history_watermark(self):
+        return self.watermark
+
+    def save_history_watermark(self, history_id):
+        self.saved.append(history_id)
+
+    def get_messages_metadata(self, message_ids):
+        return {m: self.get_message_metadata(m) for m in message_ids}
+
+    def get_message_metadata(self, message_id):
+        return {'from': 'x', 'date': '2024-01-01', 'subject': 's', 'threadId': message_id, 'id': message_id}
+
+    def get_thread_messages(self, thread_id):
+        return [{'id': thread_id, 'payload': {}}]
+
+    def extract_metadata(self, message):
+        return self.get_message_metadata(message['id'])
+
+    def extract_attachments(self, message):
+        return []
+
+    def get_attachments(self, message_id):
+        return []
+
+    def download_attachment(self, message_id, attachment_id):
+        return b''
+
+    def ensure_label_exists(self, label_name):
+        return 'L1'
+
+    def mark_as_processed(self, message_id, label_name):
+        pass
+
+    def mark_many_as_processed(self, message_ids, label_name):
+        pass
+
+    def trash_message(self, message_id):
+        pass
+
+
+def _run(gmail, tmp_path, max_emails=0):
+    return InvoiceProcessorService(gmail).process_all_new_invoices(str(tmp_path), max_emails, incremental=True)
+
+
+def test_first_run_does_full_search_and_saves_watermark(tmp_path):
+    gmail = FakeGmail(['m1', 'm2'])
+    out = _run(gmail, tmp_path)
+    assert out['sync']['mode'] == 'full' and out['sync']['watermark_saved']
+    assert gmail.saved == ['200']
+
+
+def test_truncated_full_search_keeps_watermark(tmp_path):
+    gmail = FakeGmail(['m1', 'm2'], truncated=True)
+    out = _run(gmail, tmp_path)
+    assert out['sync']['truncated'] and not out['sync']['watermark_saved']
+    assert gmail.saved == []
+
+
+def test_incremental_run_uses_history(tmp_path):
+    gmail = FakeGmail(['m1', 'm2', 'm3'], history=['m3'], watermark='100')
+    out = _run(gmail, tmp_path)
+    assert out['sync']['mode'] == 'incremental' and out['sync']['since_history_id'] == '100'
+    assert [r['msg_id'] for r in out['results']] == ['m3']
+    assert gmail.full_searches == 0 and gmail.saved == ['200']
+
+
+def test_expired_history_falls_back_to_full_search(tmp_path):
+    gmail = FakeGmail(['m1'], history=None, watermark='5')
+    out = _run(gmail, tmp_path)
+    assert out['sync']['mode'] == 'full' and gmail.full_searches == 1
+    assert gmail.saved == ['200']
+
+
+def test_max_emails_limit_keeps_watermark(tmp_path):
+    gmail = FakeGmail(['m1', 'm2', 'm3'])
+    out = _run(gmail, tmp_path, max_emails=2)
+    assert len(out['results']) == 2 and not out['sync']['watermark_saved']
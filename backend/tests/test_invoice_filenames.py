@@ -0,0 +1,21 @@
+from src.application.services.invoice_filenames import invoice_base_name, parse_invoice_filename, safe_supplier_name
+
+
+def test_safe_supplier_name_drops_forbidden_characters():
+    assert safe_supplier_name('ALMACENES ÉXITO S.A. / Sede: 1 ') == 'ALMACENES ÉXITO SA  Sede 1'
+
+
+def test_parse_round_trips_invoice_base_name():
+    filename = f"{invoice_base_name('2024-02-05', 'COLANTA S.A.S.')}.xml"
+    assert parse_invoice_filename(filename) == ('2024-02-05', 'COLANTA SAS')
+
+
+def test_parse_is_case_insensitive_on_extension():
+    assert parse_invoice_filename('2023-12-31 PRICESMART.XML') == ('2023-12-31', 'PRICESMART')
+
+
+def test_parse_rejects_names_outside_convention():
+    assert parse_invoice_filename('factura 2024-02-05.xml') is None
+    assert parse_invoice_filename('2024-02-05.xml') is None
+    assert parse_invoice_filename('2024-02-05 PROVEEDOR.pdf') is None
+    assert parse_invoice_filename('24-02-05 PROVEEDOR.xml') is None
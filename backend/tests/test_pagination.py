@@ -0,0 +1,35 @@
+import base64
+import json
+from datetime import date
+
+import pytest
+
+from src.application.services.pagination import decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    key = ('2024-02-05', 'ALMACÉN ÑOÑO S.A.S.', 1234)
+    assert decode_cursor(encode_cursor(key)) == key
+
+
+def test_cursor_accepts_date_objects_and_is_url_safe():
+    cursor = encode_cursor((date(2024, 1, 31), 'A/B+C', 7))
+    assert '=' not in cursor and '+' not in cursor and '/' not in cursor
+    assert decode_cursor(cursor) == ('2024-01-31', 'A/B+C', 7)
+
+
+def _raw_cursor(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip('=')
+
+
+@pytest.mark.parametrize('cursor', [
+    'no-es-base64!!',
+    _raw_cursor(['2024-02-05', 'P']),
+    _raw_cursor(['05/02/2024', 'P', 1]),
+    _raw_cursor(['2024-02-05', 3, 1]),
+    _raw_cursor(['2024-02-05', 'P', '1']),
+    _raw_cursor({'fecha': '2024-02-05'}),
+])
+def test_invalid_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError, match='Cursor de paginación inválido'):
+        decode_cursor(cursor)
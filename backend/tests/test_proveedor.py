@@ -0,0 +1,60 @@
+import pytest
+
+from src.domain.models.proveedor import nit_check_digit, normalize_nit, strip_check_digit
+
+# NIT -> DV tomados de facturas reales (schemeID del CompanyID)
+KNOWN_CHECK_DIGITS = [
+    ('800197268', 4),
+    ('900219834', 2),
+    ('900276962', 1),
+    ('900319753', 3),
+    ('901439456', 9),
+    ('890904478', 6),
+    ('900036188', 6),
+]
+
+
+@pytest.mark.parametrize('base, check_digit', KNOWN_CHECK_DIGITS)
+def test_nit_check_digit(base, check_digit):
+    assert nit_check_digit(base) == check_digit
+
+
+@pytest.mark.parametrize('raw, expected', [
+    ('900.219.834-2', '900219834'),
+    ('900219834-2', '900219834'),
+    (' 900219834 ', '900219834'),
+    ('9002198342', '900219834'),
+    ('8001972684', '800197268'),
+    # DV incorrecto: no se reconoce como DV, se conserva
+    ('9002198343', '9002198343'),
+    # Cédula de 10 dígitos: no es NIT de persona jurídica
+    ('1020304057', '1020304057'),
+    ('70549325', '70549325'),
+    (' ACME LTD ', 'ACME LTD'),
+    ('', ''),
+    (None, None),
+])
+def test_normalize_nit(raw, expected):
+    assert normalize_nit(raw) == expected
+
+
+@pytest.mark.parametrize('base, check_digit', KNOWN_CHECK_DIGITS)
+def test_normalize_nit_same_key_with_and_without_check_digit(base, check_digit):
+    assert normalize_nit(f'{base}{check_digit}') == normalize_nit(f'{base}-{check_digit}') == normalize_nit(base) == base
+
+
+@pytest.mark.parametrize('nit, check_digit, scheme_name, expected', [
+    ('8001972684', '4', '31', '800197268'),
+    ('8001972684', '4', None, '800197268'),
+    # El schemeID no coincide con el último dígito o con el DV calculado
+    ('8001972684', '5', '31', '8001972684'),
+    ('8001972685', '5', '31', '8001972685'),
+    # NIT ya sin DV: el schemeID solo lo describe
+    ('800197268', '4', '31', '800197268'),
+    # Cédula (schemeName 13) o sin schemeID
+    ('1020304057', '7', '13', '1020304057'),
+    ('8001972684', '', '31', '8001972684'),
+    ('8001972684', None, '31', '8001972684'),
+])
+def test_strip_check_digit(nit, check_digit, scheme_name, expected):
+    assert strip_check_digit(nit, check_digit, scheme_name) == expected
@@ -0,0 +1,80 @@
+from datetime import date
+
+from src.application.services.exporter_service import ExporterService
+from src.application.services.invoice_filenames import invoice_base_name
+from src.infrastructure.database.factura_queries import distinct_providers_query
+from src.infrastructure.database.in_memory_factura_repository import InMemoryFacturaRepository
+
+INVOICE = """<Invoice xmlns="urn:oasis:names:specification:ubl:schema:xsd:Invoice-2"
+    xmlns:cac="urn:oasis:names:specification:ubl:schema:xsd:CommonAggregateComponents-2"
+    xmlns:cbc="urn:oasis:names:specification:ubl:schema:xsd:CommonBasicComponents-2">
+  <cbc:ID>{factura}</cbc:ID><cbc:IssueDate>{fecha}</cbc:IssueDate>
+  <cac:AccountingSupplierParty><cac:Party><cac:PartyTaxScheme>
+    <cbc:RegistrationName>{proveedor}</cbc:RegistrationName>
+    <cbc:CompanyID schemeID="2" schemeName="31">{nit}</cbc:CompanyID>
+  </cac:PartyTaxScheme></cac:Party></cac:AccountingSupplierParty>
+  <cac:LegalMonetaryTotal><cbc:PayableAmount>119.00</cbc:PayableAmount></cac:LegalMonetaryTotal>
+</Invoice>"""
+
+
+def _factura(fecha, proveedor, nit, factura):
+    return {
+        'fecha': fecha, 'proveedor': proveedor, 'nit': nit, 'factura': factura,
+        'subtotal': 100, 'iva': 19, 'total': 119, 'nombre_xml': f'{factura}.xml',
+    }
+
+
+def test_providers_without_dates_read_only_the_dimension():
+    query, params = distinct_providers_query(None, None)
+    assert query == "SELECT DISTINCT nombre FROM proveedores ORDER BY nombre"
+    assert params == []
+
+
+def test_providers_with_dates_come_from_invoices_in_range():
+    query, params = distinct_providers_query(date(2024, 1, 15), date(2024, 3, 10))
+
+    assert 'primera_factura' not in query and 'ultima_factura' not in query
+    assert 'FROM facturas_resumen_mensual' in query and 'FROM facturas\n' in query
+    assert params == [date(2024, 2, 1), date(2024, 3, 1), date(2024, 1, 15), date(2024, 3, 10), date(2024, 2, 1), date(2024, 3, 1)]
+    assert query.count('%s') == len(params)
+
+
+def test_in_memory_providers_skip_gaps_between_first_and_last_invoice():
+    repo = InMemoryFacturaRepository()
+    repo.save(_factura('2024-01-10', 'ACME SAS', '900219834', 'A-1'))
+    repo.save(_factura('2024-03-10', 'ACME S.A.S.', '900219834-2', 'A-2'))
+    repo.save(_factura('2024-02-10', 'OTRO LTDA', '800197268', 'O-1'))
+
+    assert repo.get_distinct_providers() == ['ACME S.A.S.', 'OTRO LTDA']
+    # ACME tiene facturas antes y después de febrero, pero ninguna en febrero
+    assert repo.get_distinct_providers(date(2024, 2, 1), date(2024, 2, 29)) == ['OTRO LTDA']
+    assert repo.get_distinct_providers(date(2024, 3, 1), None) == ['ACME S.A.S.']
+    assert repo.get_provider_nits('ACME S.A.S.') == {'900219834'}
+
+
+def test_import_filter_by_canonical_name_matches_other_spellings(tmp_path):
+    repo = InMemoryFacturaRepository()
+    # Nombre canónico (el más reciente) distinto de la grafía de los XML a importar
+    repo.save(_factura('2024-03-10', 'ACME SAS', '900219834', 'A-0'))
+    files = [
+        ('2024-02-03', 'ACME S.A.S.', '900219834', 'A-1'),
+        ('2024-02-04', 'OTRO LTDA', '800197268', 'O-1'),
+    ]
+    for fecha, proveedor, nit, factura in files:
+        xml = INVOICE.format(fecha=fecha, proveedor=proveedor, nit=nit, factura=factura)
+        (tmp_path / f'{invoice_base_name(fecha, proveedor)}.xml').write_text(xml, encoding='utf-8')
+
+    result = ExporterService().import_to_db(str(tmp_path), repo, dry_run=True, filters={'provider': 'ACME SAS'})
+
+    assert [r['subject'] for r in result['results']] == ['A-1']
+    assert result['stats']['filtered'] == 1
+
+
+def test_import_filter_by_unknown_name_still_prefilters_by_filename(tmp_path):
+    repo = InMemoryFacturaRepository()
+    xml = INVOICE.format(fecha='2024-02-04', proveedor='OTRO LTDA', nit='800197268', factura='O-1')
+    (tmp_path / f"{invoice_base_name('2024-02-04', 'OTRO LTDA')}.xml").write_text(xml, encoding='utf-8')
+
+    result = ExporterService().import_to_db(str(tmp_path), repo, dry_run=True, filters={'provider': 'NUEVO SAS'})
+
+    assert result['results'] == [] and result['stats']['prefiltered'] == 1
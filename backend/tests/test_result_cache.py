@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+
+from src.infrastructure.cache import result_cache
+from src.infrastructure.cache.cached_factura_repository import CachedAsyncFacturaRepository
+from src.infrastructure.cache.result_cache import ResultCache, WriteGeneration
+
+
+@pytest.fixture
+def cache():
+    return ResultCache(WriteGeneration(), max_entries=3, ttl=None)
+
+
+def test_hit_after_put(cache):
+    assert cache.is_miss(cache.get('k'))
+    cache.put('k', {'total': 1}, cache.generation.value)
+    assert cache.get('k') == {'total': 1}
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+
+def test_write_invalidates_entries(cache):
+    cache.put('k', 1, cache.generation.value)
+    cache.generation.bump()
+    assert cache.is_miss(cache.get('k'))
+    assert cache.stats()['entries'] == 0
+
+
+def test_result_computed_across_a_write_is_born_stale(cache):
+    generation = cache.generation.value
+    cache.generation.bump()  # escritura mientras corría la consulta
+    cache.put('k', 1, generation)
+    assert cache.is_miss(cache.get('k'))
+
+
+def test_none_is_a_cacheable_value(cache):
+    cache.put('k', None, cache.generation.value)
+    assert cache.get('k') is None
+    assert not cache.is_miss(cache.get('k'))
+
+
+def test_lru_eviction(cache):
+    for key in 'abc':
+        cache.put(key, key, 0)
+    cache.get('a')  # 'a' pasa a ser la más reciente
+    cache.put('d', 'd', 0)
+    assert cache.is_miss(cache.get('b'))
+    assert [cache.get(k) for k in 'acd'] == ['a', 'c', 'd']
+    assert cache.stats()['evictions'] == 1
+
+
+def test_ttl_expires_entries(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(result_cache.time, 'monotonic', lambda: now[0])
+    cache = ResultCache(WriteGeneration(), ttl=10)
+    cache.put('k', 1, 0)
+    now[0] += 9
+    assert cache.get('k') == 1
+    now[0] += 2
+    assert cache.is_miss(cache.get('k'))
+
+
+class CountingRepository:
+    """Repositorio asíncrono mínimo que cuenta las consultas que llegan a la base."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def get_stats(self, start_date=None, end_date=None):
+        self.calls.append(('stats', start_date, end_date))
+        return {'total_facturas': len(self.calls)}
+
+    async def get_invoices_page(self, start_date=None, end_date=None, provider=None, limit=None, after=None, fields=None):
+        self.calls.append(('page', limit))
+        rows = [{'id': i} for i in range(3 if provider == 'GRANDE' else 1)]
+        return rows, None
+
+
+def test_cached_repository_serves_repeats_until_a_write():
+    repository = CountingRepository()
+    cache = ResultCache(WriteGeneration())
+    cached = CachedAsyncFacturaRepository(repository, cache)
+
+    async def run():
+        first = await cached.get_stats()
+        again = await cached.get_stats()
+        cache.generation.bump()
+        after_write = await cached.get_stats()
+        return first, again, after_write
+
+    first, again, after_write = asyncio.run(run())
+    assert first == again == {'total_facturas': 1}
+    assert after_write == {'total_facturas': 2}
+    assert len(repository.calls) == 2
+
+
+def test_cached_repository_caches_unlimited_pages_up_to_max_rows():
+    repository = CountingRepository()
+    cached = CachedAsyncFacturaRepository(repository, ResultCache(WriteGeneration()), max_rows=2)
+
+    async def run():
+        for _ in range(2):
+            await cached.get_invoices_page(limit=None)
+            await cached.get_invoices_page(limit=50)
+            await cached.get_invoices_page(provider='GRANDE', limit=None)
+
+    asyncio.run(run())
+    # El listado de 3 filas supera max_rows y llega siempre a la base
+    assert repository.calls == [('page', None), ('page', 50), ('page', None), ('page', None)]
@@ -0,0 +1,67 @@
+from datetime import date
+
+import pytest
+
+from src.infrastructure.database.factura_queries import full_month_range, stats_query
+
+
+@pytest.mark.parametrize('start, end, expected', [
+    # Meses completos entre dos días sueltos
+    (date(2024, 1, 15), date(2024, 3, 10), (date(2024, 2, 1), date(2024, 3, 1))),
+    # Rango que empieza y termina en bordes de mes: todo sale del resumen
+    (date(2024, 1, 1), date(2024, 2, 29), (date(2024, 1, 1), date(2024, 3, 1))),
+    # Cruce de año
+    (date(2023, 12, 2), date(2024, 1, 31), (date(2024, 1, 1), date(2024, 2, 1))),
+    # Sin límites
+    (None, None, (None, None)),
+    (date(2024, 1, 31), None, (date(2024, 2, 1), None)),
+    (None, date(2024, 1, 30), (None, date(2024, 1, 1))),
+])
+def test_full_month_range(start, end, expected):
+    assert full_month_range(start, end) == expected
+
+
+def _parts(query: str):
+    """(parte del resumen mensual, parte de la tabla base) de la consulta."""
+    rollup, edge = query.split('UNION ALL')
+    return rollup, edge
+
+
+def test_stats_splits_full_months_and_edge_days():
+    start, end = date(2024, 1, 15), date(2024, 3, 10)
+    query, params = stats_query(start, end)
+    rollup, edge = _parts(query)
+
+    assert 'facturas_resumen_mensual' in rollup and 'mes >= %s AND mes < %s' in rollup
+    assert '(fecha < %s OR fecha >= %s)' in edge
+    # Primero los del resumen, luego los de la tabla base (filtro del rango + fuera de los meses completos)
+    assert params == [date(2024, 2, 1), date(2024, 3, 1), start, end, date(2024, 2, 1), date(2024, 3, 1)]
+    assert query.count('%s') == len(params)
+
+
+def test_stats_within_one_month_reads_only_base_table():
+    query, params = stats_query(date(2024, 2, 3), date(2024, 2, 20))
+    rollup, edge = _parts(query)
+
+    assert 'WHERE FALSE' in rollup
+    assert 'fecha >= %s AND fecha <= %s' in edge and 'OR' not in edge
+    assert params == [date(2024, 2, 3), date(2024, 2, 20)]
+
+
+def test_stats_without_range_reads_only_rollup():
+    query, params = stats_query(None, None)
+    rollup, edge = _parts(query)
+
+    assert 'WHERE' not in rollup
+    assert 'WHERE FALSE' in edge
+    assert params == []
+
+
+def test_stats_open_start_uses_only_end_boundary():
+    query, params = stats_query(None, date(2024, 3, 10))
+    rollup, edge = _parts(query)
+
+    assert 'mes < %s' in rollup and 'mes >=' not in rollup
+    assert '(fecha >= %s)' in edge
+    assert params == [date(2024, 3, 1), date(2024, 3, 10), date(2024, 3, 1)]
+    assert query.count('%s') == len(params)
@@ -0,0 +1,41 @@
+from lxml import etree
+
+from src.application.services.ubl_extractor import extract_fields
+
+INVOICE = b"""<Invoice xmlns="urn:oasis:names:specification:ubl:schema:xsd:Invoice-2"
+    xmlns:cac="urn:oasis:names:specification:ubl:schema:xsd:CommonAggregateComponents-2"
+    xmlns:cbc="urn:oasis:names:specification:ubl:schema:xsd:CommonBasicComponents-2">
+  <cac:AccountingSupplierParty><cac:Party>
+    <cac:PartyName><cbc:Name/></cac:PartyName>
+    <cac:PartyTaxScheme>
+      <cbc:RegistrationName>  ACME S.A.S.  </cbc:RegistrationName>
+      <cbc:CompanyID schemeID="2">900219834</cbc:CompanyID>
+    </cac:PartyTaxScheme>
+  </cac:Party></cac:AccountingSupplierParty>
+  <cac:TaxTotal><cbc:TaxAmount currencyID="COP">19.00</cbc:TaxAmount></cac:TaxTotal>
+  <cac:LegalMonetaryTotal><cbc:PayableAmount currencyID="COP">119.00</cbc:PayableAmount></cac:LegalMonetaryTotal>
+</Invoice>"""
+
+
+def _fields():
+    return extract_fields(etree.fromstring(INVOICE))
+
+
+def test_text_is_stripped():
+    fields = _fields()
+    assert fields.text('supplier_registration_name') == 'ACME S.A.S.'
+    assert fields.text('supplier_company_id') == '900219834'
+    assert fields.element('supplier_company_id').get('schemeID') == '2'
+    assert fields.text('payable_amount') == '119.00'
+
+
+def test_empty_element_gives_empty_text():
+    fields = _fields()
+    assert fields.element('party_name') is not None
+    assert fields.text('party_name') == ''
+
+
+def test_missing_element_gives_empty_text():
+    fields = _fields()
+    assert fields.element('parent_document_id') is None
+    assert fields.text('parent_document_id') == ''
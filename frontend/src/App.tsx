@@ -39,8 +39,16 @@ interface ProcessingStats {
   trashed: number;
   errors: number;
   files_saved: number;
+  threads_scanned?: number;
+  threads_successful?: number;
+  threads_trashed?: number;
+  threads_errors?: number;
 }
 
+// Conteo por hilo de Gmail como badge de la tarjeta (los correos de un hilo se procesan juntos)
+const threadTrend = (count: number | undefined, variant: 'info' | 'error' = 'info', suffix = '') =>
+  count === undefined ? undefined : { label: `${count} ${count === 1 ? 'hilo' : 'hilos'}${suffix}`, variant };
+
 interface ImportStats {
   total: number;
   successful: number;
@@ -935,21 +943,26 @@ function App() {
                     label: 'Emails Escaneados',
                     value: stats.total_scanned,
                     icon: <Mail size={20} />,
-                    variant: 'primary'
+                    variant: 'primary',
+                    trend: stats.threads_errors
+                      ? threadTrend(stats.threads_errors, 'error', ' con error')
+                      : threadTrend(stats.threads_scanned)
                   },
                   {
                     id: 'successful',
                     label: 'Facturas Extraídas',
                     value: stats.successful,
                     icon: <Zap size={20} />,
-                    variant: 'success'
+                    variant: 'success',
+                    trend: threadTrend(stats.threads_successful)
                   },
                   {
                     id: 'trashed',
                     label: 'Enviados a Papelera',
                     value: stats.trashed,
                     icon: <History size={20} />,
-                    variant: 'warning'
+                    variant: 'warning',
+                    trend: threadTrend(stats.threads_trashed)
                   },
                   {
                     id: 'saved',